@@ -20,6 +20,9 @@ start "GymFitness WebSocket" cmd /k "cd /d %~dp0gymbackend && call venv\Scripts\
 echo ⏳ Waiting for WebSocket to initialize...
 timeout /t 3 /nobreak > nul
 
+echo 📬 Starting Notification Worker...
+start "GymFitness Notification Worker" cmd /k "cd /d %~dp0gymbackend && call venv\Scripts\activate && python manage.py notification_worker"
+
 echo 🌐 Starting Frontend Server...
 start "GymFitness Frontend" cmd /k "cd /d %~dp0fitness-frontend && npm start"
 
@@ -35,6 +38,7 @@ echo - WebSocket: ws://127.0.0.1:8001
 echo - Admin Panel: http://127.0.0.1:8000/admin
 echo.
 echo 🔔 WebSocket notifications are ENABLED on port 8001
+echo 📬 Email/WhatsApp notifications are delivered by the notification worker window
 echo.
 echo This window will close in 10 seconds...
 timeout /t 10 /nobreak > nul
@@ -179,7 +179,7 @@ const CheckInPhotoReview = () => {
                 <div className="aspect-video bg-gray-700 rounded overflow-hidden">
                   {selectedPhoto.photo_url ? (
                     <img
-                      src={`http://127.0.0.1:8000${selectedPhoto.photo_url}`}
+                      src={`http://127.0.0.1:8000${selectedPhoto.full_photo_url || selectedPhoto.photo_url}`}
                       alt={`Check-in photo for ${selectedPhoto.member_name}`}
                       className="w-full h-full object-contain"
                     />
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Attendance, CheckInPhoto
+from .models import Attendance, AttendanceHistory, CheckInPhoto, BiometricTemplate, AttendanceDailySummary, MemberAttendanceCounter
 
 @admin.register(Attendance)
 class AttendanceAdmin(admin.ModelAdmin):
@@ -14,12 +14,24 @@ class AttendanceAdmin(admin.ModelAdmin):
     has_photo.boolean = True
     has_photo.short_description = 'Photo'
 
+@admin.register(AttendanceHistory)
+class AttendanceHistoryAdmin(admin.ModelAdmin):
+    list_display = ['member', 'date', 'check_in_time', 'verification_method']
+    list_filter = ['date', 'verification_method']
+    search_fields = ['member__first_name', 'member__last_name', 'member__athlete_id']
+    list_select_related = ['member']
+    readonly_fields = ['id', 'member', 'date', 'check_in_time', 'verification_method']
+
 @admin.register(CheckInPhoto)
 class CheckInPhotoAdmin(admin.ModelAdmin):
     list_display = ['attendance', 'member_name', 'date', 'photo_preview', 'created_at']
+    list_select_related = ['attendance__member']
     list_filter = ['created_at', 'attendance__date']
     search_fields = ['attendance__member__first_name', 'attendance__member__last_name']
-    readonly_fields = ['photo_preview', 'created_at']
+    readonly_fields = [
+        'photo_preview', 'thumbnail', 'width', 'height', 'original_size',
+        'file_size', 'thumbnail_size', 'processed_at', 'created_at'
+    ]
     
     def member_name(self, obj):
         return f"{obj.attendance.member.first_name} {obj.attendance.member.last_name}"
@@ -30,10 +42,32 @@ class CheckInPhotoAdmin(admin.ModelAdmin):
     date.short_description = 'Check-in Date'
     
     def photo_preview(self, obj):
-        if obj.photo:
+        # The thumbnail keeps the changelist light; fall back while it is pending
+        image = obj.thumbnail or obj.photo
+        if image:
             return format_html(
-                '<img src="{}" style="max-width: 200px; max-height: 200px;" />',
-                obj.photo.url
+                '<a href="{}"><img src="{}" style="max-width: 200px; max-height: 200px;" /></a>',
+                obj.photo.url,
+                image.url
             )
         return "No photo"
     photo_preview.short_description = 'Photo Preview'
+
+@admin.register(BiometricTemplate)
+class BiometricTemplateAdmin(admin.ModelAdmin):
+    list_display = ['member', 'source', 'length_signature', 'pattern_signature', 'created_at']
+    list_filter = ['source', 'created_at']
+    search_fields = ['member__first_name', 'member__last_name', 'member__athlete_id', 'primary_hash']
+    readonly_fields = ['primary_hash', 'secondary_hash', 'length_signature', 'pattern_signature', 'char_frequency', 'created_at']
+
+@admin.register(AttendanceDailySummary)
+class AttendanceDailySummaryAdmin(admin.ModelAdmin):
+    list_display = ['date', 'time_slot', 'verification_method', 'count', 'updated_at']
+    list_filter = ['date', 'time_slot', 'verification_method']
+    readonly_fields = ['date', 'time_slot', 'verification_method', 'count', 'updated_at']
+
+@admin.register(MemberAttendanceCounter)
+class MemberAttendanceCounterAdmin(admin.ModelAdmin):
+    list_display = ['member', 'recent_count', 'total_count', 'last_check_in_date', 'window_date']
+    search_fields = ['member__first_name', 'member__last_name', 'member__athlete_id']
+    readonly_fields = ['total_count', 'recent_count', 'window_date', 'last_check_in_date']
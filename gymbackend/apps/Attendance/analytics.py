@@ -0,0 +1,227 @@
+import uuid
+from datetime import date as date_class, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import ExtractHour
+
+from apps.Member.models import Member
+
+from .models import Attendance, AttendanceDailySummary, AttendanceHistory
+
+DEFAULT_RANGE_DAYS = 365
+DEFAULT_RETENTION_WEEKS = 12
+DEFAULT_CACHE_TTL = 60 * 60
+STREAM_CHUNK_SIZE = 5000
+CACHE_KEY_PREFIX = 'attendance_analytics'
+REMOVALS_CACHE_KEY = 'attendance_analytics_removals'
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+SLOTS = [slot for slot, _ in Member.TIME_SLOT_CHOICES]
+# Local check-in hours [start, end) counted as arriving within each slot
+SLOT_HOURS = {'morning': (0, 12), 'afternoon': (12, 17), 'evening': (17, 24)}
+
+CHECKIN_DTYPE = np.dtype([('member', np.int64), ('day', 'datetime64[D]'), ('hour', np.int8)])
+
+
+def _weekday(days):
+    """Monday=0 .. Sunday=6 for a datetime64[D] array (1970-01-01 was a Thursday)"""
+    return (days.astype(np.int64) + 3) % 7
+
+
+def load_checkins(start, end):
+    """
+    Check-ins in [start, end] from the hot and archived tables as one
+    structured array (member pk, date, local check-in hour).
+    The hour is extracted by the database in the current time zone, so only
+    three integers per row cross the wire.
+    """
+    parts = []
+    for model in (Attendance, AttendanceHistory):
+        rows = (
+            model.objects.filter(date__range=[start, end])
+            .annotate(hour=ExtractHour('check_in_time'))
+            .values_list('member_id', 'date', 'hour')
+            .order_by()
+        )
+        parts.append(np.fromiter(rows.iterator(chunk_size=STREAM_CHUNK_SIZE), dtype=CHECKIN_DTYPE))
+    return np.concatenate(parts)
+
+
+def _first_checkins(end):
+    """{member pk: first check-in date} over both tables, up to end"""
+    first = {}
+    for model in (Attendance, AttendanceHistory):
+        rows = model.objects.filter(date__lte=end).values_list('member_id').annotate(first=Min('date')).order_by()
+        for member_id, day in rows.iterator(chunk_size=STREAM_CHUNK_SIZE):
+            if member_id not in first or day < first[member_id]:
+                first[member_id] = day
+    return first
+
+
+def weekday_hour_heatmap(checkins, start, end):
+    """7x24 check-in counts and per-day averages, with each weekday's peak hour"""
+    counts = np.bincount(
+        _weekday(checkins['day']) * 24 + checkins['hour'].astype(np.int64), minlength=7 * 24
+    ).reshape(7, 24)
+
+    calendar = np.arange(np.datetime64(start), np.datetime64(end) + 1, dtype='datetime64[D]')
+    occurrences = np.bincount(_weekday(calendar), minlength=7)
+    averages = counts / np.maximum(occurrences, 1)[:, None]
+
+    totals = counts.sum(axis=1)
+    peaks = counts.argmax(axis=1)
+    return {
+        'weekdays': WEEKDAYS,
+        'counts': counts.tolist(),
+        'averages': np.round(averages, 2).tolist(),
+        'peak_hours': [
+            {'weekday': WEEKDAYS[i], 'hour': int(peaks[i]) if totals[i] else None, 'count': int(counts[i, peaks[i]])}
+            for i in range(7)
+        ],
+    }
+
+
+def slot_utilization(checkins, members, member_slots, start, end):
+    """
+    Per time_slot: check-ins by members of the slot, how many of them came,
+    the average day's share of the slot's active members that checked in,
+    and the share of their check-ins that arrived within the slot's hours
+    """
+    days = (end - start).days + 1
+    slot_index = {slot: i for i, slot in enumerate(SLOTS)}
+    member_slot = np.array([slot_index.get(member_slots.get(pk), -1) for pk in members], dtype=np.int64)
+    _, inverse = np.unique(checkins['member'], return_inverse=True)
+    row_slot = member_slot[inverse] if len(checkins) else np.zeros(0, dtype=np.int64)
+
+    enrolled = dict(
+        Member.objects.filter(is_active=True).values_list('time_slot').annotate(count=Count('pk')).order_by()
+    )
+    hours = checkins['hour'].astype(np.int64)
+    result = []
+    for i, slot in enumerate(SLOTS):
+        mask = row_slot == i
+        count = int(mask.sum())
+        low, high = SLOT_HOURS[slot]
+        in_slot = int(((hours[mask] >= low) & (hours[mask] < high)).sum())
+        members_in_slot = enrolled.get(slot, 0)
+        average = count / days
+        result.append({
+            'time_slot': slot,
+            'members': members_in_slot,
+            'active_members': int((member_slot == i).sum()),
+            'checkins': count,
+            'avg_daily_checkins': round(average, 2),
+            'utilization': round(average / members_in_slot, 4) if members_in_slot else None,
+            'in_slot_share': round(in_slot / count, 4) if count else None,
+        })
+    return result
+
+
+def retention_curves(checkins, members, first_checkins, start, end, weeks=DEFAULT_RETENTION_WEEKS):
+    """
+    Weekly retention of members whose first ever check-in falls in
+    [start, end], overall and per monthly cohort. Week w counts members who
+    checked in during days [7w, 7w + 7) after their first visit; a member is
+    only counted for weeks the range fully observes.
+    """
+    first = np.array(
+        [first_checkins.get(pk, end) for pk in members], dtype='datetime64[D]'
+    ) if len(members) else np.zeros(0, dtype='datetime64[D]')
+    in_cohort = first >= np.datetime64(start)
+    cohort_first = first[in_cohort]
+
+    # Last week whose seven days all fall in the range (-1: not even week 0),
+    # per cohort member
+    observed = np.minimum((np.datetime64(end) - cohort_first).astype(np.int64) - 6, 7 * weeks) // 7
+    months, month_of = np.unique(cohort_first.astype('datetime64[M]'), return_inverse=True)
+    eligible = np.zeros((len(months), weeks + 1), dtype=np.int64)
+    counted = observed >= 0
+    np.add.at(eligible, (month_of[counted], observed[counted]), 1)
+    eligible = eligible[:, ::-1].cumsum(axis=1)[:, ::-1]
+
+    _, inverse = np.unique(checkins['member'], return_inverse=True)
+    cohort_row = np.full(len(members), -1, dtype=np.int64)
+    cohort_row[in_cohort] = month_of
+    member_observed = np.full(len(members), -1, dtype=np.int64)
+    member_observed[in_cohort] = observed
+    row_cohort = cohort_row[inverse] if len(checkins) else np.zeros(0, dtype=np.int64)
+    keep = row_cohort >= 0
+    week = (checkins['day'][keep] - first[inverse[keep]]).astype(np.int64) // 7
+    # Visits in partially observed weeks count for neither side of the rate
+    keep_week = week <= member_observed[inverse[keep]]
+    pairs = np.unique(np.stack([inverse[keep][keep_week], week[keep_week]]), axis=1)
+
+    retained = np.zeros((len(months), weeks + 1), dtype=np.int64)
+    np.add.at(retained, (cohort_row[pairs[0]], pairs[1]), 1)
+
+    def _rates(kept, base):
+        return [round(int(k) / int(b), 4) if b else None for k, b in zip(kept, base)]
+
+    return {
+        'weeks': list(range(weeks + 1)),
+        'cohort_size': int(in_cohort.sum()),
+        'overall': _rates(retained.sum(axis=0), eligible.sum(axis=0)),
+        'cohorts': [
+            {
+                'month': str(month),
+                'size': int(eligible[i, 0]),
+                'retention': _rates(retained[i], eligible[i]),
+            }
+            for i, month in enumerate(months)
+        ],
+    }
+
+
+def compute(start, end, weeks=DEFAULT_RETENTION_WEEKS):
+    """All attendance analytics for [start, end] (uncached)"""
+    checkins = load_checkins(start, end)
+    members = np.unique(checkins['member'])
+    member_slots = dict(Member.objects.values_list('pk', 'time_slot'))
+    first_checkins = _first_checkins(end)
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'total_checkins': int(len(checkins)),
+        'unique_members': int(len(members)),
+        'heatmap': weekday_hour_heatmap(checkins, start, end),
+        'slot_utilization': slot_utilization(checkins, members, member_slots, start, end),
+        'retention': retention_curves(checkins, members, first_checkins, start, end, weeks),
+    }
+
+
+def note_removal():
+    """A deleted check-in can be replaced without changing a range's total; retire cached ranges"""
+    cache.set(REMOVALS_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def _fingerprint(start, end):
+    """
+    Check-in total for the range from the rollups, which moves whenever a
+    check-in in it is added, plus the removal stamp
+    """
+    summary = AttendanceDailySummary.objects.filter(date__range=[start, end]).aggregate(
+        total=Sum('count'), rows=Count('pk')
+    )
+    return f"{summary['total'] or 0}-{summary['rows']}-{cache.get(REMOVALS_CACHE_KEY, '')}"
+
+
+def attendance_analytics(start=None, end=None, weeks=DEFAULT_RETENTION_WEEKS):
+    """
+    Cached analytics per date range. Entries are keyed by the range's rollup
+    total and the removal stamp, so new or deleted check-ins invalidate them at once;
+    member time slot changes show up after ATTENDANCE_ANALYTICS_CACHE_TTL.
+    Returns: (analytics dict, served from cache)
+    """
+    end = end or date_class.today()
+    start = start or end - timedelta(days=DEFAULT_RANGE_DAYS - 1)
+    key = f"{CACHE_KEY_PREFIX}_{start.isoformat()}_{end.isoformat()}_{weeks}_{_fingerprint(start, end)}"
+
+    result = cache.get(key)
+    if result is not None:
+        return result, True
+    result = compute(start, end, weeks)
+    cache.set(key, result, getattr(settings, 'ATTENDANCE_ANALYTICS_CACHE_TTL', DEFAULT_CACHE_TTL))
+    return result, False
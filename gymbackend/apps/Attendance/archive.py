@@ -0,0 +1,81 @@
+import time
+from datetime import date as date_class, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Attendance, AttendanceHistory
+from .rollups import ROLLING_WINDOW_DAYS
+
+DEFAULT_ARCHIVE_DAYS = 180
+DEFAULT_CHUNK_SIZE = 1000
+# The rolling dashboard window is counted from the hot table only
+MIN_ARCHIVE_DAYS = ROLLING_WINDOW_DAYS + 1
+
+
+def archive_cutoff(days=None, today=None):
+    """First date that stays in the hot table"""
+    days = days if days is not None else getattr(settings, 'ATTENDANCE_ARCHIVE_DAYS', DEFAULT_ARCHIVE_DAYS)
+    today = today or date_class.today()
+    return today - timedelta(days=max(days, MIN_ARCHIVE_DAYS))
+
+
+def archivable(cutoff):
+    """Hot rows older than cutoff; rows whose check-in photo is still kept wait for its cleanup"""
+    return Attendance.objects.filter(date__lt=cutoff, photo__isnull=True)
+
+
+def _delete_hot_rows(ids):
+    """
+    DELETE the given Attendance ids in one statement.
+
+    Raw SQL on purpose: QuerySet.delete() would fire the post_delete receivers,
+    which uncount the rollups for rows that still exist (in the cold table).
+    Photo rows, the only cascade, were excluded by archivable().
+    """
+    table = connection.ops.quote_name(Attendance._meta.db_table)
+    placeholders = ', '.join(['%s'] * len(ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE id IN ({placeholders})', ids)
+
+
+def archive_attendance(days=None, chunk_size=DEFAULT_CHUNK_SIZE, today=None):
+    """
+    Move attendance older than the archive horizon into AttendanceHistory.
+
+    Each chunk is one bulk INSERT into the history table and one DELETE from
+    the hot table, in a single transaction. The daily summaries and member
+    counters already include these rows, so they are left untouched.
+    Returns a stats dict (rows, chunks, cutoff, seconds).
+    """
+    started = time.monotonic()
+    cutoff = archive_cutoff(days, today)
+    candidates = archivable(cutoff).order_by('pk').values_list(
+        'id', 'member_id', 'date', 'check_in_time', 'verification_method'
+    )
+
+    stats = {'rows': 0, 'chunks': 0, 'cutoff': cutoff}
+    while True:
+        with transaction.atomic():
+            chunk = list(candidates[:chunk_size])
+            if not chunk:
+                break
+            AttendanceHistory.objects.bulk_create(
+                [
+                    AttendanceHistory(
+                        id=row_id,
+                        member_id=member_id,
+                        date=day,
+                        check_in_time=check_in_time,
+                        verification_method=verification_method or 'Biometric',
+                    )
+                    for row_id, member_id, day, check_in_time, verification_method in chunk
+                ],
+                ignore_conflicts=True,
+            )
+            _delete_hot_rows([row[0] for row in chunk])
+        stats['rows'] += len(chunk)
+        stats['chunks'] += 1
+
+    stats['seconds'] = time.monotonic() - started
+    return stats
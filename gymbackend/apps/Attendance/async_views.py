@@ -0,0 +1,527 @@
+"""
+Async check-in endpoints for the Daphne (ASGI) deployment.
+
+Same request/response contract as the synchronous views in
+biometric_views.py, but the database work goes through Django's async ORM
+and the member notification (database row + WebSocket fan-out) runs as a
+background task after the response has been returned, so it no longer
+adds to check-in latency.
+"""
+import asyncio
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+
+from apps.Member.models import Member
+from apps.Attendance.models import CheckInPhoto
+from apps.Attendance.checkin_guard import achecked_in_today, aget_or_create_today, idempotent_checkin
+from apps.Attendance.credential_registry import credential_registry
+from apps.Attendance.instrumentation import CheckInTrace
+from .biometric_views import get_afghanistan_time, kiosk_debug_enabled
+
+# Strong references to in-flight notification tasks (the loop only keeps weak ones)
+_background_tasks = set()
+
+
+async def _send_checkin_notification(user_id, message, trace):
+    """
+    Create the member notification and push it over the channel layer.
+    Its stages are recorded on the (already finished) request trace, so
+    they show up per method without counting towards the request total.
+    """
+    from channels.layers import get_channel_layer
+    from apps.Notifications.models import Notification
+
+    try:
+        with trace.span('notification_create'):
+            notification = await Notification.objects.acreate(user_id=user_id, message=message)
+        with trace.span('websocket_send'):
+            channel_layer = get_channel_layer()
+            notification_data = {
+                "id": notification.id,
+                "message": notification.message,
+                "created_at": notification.created_at.isoformat(),
+                "is_read": notification.is_read,
+                "link": "/member-dashboard/attendance"
+            }
+            await channel_layer.group_send(
+                f"user_{user_id}_notifications",
+                {
+                    "type": "send_notification",
+                    "notification": notification_data
+                }
+            )
+    except Exception as e:
+        print(f"Failed to send check-in notification: {e}")
+
+
+def schedule_checkin_notification(member, message, trace):
+    """Fire-and-forget the check-in notification once the view has returned"""
+    task = asyncio.get_running_loop().create_task(_send_checkin_notification(member.user_id, message, trace))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def _checkin_payload(member, attendance, created):
+    return {
+        'success': True,
+        'member': {
+            'athlete_id': member.athlete_id,
+            'name': f"{member.first_name} {member.last_name}",
+            'first_name': member.first_name,
+            'last_name': member.last_name,
+        },
+        'already_checked_in': not created,
+        'check_in_time': get_afghanistan_time(attendance.check_in_time).isoformat() if attendance.check_in_time else None,
+    }
+
+
+async def _get_or_create_attendance(member, verification_method, trace):
+    with trace.span('attendance_write'):
+        return await aget_or_create_today(member, verification_method)
+
+
+@csrf_exempt
+@idempotent_checkin
+async def webauthn_check_in(request):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    trace = CheckInTrace('Biometric')
+    try:
+        data = json.loads(request.body)
+        athlete_id = data.get('athlete_id')
+        with trace.span('member_lookup'):
+            member = await Member.objects.aget(athlete_id=athlete_id)
+        if not member.biometric_registered:
+            return JsonResponse({'error': 'Fingerprint not registered'}, status=400)
+
+        attendance, created = await _get_or_create_attendance(member, 'Biometric', trace)
+        if not created:
+            return JsonResponse({'message': 'Already checked in today'}, status=200)
+
+        schedule_checkin_notification(
+            member,
+            f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+            trace
+        )
+        return JsonResponse({'message': 'Check-in successful'})
+    except Exception as e:
+        import traceback
+        print(traceback.format_exc())
+        return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
+
+
+@csrf_exempt
+@idempotent_checkin
+async def kiosk_checkin(request):
+    """
+    Async kiosk check-in: identifies the member from the WebAuthn assertion
+    and checks them in.
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    trace = CheckInTrace('Biometric-Kiosk')
+    try:
+        data = json.loads(request.body)
+        assertion = data.get('assertion')
+
+        if not assertion:
+            return JsonResponse({'error': 'Missing assertion data'}, status=400)
+
+        credential_id = assertion.get('rawId') or assertion.get('id')
+        if not credential_id:
+            return JsonResponse({'error': 'Missing credential ID'}, status=400)
+
+        from .biometric_utils import BiometricSecurity
+
+        with trace.span('member_lookup'):
+            member = await sync_to_async(credential_registry.resolve)(
+                credential_id, assertion.get('rawId'), assertion.get('id')
+            )
+            if not member:
+                member = await sync_to_async(BiometricSecurity.find_member_by_biometric)(credential_id)
+
+        if not member:
+            response_data = {
+                'error': 'Fingerprint not recognized. Please ensure your fingerprint is properly registered.',
+                'error_code': 'BIOMETRIC_NOT_FOUND',
+            }
+            if kiosk_debug_enabled():
+                response_data['debug_info'] = {
+                    'credential_id': credential_id,
+                    'raw_id': assertion.get('rawId'),
+                    'assertion_id': assertion.get('id'),
+                    'available_members': await Member.objects.filter(biometric_registered=True).acount()
+                }
+            return JsonResponse(response_data, status=404)
+
+        attendance, created = await _get_or_create_attendance(member, 'Biometric-Kiosk', trace)
+        print(f"Check-in {'created' if created else 'already existed'} for {member.first_name}")
+
+        if created:
+            schedule_checkin_notification(
+                member,
+                f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                trace
+            )
+
+        return JsonResponse(_checkin_payload(member, attendance, created))
+
+    except Exception as e:
+        print(f"Kiosk check-in error: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
+
+
+@csrf_exempt
+@idempotent_checkin
+async def external_sensor_checkin(request):
+    """Async check-in from external USB fingerprint sensors"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    trace = CheckInTrace('External')
+    try:
+        data = json.loads(request.body)
+        fingerprint_data = data.get('fingerprint_data')
+        sensor_type = data.get('sensor_type', 'unknown')
+        quality = data.get('quality', 'unknown')
+        trace.method = f'External-{sensor_type}'
+
+        if not fingerprint_data:
+            return JsonResponse({'error': 'Fingerprint data required'}, status=400)
+
+        from .biometric_utils import BiometricSecurity
+
+        if isinstance(fingerprint_data, dict):
+            biometric_hash = fingerprint_data.get('template') or fingerprint_data.get('hash') or str(fingerprint_data)
+        else:
+            biometric_hash = str(fingerprint_data)
+
+        with trace.span('member_lookup'):
+            member = await sync_to_async(BiometricSecurity.enhanced_biometric_search)(biometric_hash, sensor_type)
+
+        if not member:
+            response_data = {
+                'error': 'Fingerprint not recognized. Please ensure your fingerprint is registered.',
+                'error_code': 'EXTERNAL_SENSOR_NOT_RECOGNIZED',
+                'sensor_type': sensor_type,
+            }
+            if kiosk_debug_enabled():
+                response_data['debug_info'] = {
+                    'biometric_hash': biometric_hash[:20] + '...',
+                    'total_registered_members': await Member.objects.filter(biometric_registered=True).acount()
+                }
+            return JsonResponse(response_data, status=404)
+
+        attendance, created = await _get_or_create_attendance(member, f'External-{sensor_type}', trace)
+        print(f"External sensor check-in {'created' if created else 'already existed'} for {member.first_name}")
+
+        if created:
+            schedule_checkin_notification(
+                member,
+                f"Welcome back, {member.first_name}! Checked in via external sensor at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                trace
+            )
+
+        response_data = _checkin_payload(member, attendance, created)
+        response_data['sensor_info'] = {
+            'type': sensor_type,
+            'quality': quality
+        }
+        return JsonResponse(response_data)
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        print(f"External sensor check-in error: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
+
+
+@csrf_exempt
+@idempotent_checkin
+async def pin_checkin(request):
+    """Async PIN-based check-in with photo verification"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    trace = CheckInTrace('PIN+Photo')
+    try:
+        data = json.loads(request.body)
+        pin = data.get('pin')
+        photo_data = data.get('photo')
+        ip = request.META.get('REMOTE_ADDR', 'unknown')
+
+        if not pin:
+            return JsonResponse({'error': 'PIN is required'}, status=400)
+
+        # Rate limiting
+        attempts_key = f'pin_attempts_{ip}'
+        attempts = await cache.aget(attempts_key, 0)
+        if attempts >= 5:
+            return JsonResponse({
+                'error': 'Too many failed attempts. Please try again in 5 minutes.',
+                'error_code': 'RATE_LIMITED'
+            }, status=429)
+
+        try:
+            with trace.span('member_lookup'):
+                member = await Member.objects.aget(pin=pin, pin_enabled=True)
+        except Member.DoesNotExist:
+            await cache.aset(attempts_key, attempts + 1, 300)  # 5 min timeout
+            return JsonResponse({
+                'error': 'Invalid PIN or PIN not enabled',
+                'error_code': 'INVALID_PIN'
+            }, status=400)
+
+        # Repeat attempt: answer from the cache before any face comparison
+        attendance = await achecked_in_today(member)
+        if attendance is not None:
+            response_data = _checkin_payload(member, attendance, False)
+            response_data['verification_method'] = 'PIN+Photo'
+            return JsonResponse(response_data)
+
+        if not photo_data:
+            return JsonResponse({
+                'error': 'Photo required for PIN verification',
+                'error_code': 'PHOTO_REQUIRED'
+            }, status=400)
+
+        if not member.pin_reference_photo:
+            return JsonResponse({
+                'error': 'No reference photo found. Please contact admin to set up PIN with photo.',
+                'error_code': 'NO_REFERENCE_PHOTO'
+            }, status=400)
+
+        from .photo_pipeline import DecodedPhoto
+        try:
+            with trace.span('decode'):
+                photo = DecodedPhoto.from_base64(photo_data)
+        except Exception as decode_error:
+            return JsonResponse({
+                'error': f'Photo validation failed: {decode_error}',
+                'error_code': 'INVALID_PHOTO'
+            }, status=400)
+
+        from .face_encodings import get_face_comparison, reference_encodings
+        from .face_service import face_service, FaceServiceBusy, FaceServiceTimeout
+        FaceComparison = get_face_comparison()
+
+        try:
+            with trace.span('reference_encoding'):
+                reference_encoding, comparison_error = await sync_to_async(reference_encodings.get)(member, FaceComparison)
+            if reference_encoding is None:
+                return JsonResponse({
+                    'error': f'Face comparison failed: {comparison_error}',
+                    'error_code': 'COMPARISON_ERROR'
+                }, status=500)
+
+            is_valid, validation_error, is_match, confidence, comparison_error = await face_service.averify(
+                reference_encoding,
+                photo,
+                tolerance=FaceComparison.PIN_CHECKIN_TOLERANCE,
+                trace=trace
+            )
+
+            if not is_valid:
+                return JsonResponse({
+                    'error': f'Photo validation failed: {validation_error}',
+                    'error_code': 'INVALID_PHOTO'
+                }, status=400)
+
+            if comparison_error:
+                return JsonResponse({
+                    'error': f'Face comparison failed: {comparison_error}',
+                    'error_code': 'COMPARISON_ERROR'
+                }, status=500)
+
+            if not is_match:
+                print(f"Face mismatch for {member.first_name}: confidence={confidence:.2f}")
+                return JsonResponse({
+                    'error': f'PIN+Photo verification failed. Face does not match (confidence: {confidence:.2f})',
+                    'error_code': 'FACE_MISMATCH',
+                    'confidence': float(round(confidence, 2))
+                }, status=403)
+
+        except FaceServiceBusy:
+            return JsonResponse({
+                'error': 'Face verification is busy. Please try again in a moment.',
+                'error_code': 'FACE_SERVICE_BUSY'
+            }, status=429)
+        except FaceServiceTimeout as timeout_error:
+            print(f"Face comparison timeout for {member.first_name}: {timeout_error}")
+            return JsonResponse({
+                'error': 'Face verification timed out. Please try again.',
+                'error_code': 'FACE_SERVICE_TIMEOUT'
+            }, status=503)
+        except Exception as face_error:
+            print(f"Face comparison exception: {face_error}")
+            import traceback
+            traceback.print_exc()
+            return JsonResponse({
+                'error': f'Face comparison system error: {str(face_error)}',
+                'error_code': 'SYSTEM_ERROR'
+            }, status=500)
+
+        attendance, created = await _get_or_create_attendance(member, 'PIN+Photo', trace)
+
+        if created:
+            schedule_checkin_notification(
+                member,
+                f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                trace
+            )
+            try:
+                with trace.span('photo_store'):
+                    await CheckInPhoto.objects.acreate(
+                        attendance=attendance,
+                        photo=photo.content_file(name=f'{member.athlete_id}_{uuid.uuid4().hex[:8]}.jpg')
+                    )
+            except Exception as photo_error:
+                print(f"Photo save failed: {photo_error}")
+
+        # Reset attempts on success
+        await cache.adelete(attempts_key)
+
+        response_data = _checkin_payload(member, attendance, created)
+        response_data['verification_method'] = 'PIN+Photo'
+        return JsonResponse(response_data)
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        print(f"PIN check-in error: {e}")
+        import traceback
+        traceback.print_exc()
+        return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
+
+
+@csrf_exempt
+@idempotent_checkin
+async def face_identify_checkin(request):
+    """Async photo-only check-in by identifying the face among enrolled members"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    if not getattr(settings, 'FACE_IDENTIFICATION_ENABLED', False):
+        return JsonResponse({
+            'error': 'Photo-only check-in is not enabled',
+            'error_code': 'FACE_ID_DISABLED'
+        }, status=404)
+
+    trace = CheckInTrace('Face-ID')
+    try:
+        data = json.loads(request.body)
+        photo_data = data.get('photo')
+
+        if not photo_data:
+            return JsonResponse({
+                'error': 'Photo is required',
+                'error_code': 'PHOTO_REQUIRED'
+            }, status=400)
+
+        from .photo_pipeline import DecodedPhoto
+        try:
+            with trace.span('decode'):
+                photo = DecodedPhoto.from_base64(photo_data)
+        except Exception as decode_error:
+            return JsonResponse({
+                'error': f'Photo validation failed: {decode_error}',
+                'error_code': 'INVALID_PHOTO'
+            }, status=400)
+
+        from .face_gallery import face_gallery
+        from .face_service import face_service, FaceServiceBusy, FaceServiceTimeout
+
+        try:
+            is_valid, validation_error, encoding, encoding_error = await face_service.aencode_live(photo, trace=trace)
+        except FaceServiceBusy:
+            return JsonResponse({
+                'error': 'Face verification is busy. Please try again in a moment.',
+                'error_code': 'FACE_SERVICE_BUSY'
+            }, status=429)
+        except FaceServiceTimeout as timeout_error:
+            print(f"Face identification timeout: {timeout_error}")
+            return JsonResponse({
+                'error': 'Face verification timed out. Please try again.',
+                'error_code': 'FACE_SERVICE_TIMEOUT'
+            }, status=503)
+
+        if not is_valid:
+            return JsonResponse({
+                'error': f'Photo validation failed: {validation_error}',
+                'error_code': 'INVALID_PHOTO'
+            }, status=400)
+
+        if encoding is None:
+            return JsonResponse({
+                'error': f'Face encoding failed: {encoding_error}',
+                'error_code': 'COMPARISON_ERROR'
+            }, status=400)
+
+        # The gallery may (re)load from the database, so search off the event loop
+        with trace.span('face_search'):
+            member_pk, distance = await sync_to_async(face_gallery.identify)(encoding)
+
+        member = None
+        if member_pk is not None:
+            with trace.span('member_lookup'):
+                member = await Member.objects.filter(pk=member_pk, pin_enabled=True).afirst()
+        if member is None:
+            response = {
+                'error': 'Face not recognized. Please use your PIN or fingerprint.',
+                'error_code': 'FACE_NOT_RECOGNIZED'
+            }
+            if distance is not None:
+                response['distance'] = float(round(distance, 3))
+            return JsonResponse(response, status=404)
+
+        attendance, created = await _get_or_create_attendance(member, 'Face-ID', trace)
+
+        if created:
+            schedule_checkin_notification(
+                member,
+                f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                trace
+            )
+            try:
+                with trace.span('photo_store'):
+                    await CheckInPhoto.objects.acreate(
+                        attendance=attendance,
+                        photo=photo.content_file(name=f'{member.athlete_id}_{uuid.uuid4().hex[:8]}.jpg')
+                    )
+            except Exception as photo_error:
+                print(f"Photo save failed: {photo_error}")
+
+        payload = _checkin_payload(member, attendance, created)
+        payload['verification_method'] = 'Face-ID'
+        payload['distance'] = float(round(distance, 3))
+        return JsonResponse(payload)
+
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        print(f"Async face identification check-in error: {e}")
+        import traceback
+        traceback.print_exc()
+        return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
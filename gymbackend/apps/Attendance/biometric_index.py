@@ -0,0 +1,420 @@
+import math
+import threading
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from django.core.cache import cache
+
+
+class BiometricIndex:
+    """
+    Process-local feature index over registered biometric templates.
+
+    Rows are loaded from the precomputed BiometricTemplate columns: exact
+    primary/secondary hash hits resolve through dictionaries and the
+    char-frequency vectors are stacked into a matrix so the fuzzy similarity
+    is computed in a single vectorized pass.
+
+    Lookups only score a candidate set taken from blocking buckets that are
+    maintained incrementally with the rows: hash and pattern-signature
+    blocks, log-scale length buckets and banded, quantized char-frequency
+    sketches. Length and frequency only contribute up to LENGTH_WEIGHT and
+    FREQUENCY_WEIGHT in calculate_similarity, so their buckets are consulted
+    only for thresholds those channels can reach; above that the hash and
+    pattern blocks alone are an exact candidate set.
+
+    Processes stay in sync through a changelog in the shared cache: every
+    template change takes the next version number and records the template
+    pk under it. A process a few versions behind re-reads just those
+    templates; one further behind than MAX_DELTA, or missing an entry
+    (expired, or an invalidate()), rebuilds from the table.
+    """
+
+    VERSION_CACHE_KEY = 'biometric_index_changelog_version'
+    CHANGE_CACHE_KEY = 'biometric_index_change:{version}'
+    # Changelog entry meaning "rebuild everything"
+    RESET = 'reset'
+    MAX_DELTA = 100
+    CHANGE_TTL = 60 * 60
+    INITIAL_CAPACITY = 256
+
+    # Weights of the fuzzy channels in BiometricSecurity.calculate_similarity
+    LENGTH_WEIGHT = 0.3
+    FREQUENCY_WEIGHT = 0.4
+    # Adjacent length buckets differ by this ratio
+    LENGTH_BUCKET_RATIO = 1.1
+    # Characters are hashed into bands and each band's share of the template
+    # is quantized; the resulting vector is split into groups and templates
+    # sharing any whole group are candidates
+    SKETCH_BANDS = 8
+    SKETCH_GROUPS = 4
+    SKETCH_LEVELS = 20
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = None
+        self._reset()
+
+    def _reset(self):
+        self._template_ids: List[int] = []        # row -> template pk
+        self._member_ids: List[int] = []          # row -> member pk
+        self._rows: Dict[int, int] = {}           # template pk -> row
+        self._primary: Dict[str, int] = {}        # primary_hash -> template pk
+        self._secondary: Dict[str, int] = {}      # secondary_hash -> template pk
+        self._primary_of: Dict[int, str] = {}     # template pk -> primary_hash
+        self._secondary_of: Dict[int, str] = {}
+        self._patterns: List[str] = []            # row -> pattern signature
+        self._blocks: Dict[tuple, Set[int]] = {}  # blocking key -> template pks
+        self._block_keys: Dict[int, List[tuple]] = {}  # template pk -> its blocking keys
+        self._columns: Dict[str, int] = {}        # char -> matrix column
+        self._lengths = np.zeros(self.INITIAL_CAPACITY, dtype=np.float64)
+        self._matrix = np.zeros((self.INITIAL_CAPACITY, 0), dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # Loading and invalidation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _load_rows(queryset):
+        """(template pk, member pk, features) for the given BiometricTemplate rows"""
+        rows = queryset.values_list(
+            'pk', 'member_id', 'primary_hash', 'secondary_hash',
+            'length_signature', 'pattern_signature', 'char_frequency'
+        )
+        for template_pk, member_pk, primary, secondary, length, pattern, frequency in rows.iterator():
+            yield template_pk, member_pk, {
+                'primary_hash': primary,
+                'secondary_hash': secondary,
+                'length_signature': length,
+                'pattern_signature': pattern,
+                'char_frequency': frequency or {},
+            }
+
+    def _rebuild(self, version):
+        from .models import BiometricTemplate
+
+        self._reset()
+        for template_pk, member_pk, features in self._load_rows(BiometricTemplate.objects.all()):
+            self._upsert(template_pk, member_pk, features)
+        self._version = version
+        self._loaded = True
+        print(f"Biometric index built: {len(self._template_ids)} templates")
+
+    def _catch_up(self, shared_version):
+        """Replay the changelog up to shared_version; False when a rebuild is needed"""
+        from .models import BiometricTemplate
+
+        version = self._version
+        if not isinstance(version, int) or not version < shared_version <= version + self.MAX_DELTA:
+            return False
+        keys = [self.CHANGE_CACHE_KEY.format(version=v) for v in range(version + 1, shared_version + 1)]
+        changes = cache.get_many(keys)
+        if len(changes) != len(keys) or self.RESET in changes.values():
+            return False
+
+        # Each entry only names a template: its current row is the change
+        template_pks = set(changes.values())
+        for template_pk, member_pk, features in self._load_rows(BiometricTemplate.objects.filter(pk__in=template_pks)):
+            self._upsert(template_pk, member_pk, features)
+            template_pks.discard(template_pk)
+        for template_pk in template_pks:
+            if template_pk in self._rows:
+                self._remove(template_pk)
+        self._version = shared_version
+        return True
+
+    def _shared_version(self):
+        version = cache.get(self.VERSION_CACHE_KEY)
+        if version is None:
+            # First use (or the cache was flushed): start the changelog
+            cache.add(self.VERSION_CACHE_KEY, 0, None)
+            version = cache.get(self.VERSION_CACHE_KEY)
+        return version
+
+    def _ensure_current(self):
+        """Build on first use and catch up when another process changed the index"""
+        shared_version = self._shared_version()
+        if self._loaded and (shared_version is None or shared_version == self._version):
+            return
+        with self._lock:
+            if not self._loaded:
+                self._rebuild(shared_version)
+            elif shared_version is not None and shared_version != self._version and not self._catch_up(shared_version):
+                self._rebuild(shared_version)
+
+    def _publish(self, change):
+        """Record a change under the next shared version and return that version"""
+        cache.add(self.VERSION_CACHE_KEY, 0, None)
+        version = cache.incr(self.VERSION_CACHE_KEY)
+        cache.set(self.CHANGE_CACHE_KEY.format(version=version), change, self.CHANGE_TTL)
+        return version
+
+    def _applied(self, version):
+        """Advance past our own change unless other changes came in between"""
+        if self._version == version - 1:
+            self._version = version
+
+    def invalidate(self):
+        """Drop the index in every process, e.g. after a bulk template import"""
+        with self._lock:
+            self._loaded = False
+            self._reset()
+            self._publish(self.RESET)
+
+    def refresh_template(self, template):
+        """Incrementally apply a saved template to the index"""
+        with self._lock:
+            version = self._publish(template.pk)
+            # Not built yet: the first lookup loads the saved row anyway
+            if self._loaded:
+                self._upsert(template.pk, template.member_id, template.features)
+                self._applied(version)
+
+    def remove_template(self, template_pk):
+        """Incrementally drop a deleted template from the index"""
+        with self._lock:
+            version = self._publish(template_pk)
+            if self._loaded:
+                if template_pk in self._rows:
+                    self._remove(template_pk)
+                self._applied(version)
+
+    # ------------------------------------------------------------------
+    # Blocking keys
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _length_bucket(cls, length):
+        return int(math.log(max(length, 1)) / math.log(cls.LENGTH_BUCKET_RATIO))
+
+    @classmethod
+    def _sketch(cls, char_frequency):
+        """(group, quantized band shares) keys of a char-frequency distribution"""
+        total = sum(char_frequency.values())
+        if not total:
+            return []
+        bands = [0] * cls.SKETCH_BANDS
+        for char, count in char_frequency.items():
+            bands[zlib.crc32(char.encode()) % cls.SKETCH_BANDS] += count
+        levels = tuple(round(share / total * cls.SKETCH_LEVELS) for share in bands)
+        size = cls.SKETCH_BANDS // cls.SKETCH_GROUPS
+        return [(group, levels[group * size:(group + 1) * size]) for group in range(cls.SKETCH_GROUPS)]
+
+    def _keys_for(self, features):
+        keys = [
+            ('primary', features['primary_hash']),
+            ('secondary', features['secondary_hash']),
+            ('pattern', features['pattern_signature']),
+        ]
+        if features['length_signature']:
+            keys.append(('length', self._length_bucket(features['length_signature'])))
+        keys.extend(('sketch',) + key for key in self._sketch(features['char_frequency']))
+        return keys
+
+    def _candidates(self, features, threshold):
+        """Template pks from the blocks that can reach the threshold"""
+        blocks = self._blocks
+        candidates = set()
+        for key in (
+            ('primary', features.get('primary_hash')),
+            ('secondary', features.get('secondary_hash')),
+            ('pattern', features.get('pattern_signature')),
+        ):
+            candidates |= blocks.get(key, set())
+
+        length = features.get('length_signature', 0)
+        if threshold <= self.LENGTH_WEIGHT and length:
+            # length similarity is min/max, so it needs a ratio of at least this
+            ratio = threshold / self.LENGTH_WEIGHT
+            if ratio <= 0:
+                return set(self._rows)
+            low, high = self._length_bucket(length * ratio), self._length_bucket(length / ratio)
+            for bucket in range(low, high + 1):
+                candidates |= blocks.get(('length', bucket), set())
+
+        if threshold <= self.FREQUENCY_WEIGHT:
+            if threshold <= 0:
+                return set(self._rows)
+            # Approximate (LSH-style): near distributions share a band level
+            for key in self._sketch(features.get('char_frequency') or {}):
+                candidates |= blocks.get(('sketch',) + key, set())
+
+        return candidates
+
+    def _add_blocks(self, template_pk, features):
+        keys = self._keys_for(features)
+        for key in keys:
+            self._blocks.setdefault(key, set()).add(template_pk)
+        self._block_keys[template_pk] = keys
+
+    def _remove_blocks(self, template_pk):
+        for key in self._block_keys.pop(template_pk, []):
+            members = self._blocks.get(key)
+            if members is not None:
+                members.discard(template_pk)
+                if not members:
+                    del self._blocks[key]
+
+    # ------------------------------------------------------------------
+    # Row storage
+    # ------------------------------------------------------------------
+
+    def _column(self, char):
+        column = self._columns.get(char)
+        if column is None:
+            column = len(self._columns)
+            self._columns[char] = column
+            if column >= self._matrix.shape[1]:
+                extra = max(16, self._matrix.shape[1])
+                self._matrix = np.pad(self._matrix, ((0, 0), (0, extra)))
+        return column
+
+    def _vector(self, char_frequency, grow=False):
+        vector = np.zeros(self._matrix.shape[1], dtype=np.float32)
+        for char, count in char_frequency.items():
+            column = self._column(char) if grow else self._columns.get(char)
+            if column is None:
+                continue
+            if column >= vector.shape[0]:
+                vector = np.pad(vector, (0, self._matrix.shape[1] - vector.shape[0]))
+            vector[column] = count
+        return vector
+
+    def _upsert(self, template_pk, member_pk, features):
+        if template_pk in self._rows:
+            self._remove(template_pk)
+
+        row = len(self._template_ids)
+        if row >= self._matrix.shape[0]:
+            capacity = max(self.INITIAL_CAPACITY, self._matrix.shape[0] * 2)
+            self._matrix = np.pad(self._matrix, ((0, capacity - self._matrix.shape[0]), (0, 0)))
+            self._lengths = np.pad(self._lengths, (0, capacity - self._lengths.shape[0]))
+
+        vector = self._vector(features['char_frequency'], grow=True)
+        self._matrix[row, :] = 0
+        self._matrix[row, :vector.shape[0]] = vector
+        self._lengths[row] = features['length_signature']
+        self._patterns.append(features['pattern_signature'])
+        self._template_ids.append(template_pk)
+        self._member_ids.append(member_pk)
+        self._rows[template_pk] = row
+        self._primary[features['primary_hash']] = template_pk
+        self._secondary[features['secondary_hash']] = template_pk
+        self._primary_of[template_pk] = features['primary_hash']
+        self._secondary_of[template_pk] = features['secondary_hash']
+        self._add_blocks(template_pk, features)
+
+    def _remove(self, template_pk):
+        self._remove_blocks(template_pk)
+        row = self._rows.pop(template_pk)
+        last = len(self._template_ids) - 1
+
+        # Swap the last row into the freed slot to keep the matrix dense
+        if row != last:
+            moved_pk = self._template_ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._lengths[row] = self._lengths[last]
+            self._patterns[row] = self._patterns[last]
+            self._template_ids[row] = moved_pk
+            self._member_ids[row] = self._member_ids[last]
+            self._rows[moved_pk] = row
+        self._matrix[last] = 0
+        self._lengths[last] = 0
+        self._patterns.pop()
+        self._template_ids.pop()
+        self._member_ids.pop()
+
+        primary_hash = self._primary_of.pop(template_pk, None)
+        if self._primary.get(primary_hash) == template_pk:
+            del self._primary[primary_hash]
+        secondary_hash = self._secondary_of.pop(template_pk, None)
+        if self._secondary.get(secondary_hash) == template_pk:
+            del self._secondary[secondary_hash]
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def _scores(self, features, rows):
+        """Vectorized equivalent of BiometricSecurity.calculate_similarity for the given rows"""
+        count = len(rows)
+        scores = np.zeros(count, dtype=np.float64)
+        if not count:
+            return scores
+
+        length = features.get('length_signature', 0)
+        if length:
+            lengths = self._lengths[rows]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                length_similarity = 1 - np.abs(lengths - length) / np.maximum(lengths, length)
+            scores = np.maximum(scores, np.where(lengths > 0, length_similarity * self.LENGTH_WEIGHT, 0.0))
+
+        char_frequency = features.get('char_frequency') or {}
+        if char_frequency:
+            matrix = self._matrix[rows]
+            vector = self._vector(char_frequency)
+            # Characters unknown to the index only add to the search side of the union
+            unseen = sum(c for ch, c in char_frequency.items() if ch not in self._columns)
+            total_diff = np.abs(matrix - vector).sum(axis=1) + unseen
+            total_chars = np.maximum(matrix, vector).sum(axis=1) + unseen
+            with np.errstate(divide='ignore', invalid='ignore'):
+                frequency_similarity = np.where(total_chars > 0, 1 - total_diff / total_chars, 0.0)
+            has_frequency = matrix.any(axis=1)
+            scores = np.maximum(scores, np.where(has_frequency, frequency_similarity * self.FREQUENCY_WEIGHT, 0.0))
+
+        pattern = features.get('pattern_signature')
+        secondary = features.get('secondary_hash')
+        primary = features.get('primary_hash')
+        for position, row in enumerate(rows):
+            template_pk = self._template_ids[row]
+            if self._primary_of[template_pk] == primary:
+                scores[position] = 1.0
+            elif self._secondary_of[template_pk] == secondary:
+                scores[position] = max(scores[position], 0.9)
+            elif self._patterns[row] == pattern:
+                scores[position] = max(scores[position], 0.8)
+
+        return scores
+
+    def best_match(self, features: dict, threshold: float, exclude_pk=None) -> Tuple[Optional[int], float]:
+        """Return (member pk, similarity) of the best match at or above threshold"""
+        if not features:
+            return None, 0.0
+
+        self._ensure_current()
+        with self._lock:
+            exact_template = self._primary.get(features.get('primary_hash'))
+            if exact_template is not None:
+                member_pk = self._member_ids[self._rows[exact_template]]
+                if member_pk != exclude_pk:
+                    return member_pk, 1.0
+
+            rows = [self._rows[template_pk] for template_pk in self._candidates(features, threshold)]
+            if exclude_pk is not None:
+                rows = [row for row in rows if self._member_ids[row] != exclude_pk]
+            if not rows:
+                return None, 0.0
+            rows = np.asarray(rows, dtype=np.intp)
+
+            scores = self._scores(features, rows)
+            best = int(np.argmax(scores))
+            similarity = float(scores[best])
+            if similarity < threshold:
+                return None, similarity
+            return self._member_ids[rows[best]], similarity
+
+    def candidate_count(self, features: dict, threshold: float) -> int:
+        """Size of the candidate set a lookup would score (for diagnostics)"""
+        self._ensure_current()
+        with self._lock:
+            return len(self._candidates(features, threshold))
+
+    def __len__(self):
+        self._ensure_current()
+        return len(self._template_ids)
+
+
+# Shared per-process index used by BiometricSecurity lookups
+biometric_index = BiometricIndex()
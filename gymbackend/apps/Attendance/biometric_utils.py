@@ -1,13 +1,21 @@
+import base64
+import binascii
 import hashlib
 import json
 from typing import List, Tuple, Optional
 from apps.Member.models import Member
+from .biometric_index import biometric_index
 
 class BiometricSecurity:
     """Enhanced biometric security with proper duplicate detection"""
     
     SIMILARITY_THRESHOLD = 0.85  # 85% similarity threshold
     MIN_TEMPLATE_QUALITY = 0.7   # Minimum quality score
+    EXTERNAL_SIMILARITY_THRESHOLD = 0.75  # Unknown external sensors
+    # Shorter strings are kept as-is rather than read as base64
+    MIN_BASE64_TEMPLATE_LENGTH = 16
+    KNOWN_SENSORS = {'digital_persona', 'secugen', 'futronic', 'suprema'}
+    SENSOR_ALIASES = {'dp': 'digital_persona', 'sg': 'secugen', 'ft': 'futronic', 'sp': 'suprema'}
     
     @staticmethod
     def extract_biometric_features(raw_biometric_data: str) -> dict:
@@ -112,37 +120,39 @@ class BiometricSecurity:
             if not new_features:
                 return False, None
             
-            # Get all members with biometric data
-            query = Member.objects.filter(biometric_registered=True).exclude(
-                biometric_hash__isnull=True
-            ).exclude(biometric_hash='')
-            
+            exclude_pk = None
             if exclude_member_id:
-                query = query.exclude(athlete_id=exclude_member_id)
+                exclude_pk = Member.objects.filter(athlete_id=exclude_member_id).values_list('pk', flat=True).first()
             
-            for member in query:
-                if not member.biometric_hash:
-                    continue
-                
-                # Check against stored biometric data
-                existing_features = BiometricSecurity.extract_biometric_features(member.biometric_hash)
-                if not existing_features:
-                    continue
-                
-                similarity = BiometricSecurity.calculate_similarity(new_features, existing_features)
-                
-                print(f"Similarity check: {member.athlete_id} = {similarity:.3f}")
-                
-                if similarity >= BiometricSecurity.SIMILARITY_THRESHOLD:
-                    print(f"🚨 DUPLICATE DETECTED: {similarity:.3f} similarity with {member.first_name} {member.last_name}")
-                    return True, member
+            # Only the index's blocking candidates get a full similarity check
+            member_pk, similarity = biometric_index.best_match(
+                new_features, BiometricSecurity.SIMILARITY_THRESHOLD, exclude_pk=exclude_pk
+            )
+            if member_pk is None:
+                return False, None
             
-            return False, None
+            member = Member.objects.filter(pk=member_pk).first()
+            if member:
+                print(f"🚨 DUPLICATE DETECTED: {similarity:.3f} similarity with {member.first_name} {member.last_name}")
+            return member is not None, member
             
         except Exception as e:
             print(f"Duplicate check error: {e}")
             return False, None
     
+    @staticmethod
+    def find_member_by_exact_template(biometric_data: str) -> Optional[Member]:
+        """Find member whose registered template matches the data exactly (indexed lookup)"""
+        from .models import BiometricTemplate
+        
+        if not biometric_data:
+            return None
+        primary_hash = hashlib.sha256(biometric_data.encode()).hexdigest()
+        template = BiometricTemplate.objects.select_related('member').filter(
+            primary_hash=primary_hash, member__biometric_registered=True
+        ).first()
+        return template.member if template else None
+    
     @staticmethod
     def find_member_by_biometric(biometric_data: str) -> Optional[Member]:
         """Find member by biometric data with fuzzy matching"""
@@ -151,27 +161,14 @@ class BiometricSecurity:
             if not search_features:
                 return None
             
-            best_match = None
-            best_similarity = 0.0
-            
-            # Search through all registered members
-            for member in Member.objects.filter(biometric_registered=True).exclude(
-                biometric_hash__isnull=True
-            ).exclude(biometric_hash=''):
-                
-                if not member.biometric_hash:
-                    continue
-                
-                existing_features = BiometricSecurity.extract_biometric_features(member.biometric_hash)
-                if not existing_features:
-                    continue
-                
-                similarity = BiometricSecurity.calculate_similarity(search_features, existing_features)
-                
-                if similarity > best_similarity and similarity >= BiometricSecurity.SIMILARITY_THRESHOLD:
-                    best_similarity = similarity
-                    best_match = member
+            # Search the precomputed feature index instead of every member row
+            member_pk, best_similarity = biometric_index.best_match(
+                search_features, BiometricSecurity.SIMILARITY_THRESHOLD
+            )
+            if member_pk is None:
+                return None
             
+            best_match = Member.objects.filter(pk=member_pk).first()
             if best_match:
                 print(f"✅ Member found: {best_match.first_name} {best_match.last_name} (similarity: {best_similarity:.3f})")
             
@@ -182,128 +179,91 @@ class BiometricSecurity:
             return None
     
     @staticmethod
-    def enhanced_biometric_search(biometric_data: str, sensor_type: str = 'unknown') -> Optional[Member]:
+    def canonicalize_template(biometric_data: str) -> str:
         """
-        Enhanced biometric search specifically for external sensors
-        Different sensors may provide different data formats
+        Canonical form of a template string, applied at registration and scan time
+        Sensors deliver the same template as standard or URL-safe base64, with or
+        without padding and line breaks; those all become padded standard base64.
+        Only canonical encodings are rewritten (unused trailing bits zero), so two
+        distinct strings never share a canonical form. Anything else is only
+        stripped of surrounding whitespace.
         """
+        data = (biometric_data or '').strip()
+        compact = ''.join(data.split()).rstrip('=')
+        if len(compact) < BiometricSecurity.MIN_BASE64_TEMPLATE_LENGTH:
+            return data
+        if '+' not in compact and '/' not in compact:
+            # No standard-only characters: read it as URL-safe
+            compact = compact.replace('-', '+').replace('_', '/')
+        normalized = compact + '=' * (-len(compact) % 4)
         try:
-            print(f"Enhanced search for {sensor_type} sensor data...")
-            
-            # First try standard search
-            member = BiometricSecurity.find_member_by_biometric(biometric_data)
-            if member:
-                return member
-            
-            # Try sensor-specific matching algorithms
-            if sensor_type.lower() in ['digital_persona', 'dp']:
-                return BiometricSecurity._search_digital_persona(biometric_data)
-            elif sensor_type.lower() in ['secugen', 'sg']:
-                return BiometricSecurity._search_secugen(biometric_data)
-            elif sensor_type.lower() in ['futronic', 'ft']:
-                return BiometricSecurity._search_futronic(biometric_data)
-            elif sensor_type.lower() in ['suprema', 'sp']:
-                return BiometricSecurity._search_suprema(biometric_data)
-            else:
-                # Generic external sensor search with lower threshold
-                return BiometricSecurity._search_generic_external(biometric_data)
-            
-        except Exception as e:
-            print(f"Enhanced search error: {e}")
-            return None
+            decoded = base64.b64decode(normalized, validate=True)
+        except (binascii.Error, ValueError):
+            return data
+        encoded = base64.b64encode(decoded).decode()
+        if encoded != normalized:
+            # Non-zero trailing bits: another string decodes to the same bytes
+            return data
+        return encoded
     
     @staticmethod
-    def _search_digital_persona(biometric_data: str) -> Optional[Member]:
-        """Digital Persona specific search algorithm"""
-        try:
-            # Digital Persona often provides base64 encoded template data
-            # We may need to normalize or decode it
-            normalized_data = biometric_data
-            
-            # If it looks like base64, try to decode and re-encode consistently
-            try:
-                import base64
-                decoded = base64.b64decode(biometric_data)
-                normalized_data = base64.b64encode(decoded).decode()
-            except:
-                pass  # Use original data if decoding fails
-            
-            return BiometricSecurity.find_member_by_biometric(normalized_data)
-            
-        except Exception as e:
-            print(f"Digital Persona search error: {e}")
-            return None
+    def canonical_hash(biometric_data: str) -> str:
+        """Indexed lookup key of a template's canonical form"""
+        return hashlib.sha256(BiometricSecurity.canonicalize_template(biometric_data).encode()).hexdigest()
     
     @staticmethod
-    def _search_secugen(biometric_data: str) -> Optional[Member]:
-        """SecuGen specific search algorithm"""
-        try:
-            # SecuGen may provide WSQ or other formats
-            # For now, use standard search
-            return BiometricSecurity.find_member_by_biometric(biometric_data)
-            
-        except Exception as e:
-            print(f"SecuGen search error: {e}")
+    def find_member_by_canonical_template(biometric_data: str) -> Optional[Member]:
+        """Find member whose registered template has the same canonical form (indexed lookup)"""
+        from .models import BiometricTemplate
+        
+        if not biometric_data:
             return None
+        template = BiometricTemplate.objects.select_related('member').filter(
+            canonical_hash=BiometricSecurity.canonical_hash(biometric_data),
+            member__biometric_registered=True
+        ).first()
+        return template.member if template else None
     
     @staticmethod
-    def _search_futronic(biometric_data: str) -> Optional[Member]:
-        """Futronic specific search algorithm"""
-        try:
-            # Futronic specific processing if needed
-            return BiometricSecurity.find_member_by_biometric(biometric_data)
-            
-        except Exception as e:
-            print(f"Futronic search error: {e}")
-            return None
+    def sensor_threshold(sensor_type: str) -> float:
+        """Fuzzy matching threshold for an external sensor type (aliases allowed)"""
+        sensor = BiometricSecurity.SENSOR_ALIASES.get(sensor_type.lower(), sensor_type.lower())
+        if sensor in BiometricSecurity.KNOWN_SENSORS:
+            return BiometricSecurity.SIMILARITY_THRESHOLD
+        # Unknown external sensors get a slightly lower threshold
+        return BiometricSecurity.EXTERNAL_SIMILARITY_THRESHOLD
     
     @staticmethod
-    def _search_suprema(biometric_data: str) -> Optional[Member]:
-        """Suprema specific search algorithm"""
+    def enhanced_biometric_search(biometric_data: str, sensor_type: str = 'unknown') -> Optional[Member]:
+        """
+        Biometric search for external sensors
+        Resolves the canonical template with one indexed lookup; only a miss
+        falls back to a single fuzzy search at the sensor's threshold
+        """
         try:
-            # Suprema specific processing if needed
-            return BiometricSecurity.find_member_by_biometric(biometric_data)
+            print(f"Enhanced search for {sensor_type} sensor data...")
+            
+            member = BiometricSecurity.find_member_by_canonical_template(biometric_data)
+            if member:
+                print(f"✅ Canonical template match: {member.first_name} {member.last_name}")
+                return member
             
-        except Exception as e:
-            print(f"Suprema search error: {e}")
-            return None
-    
-    @staticmethod
-    def _search_generic_external(biometric_data: str) -> Optional[Member]:
-        """Generic external sensor search with relaxed matching"""
-        try:
             search_features = BiometricSecurity.extract_biometric_features(biometric_data)
             if not search_features:
                 return None
             
-            best_match = None
-            best_similarity = 0.0
-            
-            # Use lower threshold for external sensors
-            EXTERNAL_THRESHOLD = 0.75  # Slightly lower than standard
-            
-            for member in Member.objects.filter(biometric_registered=True).exclude(
-                biometric_hash__isnull=True
-            ).exclude(biometric_hash=''):
-                
-                if not member.biometric_hash:
-                    continue
-                
-                existing_features = BiometricSecurity.extract_biometric_features(member.biometric_hash)
-                if not existing_features:
-                    continue
-                
-                similarity = BiometricSecurity.calculate_similarity(search_features, existing_features)
-                
-                if similarity > best_similarity and similarity >= EXTERNAL_THRESHOLD:
-                    best_similarity = similarity
-                    best_match = member
+            member_pk, best_similarity = biometric_index.best_match(
+                search_features, BiometricSecurity.sensor_threshold(sensor_type)
+            )
+            if member_pk is None:
+                return None
             
+            best_match = Member.objects.filter(pk=member_pk).first()
             if best_match:
                 print(f"✅ External sensor match: {best_match.first_name} {best_match.last_name} (similarity: {best_similarity:.3f})")
             
             return best_match
             
         except Exception as e:
-            print(f"Generic external search error: {e}")
-            return None
\ No newline at end of file
+            print(f"Enhanced search error: {e}")
+            return None
@@ -10,12 +10,46 @@ from django.utils import timezone
 from datetime import date
 from apps.Member.models import Member
 from apps.Authentication.models import WebAuthnCredential
+from django.conf import settings
 from apps.Attendance.models import Attendance, CheckInPhoto
+from apps.Attendance.checkin_guard import checked_in_today, get_or_create_today, idempotent_checkin
+from apps.Attendance.credential_registry import credential_registry
+from apps.Attendance.instrumentation import CheckInTrace
 
 def get_afghanistan_time(utc_time):
     """Convert UTC time to Afghanistan time (UTC+4:30)"""
     return utc_time + timedelta(hours=4, minutes=30)
 
+def kiosk_debug_enabled():
+    """Debug payloads on kiosk endpoints are opt-in via KIOSK_DEBUG_PAYLOADS"""
+    return getattr(settings, 'KIOSK_DEBUG_PAYLOADS', False)
+
+def send_checkin_notification(member, message, trace):
+    """Save the member's check-in notification and push it over the WebSocket"""
+    from channels.layers import get_channel_layer
+    from asgiref.sync import async_to_sync
+    from apps.Notifications.models import Notification
+    
+    with trace.span('notification_create'):
+        notification = Notification.objects.create(user=member.user, message=message)
+    
+    with trace.span('websocket_send'):
+        channel_layer = get_channel_layer()
+        notification_data = {
+            "id": notification.id,
+            "message": notification.message,
+            "created_at": notification.created_at.isoformat(),
+            "is_read": notification.is_read,
+            "link": "/member-dashboard/attendance"
+        }
+        async_to_sync(channel_layer.group_send)(
+            f"user_{member.user.id}_notifications",
+            {
+                "type": "send_notification",
+                "notification": notification_data
+            }
+        )
+
 @csrf_exempt
 def webauthn_register_options(request):
     import json
@@ -117,6 +151,15 @@ def webauthn_register_complete(request):
         member.biometric_registered = True
         member.save()
         
+        # Record the credential so kiosk scans resolve it with one indexed lookup
+        if credential_response and credential_response.get('rawId'):
+            credential_registry.register(
+                member,
+                credential_response.get('rawId'),
+                public_key=(credential_response.get('response') or {}).get('publicKey', ''),
+                rp_id=request.get_host().split(':')[0]
+            )
+        
         # Send notification to member
         try:
             from channels.layers import get_channel_layer
@@ -165,58 +208,31 @@ def webauthn_register_complete(request):
 
     
 @csrf_exempt
+@idempotent_checkin
 def webauthn_check_in(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
+    trace = CheckInTrace('Biometric')
     try:
         data = json.loads(request.body)
         athlete_id = data.get('athlete_id')
-        member = Member.objects.get(athlete_id=athlete_id)
+        with trace.span('member_lookup'):
+            member = Member.objects.get(athlete_id=athlete_id)
         if not member.biometric_registered:
             return JsonResponse({'error': 'Fingerprint not registered'}, status=400)
-        # Mark attendance for today
-        from datetime import date
-        from django.utils import timezone
-        today = date.today()
-        attendance, created = Attendance.objects.get_or_create(
-            member=member,
-            date=today,
-            defaults={
-                'check_in_time': timezone.now(),
-                'verification_method': 'Biometric'
-            }
-        )
+        # Mark attendance for today (answered from the cache on repeats)
+        with trace.span('attendance_write'):
+            attendance, created = get_or_create_today(member, 'Biometric')
         if not created:
             return JsonResponse({'message': 'Already checked in today'}, status=200)
         
         # Send notification to member
         if created:
-            from channels.layers import get_channel_layer
-            from asgiref.sync import async_to_sync
-            from apps.Notifications.models import Notification
-            
             try:
-                # Save to database
-                notification = Notification.objects.create(
-                    user=member.user,
-                    message=f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}"
-                )
-                
-                # Send real-time notification
-                channel_layer = get_channel_layer()
-                notification_data = {
-                    "id": notification.id,
-                    "message": notification.message,
-                    "created_at": notification.created_at.isoformat(),
-                    "is_read": notification.is_read,
-                    "link": "/member-dashboard/attendance"
-                }
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{member.user.id}_notifications",
-                    {
-                        "type": "send_notification",
-                        "notification": notification_data
-                    }
+                send_checkin_notification(
+                    member,
+                    f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                    trace
                 )
             except Exception as e:
                 print(f"Failed to send check-in notification: {e}")
@@ -226,69 +242,82 @@ def webauthn_check_in(request):
         import traceback
         print(traceback.format_exc())
         return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
     
 @csrf_exempt
 def attendance_history(request):
+    """
+    Attendance history, newest first.
+    
+    Without paging parameters the full list is returned (legacy format).
+    `page_size`/`cursor` switch to keyset pagination on (date, check_in_time, id)
+    and `format=ndjson` or `format=stream` stream every matching row.
+    """
     if request.method != 'GET':
         return JsonResponse({'error': 'GET method required'}, status=405)
     
     try:
+        from django.http import StreamingHttpResponse
+        from . import history
+        
         date = request.GET.get('date')
+        start_date = request.GET.get('start_date')
+        end_date = request.GET.get('end_date')
         member_id = request.GET.get('member_id')
         today_only = request.GET.get('today_only') == 'true'
+        output_format = request.GET.get('format')
+        cursor = request.GET.get('cursor')
+        page_size = request.GET.get('page_size')
         
-        qs = Attendance.objects.all().select_related('member').order_by('-date', '-check_in_time')
+        qs = history.history_queryset()
         
         # Apply date filters
-        if today_only:
-            from datetime import date as date_class
-            today = date_class.today()
-            qs = qs.filter(date=today)
-        elif date:
-            try:
-                from datetime import datetime
-                filter_date = datetime.strptime(date, '%Y-%m-%d').date()
-                qs = qs.filter(date=filter_date)
-            except ValueError:
-                return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
+        try:
+            if today_only:
+                from datetime import date as date_class
+                qs = qs.filter(date=date_class.today())
+            elif date:
+                qs = qs.filter(date=history.parse_date(date))
+            else:
+                if start_date:
+                    qs = qs.filter(date__gte=history.parse_date(start_date))
+                if end_date:
+                    qs = qs.filter(date__lte=history.parse_date(end_date))
+        except ValueError:
+            return JsonResponse({'error': 'Invalid date format. Use YYYY-MM-DD'}, status=400)
         
         # If member_id is provided, filter to that member
         if member_id:
-            try:
-                from apps.Member.models import Member
-                member = Member.objects.get(athlete_id=member_id)
-                qs = qs.filter(member=member)
-            except Member.DoesNotExist:
+            member_pk = Member.objects.filter(athlete_id=member_id).values_list('pk', flat=True).first()
+            if member_pk is None:
                 return JsonResponse({'error': 'Member not found'}, status=404)
+            qs = qs.filter(member_id=member_pk)
         
-        # Build response data
-        data = []
-        for attendance in qs:
+        # Full export, streamed in keyset batches
+        if output_format == 'ndjson':
+            return StreamingHttpResponse(history.stream_ndjson(qs), content_type='application/x-ndjson')
+        if output_format == 'stream':
+            return StreamingHttpResponse(history.stream_json_array(qs), content_type='application/json')
+        
+        # Keyset pagination
+        if cursor or page_size:
             try:
-                # Check if attendance has a photo
-                has_photo = hasattr(attendance, 'photo')
-                photo_url = None
-                if has_photo:
-                    try:
-                        photo_url = attendance.photo.photo.url
-                    except:
-                        has_photo = False
-                
-                data.append({
-                    'id': attendance.id,
-                    'member_id': attendance.member.athlete_id,
-                    'member_name': f"{attendance.member.first_name} {attendance.member.last_name}",
-                    'date': attendance.date.strftime('%Y-%m-%d'),
-                    'check_in_time': attendance.check_in_time.isoformat() if attendance.check_in_time else None,
-                    'check_in_datetime': attendance.check_in_time.isoformat() if attendance.check_in_time else None,
-                    'verification_method': attendance.verification_method or 'Manual',
-                    'has_photo': bool(has_photo),
-                    'photo_url': str(photo_url) if photo_url else None
-                })
-            except Exception as record_error:
-                print(f"Error processing attendance record {attendance.id}: {record_error}")
-                continue
+                size = min(max(int(page_size or history.DEFAULT_PAGE_SIZE), 1), history.MAX_PAGE_SIZE)
+            except ValueError:
+                return JsonResponse({'error': 'page_size must be an integer'}, status=400)
+            try:
+                rows, next_cursor = history.page(qs, cursor, size)
+            except history.InvalidCursor as e:
+                return JsonResponse({'error': str(e)}, status=400)
+            return JsonResponse({
+                'results': [history.serialize_attendance(attendance) for attendance in rows],
+                'next_cursor': next_cursor,
+                'has_more': next_cursor is not None,
+            })
         
+        # Legacy: full list
+        data = [history.serialize_attendance(attendance) for attendance in qs]
         return JsonResponse(data, safe=False)
         
     except Exception as e:
@@ -311,15 +340,6 @@ def kiosk_authentication_options(request):
         # Generate a challenge for authentication
         challenge = base64.urlsafe_b64encode(b'kiosk-challenge-' + str(timezone.now().timestamp()).encode()).decode('utf-8')
         
-        # Get all registered credentials (for any member to authenticate)
-        credentials = []
-        for member in Member.objects.filter(biometric_registered=True):
-            if member.biometric_hash:
-                credentials.append({
-                    'type': 'public-key',
-                    'id': member.biometric_hash,
-                })
-        
         options = {
             'challenge': challenge,
             # Completely omit allowCredentials for true discoverable credentials
@@ -336,6 +356,7 @@ def kiosk_authentication_options(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 @csrf_exempt
+@idempotent_checkin
 def kiosk_checkin(request):
     """
     Handles kiosk check-in by identifying the member from WebAuthn assertion
@@ -344,12 +365,11 @@ def kiosk_checkin(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
     
+    trace = CheckInTrace('Biometric-Kiosk')
     try:
         data = json.loads(request.body)
         assertion = data.get('assertion')
         
-        print(f"Received kiosk check-in request: {data}")
-        
         if not assertion:
             return JsonResponse({'error': 'Missing assertion data'}, status=400)
         
@@ -365,98 +385,42 @@ def kiosk_checkin(request):
         # ENHANCED MEMBER DETECTION using biometric matching
         from .biometric_utils import BiometricSecurity
         
-        print(f"Searching for member with credential ID: {credential_id}")
-        
-        # For WebAuthn kiosk mode, we need to identify the member from the credential
-        # The credential_id should match the stored biometric_hash
-        member = None
-        
-        # Get all registered members for debugging
-        all_biometric_members = Member.objects.filter(biometric_registered=True).exclude(biometric_hash__isnull=True)
-        print(f"Available biometric members: {[(m.athlete_id, m.first_name, m.biometric_hash[:20] + '...' if m.biometric_hash else 'None') for m in all_biometric_members]}")
-        
-        # Try exact match first
-        try:
-            member = Member.objects.get(biometric_hash=credential_id, biometric_registered=True)
-            print(f"✅ Exact match found: {member.first_name} {member.last_name} (ID: {member.athlete_id})")
-        except Member.DoesNotExist:
-            # For kiosk mode, the credential ID from WebAuthn should be the rawId
-            # Let's also try matching with the rawId field from the assertion
-            raw_id = assertion.get('rawId')
-            if raw_id and raw_id != credential_id:
-                try:
-                    member = Member.objects.get(biometric_hash=raw_id, biometric_registered=True)
-                    print(f"✅ RawId match found: {member.first_name} {member.last_name}")
-                except Member.DoesNotExist:
-                    pass
-            
-            # If still no match, try the credential id from the assertion
-            if not member:
-                cred_id = assertion.get('id')
-                if cred_id and cred_id != credential_id:
-                    try:
-                        member = Member.objects.get(biometric_hash=cred_id, biometric_registered=True)
-                        print(f"✅ Credential ID match found: {member.first_name} {member.last_name}")
-                    except Member.DoesNotExist:
-                        pass
-            
-            # If still no exact match, try enhanced biometric matching
+        # Resolve rawId/id through the credential registry (cache hit or one indexed query)
+        with trace.span('member_lookup'):
+            member = credential_registry.resolve(credential_id, assertion.get('rawId'), assertion.get('id'))
             if not member:
+                # If still no exact match, try enhanced biometric matching
                 member = BiometricSecurity.find_member_by_biometric(credential_id)
-                
-            if not member:
-                return JsonResponse({
-                    'error': 'Fingerprint not recognized. Please ensure your fingerprint is properly registered.',
-                    'error_code': 'BIOMETRIC_NOT_FOUND',
-                    'debug_info': {
-                        'credential_id': credential_id,
-                        'raw_id': assertion.get('rawId'),
-                        'assertion_id': assertion.get('id'),
-                        'available_members': len(all_biometric_members)
-                    }
-                }, status=404)
-        
-        # Check if already checked in today
-        today = date.today()
-        attendance, created = Attendance.objects.get_or_create(
-            member=member,
-            date=today,
-            defaults={
-                'check_in_time': timezone.now(),
-                'verification_method': 'Biometric-Kiosk'
+        
+        if not member:
+            response_data = {
+                'error': 'Fingerprint not recognized. Please ensure your fingerprint is properly registered.',
+                'error_code': 'BIOMETRIC_NOT_FOUND',
             }
-        )
+            if kiosk_debug_enabled():
+                response_data['debug_info'] = {
+                    'credential_id': credential_id,
+                    'raw_id': assertion.get('rawId'),
+                    'assertion_id': assertion.get('id'),
+                    'available_members': Member.objects.filter(biometric_registered=True).count()
+                }
+            return JsonResponse(response_data, status=404)
+        
+        print(f"✅ Credential match found: {member.first_name} {member.last_name} (ID: {member.athlete_id})")
+        
+        # Check if already checked in today (cache first, then the database)
+        with trace.span('attendance_write'):
+            attendance, created = get_or_create_today(member, 'Biometric-Kiosk')
 
         print(f"Check-in {'created' if created else 'already existed'} for {member.first_name}")
 
         # Send notification to member
         if created:
-            from channels.layers import get_channel_layer
-            from asgiref.sync import async_to_sync
-            from apps.Notifications.models import Notification
-            
             try:
-                # Save to database
-                notification = Notification.objects.create(
-                    user=member.user,
-                    message=f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}"
-                )
-                
-                # Send real-time notification
-                channel_layer = get_channel_layer()
-                notification_data = {
-                    "id": notification.id,
-                    "message": notification.message,
-                    "created_at": notification.created_at.isoformat(),
-                    "is_read": notification.is_read,
-                    "link": "/member-dashboard/attendance"
-                }
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{member.user.id}_notifications",
-                    {
-                        "type": "send_notification",
-                        "notification": notification_data
-                    }
+                send_checkin_notification(
+                    member,
+                    f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                    trace
                 )
             except Exception as e:
                 print(f"Failed to send check-in notification: {e}")
@@ -480,6 +444,49 @@ def kiosk_checkin(request):
         import traceback
         print(traceback.format_exc())
         return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
+
+@csrf_exempt
+def kiosk_sync_checkins(request):
+    """
+    Batch upload of check-ins a kiosk queued while offline.
+    
+    The raw body must be signed with KIOSK_SYNC_SECRET (hex HMAC-SHA256 in
+    the X-Kiosk-Signature header). Body: {"kiosk_id": "...", "events": [...]}
+    """
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    
+    from .kiosk_sync import BatchRejected, TRACE_METHOD, verify_signature, ingest_batch, notify_batch
+    
+    trace = CheckInTrace(TRACE_METHOD)
+    try:
+        verify_signature(request)
+        data = json.loads(request.body)
+        kiosk_id = str(data.get('kiosk_id') or 'unknown')[:64]
+        created, results = ingest_batch(kiosk_id, data.get('events'), trace)
+        notify_batch(kiosk_id, created, trace)
+        
+        return JsonResponse({
+            'success': True,
+            'created': len(created),
+            'duplicates': sum(1 for result in results if result['status'] == 'duplicate'),
+            'rejected': sum(1 for result in results if result['status'] == 'rejected'),
+            'results': results,
+        })
+        
+    except BatchRejected as e:
+        return JsonResponse({'error': str(e), 'error_code': e.error_code}, status=e.status)
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        print(f"Kiosk sync error: {e}")
+        import traceback
+        print(traceback.format_exc())
+        return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
 
 @csrf_exempt
 def set_member_pin(request):
@@ -524,19 +531,11 @@ def set_member_pin(request):
             }, status=400)
         
         # Save reference photo
-        if photo_data.startswith('data:image/'):
-            format, imgstr = photo_data.split(';base64,')
-            ext = 'jpg'
-        else:
-            imgstr = photo_data
-            ext = 'jpg'
-        
-        from django.core.files.base import ContentFile
+        from .photo_pipeline import DecodedPhoto
         import uuid
         
-        photo_file = ContentFile(
-            base64.b64decode(imgstr),
-            name=f'{athlete_id}_pin_ref_{uuid.uuid4().hex[:8]}.{ext}'
+        photo_file = DecodedPhoto.from_base64(photo_data).content_file(
+            name=f'{athlete_id}_pin_ref_{uuid.uuid4().hex[:8]}.jpg'
         )
         
         member.pin = pin
@@ -544,6 +543,16 @@ def set_member_pin(request):
         member.pin_reference_photo = photo_file
         member.save()
         
+        # Encode the reference face once so check-ins only encode the live photo
+        # (a failure here only defers the work to the first check-in)
+        try:
+            from .face_encodings import reference_encodings
+            encoding, encoding_error = reference_encodings.refresh(member)
+            if encoding is None:
+                print(f"Reference encoding deferred for {member.athlete_id}: {encoding_error}")
+        except Exception as e:
+            print(f"Reference encoding deferred for {member.athlete_id}: {e}")
+        
         # Send notification to member
         try:
             from channels.layers import get_channel_layer
@@ -660,6 +669,7 @@ def reset_member_pin(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 @csrf_exempt
+@idempotent_checkin
 def external_sensor_checkin(request):
     """
     Handle check-in from external USB fingerprint sensors
@@ -668,11 +678,13 @@ def external_sensor_checkin(request):
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
     
+    trace = CheckInTrace('External')
     try:
         data = json.loads(request.body)
         fingerprint_data = data.get('fingerprint_data')
         sensor_type = data.get('sensor_type', 'unknown')
         quality = data.get('quality', 'unknown')
+        trace.method = f'External-{sensor_type}'
         
         print(f"External sensor check-in: sensor={sensor_type}, quality={quality}")
         
@@ -695,69 +707,36 @@ def external_sensor_checkin(request):
         # Find member by biometric hash
         member = None
         
-        # Try exact match first
-        try:
-            member = Member.objects.get(biometric_hash=biometric_hash, biometric_registered=True)
-            print(f"✅ Exact match found: {member.first_name} {member.last_name}")
-        except Member.DoesNotExist:
-            # Try enhanced matching
-            member = BiometricSecurity.find_member_by_biometric(biometric_hash)
-            
-            if not member:
-                # For external sensors, we might need to try different matching algorithms
-                # depending on the sensor type
-                member = BiometricSecurity.enhanced_biometric_search(biometric_hash, sensor_type)
+        with trace.span('member_lookup'):
+            # Canonical template lookup (indexed), then one fuzzy search at the sensor's threshold
+            member = BiometricSecurity.enhanced_biometric_search(biometric_hash, sensor_type)
         
         if not member:
-            return JsonResponse({
+            response_data = {
                 'error': 'Fingerprint not recognized. Please ensure your fingerprint is registered.',
                 'error_code': 'EXTERNAL_SENSOR_NOT_RECOGNIZED',
                 'sensor_type': sensor_type,
-                'debug_info': {
+            }
+            if kiosk_debug_enabled():
+                response_data['debug_info'] = {
                     'biometric_hash': biometric_hash[:20] + '...',
                     'total_registered_members': Member.objects.filter(biometric_registered=True).count()
                 }
-            }, status=404)
+            return JsonResponse(response_data, status=404)
         
-        # Check if already checked in today
-        today = date.today()
-        attendance, created = Attendance.objects.get_or_create(
-            member=member,
-            date=today,
-            defaults={
-                'check_in_time': timezone.now(),
-                'verification_method': f'External-{sensor_type}'
-            }
-        )
+        # Check if already checked in today (cache first, then the database)
+        with trace.span('attendance_write'):
+            attendance, created = get_or_create_today(member, f'External-{sensor_type}')
         
         print(f"External sensor check-in {'created' if created else 'already existed'} for {member.first_name}")
         
         # Send notification to member
         if created:
-            from channels.layers import get_channel_layer
-            from asgiref.sync import async_to_sync
-            from apps.Notifications.models import Notification
-            
             try:
-                notification = Notification.objects.create(
-                    user=member.user,
-                    message=f"Welcome back, {member.first_name}! Checked in via external sensor at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}"
-                )
-                
-                channel_layer = get_channel_layer()
-                notification_data = {
-                    "id": notification.id,
-                    "message": notification.message,
-                    "created_at": notification.created_at.isoformat(),
-                    "is_read": notification.is_read,
-                    "link": "/member-dashboard/attendance"
-                }
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{member.user.id}_notifications",
-                    {
-                        "type": "send_notification",
-                        "notification": notification_data
-                    }
+                send_checkin_notification(
+                    member,
+                    f"Welcome back, {member.first_name}! Checked in via external sensor at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                    trace
                 )
             except Exception as e:
                 print(f"Failed to send external sensor check-in notification: {e}")
@@ -785,6 +764,8 @@ def external_sensor_checkin(request):
         import traceback
         print(traceback.format_exc())
         return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
 
 @csrf_exempt
 def debug_attendance(request):
@@ -811,25 +792,21 @@ def debug_attendance(request):
         return JsonResponse({'error': str(e)}, status=500)
 
 @csrf_exempt
+@idempotent_checkin
 def pin_checkin(request):
     """Handle PIN-based check-in with photo verification"""
-    print(f"PIN check-in request received: {request.method}")
-    
     if request.method != 'POST':
         return JsonResponse({'error': 'POST required'}, status=405)
     
+    trace = CheckInTrace('PIN+Photo')
     try:
-        print(f"Processing PIN check-in request body: {request.body[:100]}...")
         from django.core.cache import cache
-        from django.core.files.base import ContentFile
         import uuid
         
         data = json.loads(request.body)
-        print(f"JSON parsed successfully: {list(data.keys())}")
         pin = data.get('pin')
         photo_data = data.get('photo')
         ip = request.META.get('REMOTE_ADDR', 'unknown')
-        print(f"PIN: {pin}, Photo data length: {len(photo_data) if photo_data else 0}")
         
         if not pin:
             return JsonResponse({'error': 'PIN is required'}, status=400)
@@ -846,7 +823,8 @@ def pin_checkin(request):
             }, status=429)
         
         try:
-            member = Member.objects.get(pin=pin, pin_enabled=True)
+            with trace.span('member_lookup'):
+                member = Member.objects.get(pin=pin, pin_enabled=True)
         except Member.DoesNotExist:
             # Increment failed attempts
             cache.set(attempts_key, attempts + 1, 300)  # 5 min timeout
@@ -855,6 +833,22 @@ def pin_checkin(request):
                 'error_code': 'INVALID_PIN'
             }, status=400)
         
+        # Repeat attempt: answer from the cache before any face comparison
+        attendance = checked_in_today(member)
+        if attendance is not None:
+            return JsonResponse({
+                'success': True,
+                'member': {
+                    'athlete_id': member.athlete_id,
+                    'name': f"{member.first_name} {member.last_name}",
+                    'first_name': member.first_name,
+                    'last_name': member.last_name,
+                },
+                'already_checked_in': True,
+                'check_in_time': get_afghanistan_time(attendance.check_in_time).isoformat(),
+                'verification_method': 'PIN+Photo'
+            })
+        
         # Photo is required for PIN verification
         if not photo_data:
             return JsonResponse({
@@ -869,16 +863,39 @@ def pin_checkin(request):
                 'error_code': 'NO_REFERENCE_PHOTO'
             }, status=400)
         
-        # Compare photos using face recognition
-        from .face_utils_simple import FaceComparison
+        # Decode once; the same photo is verified and then stored
+        from .photo_pipeline import DecodedPhoto
+        try:
+            with trace.span('decode'):
+                photo = DecodedPhoto.from_base64(photo_data)
+        except Exception as decode_error:
+            return JsonResponse({
+                'error': f'Photo validation failed: {decode_error}',
+                'error_code': 'INVALID_PHOTO'
+            }, status=400)
         
-        print(f"Comparing photos for {member.first_name}")
+        # Compare photos using face recognition (runs in the verification pool)
+        from .face_encodings import get_face_comparison, reference_encodings
+        from .face_service import face_service, FaceServiceBusy, FaceServiceTimeout
+        FaceComparison = get_face_comparison()
         
         try:
-            # Validate current photo has a face
-            print(f"Validating photo for {member.first_name}...")
-            is_valid, validation_error = FaceComparison.validate_face_photo(photo_data)
-            print(f"Photo validation result: valid={is_valid}, error={validation_error}")
+            # Cached reference encoding (computed once per reference photo)
+            with trace.span('reference_encoding'):
+                reference_encoding, comparison_error = reference_encodings.get(member, FaceComparison)
+            if reference_encoding is None:
+                return JsonResponse({
+                    'error': f'Face comparison failed: {comparison_error}',
+                    'error_code': 'COMPARISON_ERROR'
+                }, status=500)
+            
+            # Validate current photo has a face and compare with the reference
+            is_valid, validation_error, is_match, confidence, comparison_error = face_service.verify(
+                reference_encoding,
+                photo,
+                tolerance=FaceComparison.PIN_CHECKIN_TOLERANCE,
+                trace=trace
+            )
             
             if not is_valid:
                 return JsonResponse({
@@ -886,16 +903,6 @@ def pin_checkin(request):
                     'error_code': 'INVALID_PHOTO'
                 }, status=400)
             
-            # Compare with reference photo
-            print(f"Comparing with reference photo: {member.pin_reference_photo.path}")
-            is_match, confidence, comparison_error = FaceComparison.compare_faces(
-                member.pin_reference_photo.path, 
-                photo_data,
-                tolerance=0.3
-            )
-            
-            print(f"Comparison result: match={is_match}, confidence={confidence:.2f}, error={comparison_error}")
-            
             if comparison_error:
                 return JsonResponse({
                     'error': f'Face comparison failed: {comparison_error}',
@@ -912,6 +919,17 @@ def pin_checkin(request):
             
             print(f"Face match successful for {member.first_name}: confidence={confidence:.2f}")
             
+        except FaceServiceBusy:
+            return JsonResponse({
+                'error': 'Face verification is busy. Please try again in a moment.',
+                'error_code': 'FACE_SERVICE_BUSY'
+            }, status=429)
+        except FaceServiceTimeout as timeout_error:
+            print(f"Face comparison timeout for {member.first_name}: {timeout_error}")
+            return JsonResponse({
+                'error': 'Face verification timed out. Please try again.',
+                'error_code': 'FACE_SERVICE_TIMEOUT'
+            }, status=503)
         except Exception as face_error:
             print(f"Face comparison exception: {face_error}")
             import traceback
@@ -921,45 +939,16 @@ def pin_checkin(request):
                 'error_code': 'SYSTEM_ERROR'
             }, status=500)
         
-        # Check if already checked in today
-        today = date.today()
-        attendance, created = Attendance.objects.get_or_create(
-            member=member,
-            date=today,
-            defaults={
-                'check_in_time': timezone.now(),
-                'verification_method': 'PIN+Photo'
-            }
-        )
+        with trace.span('attendance_write'):
+            attendance, created = get_or_create_today(member, 'PIN+Photo')
         
         # Send notification to member
         if created:
-            from channels.layers import get_channel_layer
-            from asgiref.sync import async_to_sync
-            from apps.Notifications.models import Notification
-            
             try:
-                # Save to database
-                notification = Notification.objects.create(
-                    user=member.user,
-                    message=f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}"
-                )
-                
-                # Send real-time notification
-                channel_layer = get_channel_layer()
-                notification_data = {
-                    "id": notification.id,
-                    "message": notification.message,
-                    "created_at": notification.created_at.isoformat(),
-                    "is_read": notification.is_read,
-                    "link": "/member-dashboard/attendance"
-                }
-                async_to_sync(channel_layer.group_send)(
-                    f"user_{member.user.id}_notifications",
-                    {
-                        "type": "send_notification",
-                        "notification": notification_data
-                    }
+                send_checkin_notification(
+                    member,
+                    f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                    trace
                 )
             except Exception as e:
                 print(f"Failed to send check-in notification: {e}")
@@ -967,22 +956,15 @@ def pin_checkin(request):
         # Save photo if provided
         if created and photo_data:
             try:
-                if photo_data.startswith('data:image/'):
-                    format, imgstr = photo_data.split(';base64,')
-                    ext = 'jpg'
-                else:
-                    imgstr = photo_data
-                    ext = 'jpg'
-                
-                photo_file = ContentFile(
-                    base64.b64decode(imgstr),
-                    name=f'{member.athlete_id}_{uuid.uuid4().hex[:8]}.{ext}'
-                )
-                
-                CheckInPhoto.objects.create(
-                    attendance=attendance,
-                    photo=photo_file
-                )
+                with trace.span('photo_store'):
+                    photo_file = photo.content_file(
+                        name=f'{member.athlete_id}_{uuid.uuid4().hex[:8]}.jpg'
+                    )
+                    
+                    CheckInPhoto.objects.create(
+                        attendance=attendance,
+                        photo=photo_file
+                    )
                 
                 print(f"Photo saved for {member.first_name} {member.last_name}")
                 
@@ -1015,6 +997,147 @@ def pin_checkin(request):
         import traceback
         traceback.print_exc()
         return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
+
+@csrf_exempt
+@idempotent_checkin
+def face_identify_checkin(request):
+    """Handle photo-only check-in by identifying the face among enrolled members"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    
+    if not getattr(settings, 'FACE_IDENTIFICATION_ENABLED', False):
+        return JsonResponse({
+            'error': 'Photo-only check-in is not enabled',
+            'error_code': 'FACE_ID_DISABLED'
+        }, status=404)
+    
+    trace = CheckInTrace('Face-ID')
+    try:
+        import uuid
+        
+        data = json.loads(request.body)
+        photo_data = data.get('photo')
+        
+        if not photo_data:
+            return JsonResponse({
+                'error': 'Photo is required',
+                'error_code': 'PHOTO_REQUIRED'
+            }, status=400)
+        
+        from .photo_pipeline import DecodedPhoto
+        try:
+            with trace.span('decode'):
+                photo = DecodedPhoto.from_base64(photo_data)
+        except Exception as decode_error:
+            return JsonResponse({
+                'error': f'Photo validation failed: {decode_error}',
+                'error_code': 'INVALID_PHOTO'
+            }, status=400)
+        
+        from .face_gallery import face_gallery
+        from .face_service import face_service, FaceServiceBusy, FaceServiceTimeout
+        
+        try:
+            # Validate and encode the live photo once (runs in the verification pool)
+            is_valid, validation_error, encoding, encoding_error = face_service.encode_live(photo, trace=trace)
+        except FaceServiceBusy:
+            return JsonResponse({
+                'error': 'Face verification is busy. Please try again in a moment.',
+                'error_code': 'FACE_SERVICE_BUSY'
+            }, status=429)
+        except FaceServiceTimeout as timeout_error:
+            print(f"Face identification timeout: {timeout_error}")
+            return JsonResponse({
+                'error': 'Face verification timed out. Please try again.',
+                'error_code': 'FACE_SERVICE_TIMEOUT'
+            }, status=503)
+        
+        if not is_valid:
+            return JsonResponse({
+                'error': f'Photo validation failed: {validation_error}',
+                'error_code': 'INVALID_PHOTO'
+            }, status=400)
+        
+        if encoding is None:
+            return JsonResponse({
+                'error': f'Face encoding failed: {encoding_error}',
+                'error_code': 'COMPARISON_ERROR'
+            }, status=400)
+        
+        # 1:N search against the in-memory gallery of enrolled faces
+        with trace.span('face_search'):
+            member_pk, distance = face_gallery.identify(encoding)
+        
+        if member_pk is None:
+            response = {
+                'error': 'Face not recognized. Please use your PIN or fingerprint.',
+                'error_code': 'FACE_NOT_RECOGNIZED'
+            }
+            if distance is not None:
+                response['distance'] = float(round(distance, 3))
+            return JsonResponse(response, status=404)
+        
+        with trace.span('member_lookup'):
+            member = Member.objects.select_related('user').filter(pk=member_pk, pin_enabled=True).first()
+        if member is None:
+            # Member disabled since the gallery was updated
+            face_gallery.remove_member(member_pk)
+            return JsonResponse({
+                'error': 'Face not recognized. Please use your PIN or fingerprint.',
+                'error_code': 'FACE_NOT_RECOGNIZED'
+            }, status=404)
+        
+        print(f"Face identified {member.first_name}: distance={distance:.3f}")
+        
+        with trace.span('attendance_write'):
+            attendance, created = get_or_create_today(member, 'Face-ID')
+        
+        if created:
+            try:
+                send_checkin_notification(
+                    member,
+                    f"Welcome back, {member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}",
+                    trace
+                )
+            except Exception as e:
+                print(f"Failed to send check-in notification: {e}")
+            
+            try:
+                with trace.span('photo_store'):
+                    photo_file = photo.content_file(
+                        name=f'{member.athlete_id}_{uuid.uuid4().hex[:8]}.jpg'
+                    )
+                    CheckInPhoto.objects.create(
+                        attendance=attendance,
+                        photo=photo_file
+                    )
+            except Exception as photo_error:
+                print(f"Photo save failed: {photo_error}")
+        
+        return JsonResponse({
+            'success': True,
+            'member': {
+                'athlete_id': member.athlete_id,
+                'name': f"{member.first_name} {member.last_name}",
+                'first_name': member.first_name,
+                'last_name': member.last_name,
+            },
+            'already_checked_in': not created,
+            'check_in_time': get_afghanistan_time(attendance.check_in_time).isoformat(),
+            'verification_method': 'Face-ID',
+            'distance': float(round(distance, 3))
+        })
+        
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON data'}, status=400)
+    except Exception as e:
+        print(f"Face identification check-in error: {e}")
+        traceback.print_exc()
+        return JsonResponse({'error': str(e)}, status=500)
+    finally:
+        trace.finish()
 
 @csrf_exempt
 def today_stats(request):
@@ -1025,11 +1148,12 @@ def today_stats(request):
     try:
         from datetime import date as date_class
         from apps.Member.models import Member
+        from . import rollups
         
         today = date_class.today()
         
-        # Get today's attendance count
-        today_count = Attendance.objects.filter(date=today).count()
+        # Get today's attendance count from the daily rollup
+        today_count = rollups.day_count(today)
         
         # Get total members count
         total_members = Member.objects.count()
@@ -1056,6 +1180,8 @@ def checkin_photos(request):
         
         # Get date range (default: last 7 days)
         days = int(request.GET.get('days', 7))
+        # Thumbnails by default; ?size=full serves the stored photos instead
+        full_size = request.GET.get('size') == 'full'
         start_date = date_class.today() - timedelta(days=days)
         
         # Get photos with attendance info
@@ -1065,6 +1191,8 @@ def checkin_photos(request):
         
         data = []
         for photo in photos:
+            full_url = photo.photo.url if photo.photo else None
+            thumbnail_url = photo.thumbnail.url if photo.thumbnail else None
             data.append({
                 'id': photo.id,
                 'member_id': photo.attendance.member.athlete_id,
@@ -1072,7 +1200,12 @@ def checkin_photos(request):
                 'date': photo.attendance.date.strftime('%Y-%m-%d'),
                 'check_in_time': photo.attendance.check_in_time.isoformat(),
                 'verification_method': photo.attendance.verification_method,
-                'photo_url': photo.photo.url if photo.photo else None,
+                'photo_url': full_url if full_size else (thumbnail_url or full_url),
+                'thumbnail_url': thumbnail_url,
+                'full_photo_url': full_url,
+                'width': photo.width,
+                'height': photo.height,
+                'file_size': photo.file_size,
                 'created_at': photo.created_at.isoformat()
             })
         
@@ -1098,9 +1231,10 @@ def delete_checkin_photo(request, photo_id):
         
         photo = CheckInPhoto.objects.get(id=photo_id)
         
-        # Delete the actual file
-        if photo.photo and os.path.exists(photo.photo.path):
-            os.remove(photo.photo.path)
+        # Delete the actual files
+        for image in (photo.photo, photo.thumbnail):
+            if image and os.path.exists(image.path):
+                os.remove(image.path)
         
         # Delete the database record
         photo.delete()
@@ -0,0 +1,249 @@
+"""
+Fast paths for repeated check-in attempts.
+
+Members often scan twice or press the kiosk button again after they are
+already in. Every check-in for today is remembered in the cache (one key per
+member and day, expiring after the day is over), so a repeat is answered from
+the cache before any face comparison or attendance query runs.
+
+Check-in endpoints also honour an Idempotency-Key request header: the first
+response for a key is stored and replayed for client retries, so a retried
+request never redoes the verification work.
+"""
+import hashlib
+from datetime import date, datetime, time, timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+
+from .models import Attendance
+
+CHECKED_IN_KEY = 'checked_in_{day}_{member_pk}'
+# Keep a day's markers a little past midnight for requests that straddle it
+CHECKED_IN_GRACE_SECONDS = 3600
+
+IDEMPOTENCY_KEY = 'checkin_idempotency_{digest}'
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+DEFAULT_IDEMPOTENCY_TTL = 24 * 60 * 60
+# Upper bound for a request still being processed (face jobs time out well before)
+IDEMPOTENCY_PENDING_SECONDS = 60
+
+
+# ----------------------------------------------------------------------
+# Per-day checked-in markers
+# ----------------------------------------------------------------------
+
+def _checked_in_key(member_pk, day):
+    return CHECKED_IN_KEY.format(day=day.isoformat(), member_pk=member_pk)
+
+
+def _marker_timeout(day):
+    """Seconds until the day's markers may expire, or None for past days"""
+    # Same calendar as the views, which use date.today()
+    day_end = datetime.combine(day + timedelta(days=1), time.min)
+    seconds = int((day_end - datetime.now()).total_seconds()) + CHECKED_IN_GRACE_SECONDS
+    return seconds if seconds > 0 else None
+
+
+def _stand_in(member, day, check_in_time):
+    # Unsaved attendance carrying what the check-in responses need
+    return Attendance(member=member, date=day, check_in_time=check_in_time)
+
+
+def mark_checked_in(attendance):
+    """Remember that the attendance's member is checked in on its date"""
+    timeout = _marker_timeout(attendance.date)
+    if timeout and attendance.check_in_time:
+        cache.set(_checked_in_key(attendance.member_id, attendance.date), attendance.check_in_time, timeout)
+
+
+async def amark_checked_in(attendance):
+    timeout = _marker_timeout(attendance.date)
+    if timeout and attendance.check_in_time:
+        await cache.aset(_checked_in_key(attendance.member_id, attendance.date), attendance.check_in_time, timeout)
+
+
+def mark_checked_in_many(attendances):
+    """Bulk variant of mark_checked_in (kiosk batch sync)"""
+    by_timeout = {}
+    for attendance in attendances:
+        timeout = _marker_timeout(attendance.date)
+        if timeout and attendance.check_in_time:
+            key = _checked_in_key(attendance.member_id, attendance.date)
+            by_timeout.setdefault(timeout, {})[key] = attendance.check_in_time
+    for timeout, values in by_timeout.items():
+        cache.set_many(values, timeout)
+
+
+def forget_checked_in(attendance):
+    """Drop the marker of a deleted (or moved) attendance"""
+    cache.delete(_checked_in_key(attendance.member_id, attendance.date))
+
+
+def checked_in_today(member):
+    """Today's attendance of the member from the cache (unsaved stand-in), or None"""
+    today = date.today()
+    check_in_time = cache.get(_checked_in_key(member.pk, today))
+    if check_in_time is None:
+        return None
+    return _stand_in(member, today, check_in_time)
+
+
+async def achecked_in_today(member):
+    today = date.today()
+    check_in_time = await cache.aget(_checked_in_key(member.pk, today))
+    if check_in_time is None:
+        return None
+    return _stand_in(member, today, check_in_time)
+
+
+def get_or_create_today(member, verification_method):
+    """
+    Attendance.objects.get_or_create for today that skips the database when
+    the member is known to be checked in already
+    Returns: (attendance, created)
+    """
+    attendance = checked_in_today(member)
+    if attendance is not None:
+        return attendance, False
+    attendance, created = Attendance.objects.get_or_create(
+        member=member,
+        date=date.today(),
+        defaults={
+            'check_in_time': timezone.now(),
+            'verification_method': verification_method
+        }
+    )
+    if not created:
+        # New rows are marked by the post_save signal once committed
+        mark_checked_in(attendance)
+    return attendance, created
+
+
+async def aget_or_create_today(member, verification_method):
+    attendance = await achecked_in_today(member)
+    if attendance is not None:
+        return attendance, False
+    attendance, created = await Attendance.objects.aget_or_create(
+        member=member,
+        date=date.today(),
+        defaults={
+            'check_in_time': timezone.now(),
+            'verification_method': verification_method
+        }
+    )
+    if not created:
+        await amark_checked_in(attendance)
+    return attendance, created
+
+
+# ----------------------------------------------------------------------
+# Idempotency keys
+# ----------------------------------------------------------------------
+
+def _idempotency_cache_key(request):
+    key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not key or request.method != 'POST':
+        return None
+    digest = hashlib.sha256(f'{request.path}\n{key}'.encode()).hexdigest()
+    return IDEMPOTENCY_KEY.format(digest=digest)
+
+
+def _fingerprint(request):
+    return hashlib.sha256(request.body).hexdigest()
+
+
+def _replay(record, fingerprint):
+    if record['fingerprint'] != fingerprint:
+        return JsonResponse({
+            'error': 'Idempotency-Key was already used for a different request',
+            'error_code': 'IDEMPOTENCY_KEY_REUSED'
+        }, status=422)
+    if record['status'] is None:
+        return JsonResponse({
+            'error': 'A request with this Idempotency-Key is still being processed',
+            'error_code': 'REQUEST_IN_PROGRESS'
+        }, status=409)
+    response = HttpResponse(record['content'], status=record['status'], content_type=record['content_type'])
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def _record(response, fingerprint):
+    """Cacheable record of a final response, or None for retryable ones"""
+    if response.status_code >= 500 or response.status_code in (409, 429):
+        return None
+    return {
+        'fingerprint': fingerprint,
+        'status': response.status_code,
+        'content': response.content,
+        'content_type': response.get('Content-Type'),
+    }
+
+
+def _ttl():
+    return getattr(settings, 'CHECKIN_IDEMPOTENCY_TTL', DEFAULT_IDEMPOTENCY_TTL)
+
+
+def idempotent_checkin(view):
+    """
+    Replay the stored response for a repeated Idempotency-Key.
+
+    The key is claimed with cache.add before the view runs, so a concurrent
+    duplicate gets 409 instead of redoing the work. Server errors, 409 and
+    429 are not stored, so the client may retry those with the same key.
+    """
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            cache_key = _idempotency_cache_key(request)
+            if cache_key is None:
+                return await view(request, *args, **kwargs)
+
+            fingerprint = _fingerprint(request)
+            pending = {'fingerprint': fingerprint, 'status': None}
+            if not await cache.aadd(cache_key, pending, IDEMPOTENCY_PENDING_SECONDS):
+                record = await cache.aget(cache_key)
+                if record is not None:
+                    return _replay(record, fingerprint)
+
+            response = None
+            try:
+                response = await view(request, *args, **kwargs)
+            finally:
+                record = _record(response, fingerprint) if response is not None else None
+                if record is not None:
+                    await cache.aset(cache_key, record, _ttl())
+                else:
+                    await cache.adelete(cache_key)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        cache_key = _idempotency_cache_key(request)
+        if cache_key is None:
+            return view(request, *args, **kwargs)
+
+        fingerprint = _fingerprint(request)
+        pending = {'fingerprint': fingerprint, 'status': None}
+        if not cache.add(cache_key, pending, IDEMPOTENCY_PENDING_SECONDS):
+            record = cache.get(cache_key)
+            if record is not None:
+                return _replay(record, fingerprint)
+
+        response = None
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            record = _record(response, fingerprint) if response is not None else None
+            if record is not None:
+                cache.set(cache_key, record, _ttl())
+            else:
+                cache.delete(cache_key)
+        return response
+    return wrapper
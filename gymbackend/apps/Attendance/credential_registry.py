@@ -0,0 +1,135 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional
+
+from django.conf import settings
+from apps.Member.models import Member
+
+
+def canonical_credential_id(credential_id: str) -> str:
+    """Normalize a WebAuthn credential ID to unpadded base64url"""
+    if not credential_id:
+        return ''
+    return str(credential_id).strip().replace('+', '-').replace('/', '_').rstrip('=')
+
+
+class CredentialRegistry:
+    """
+    Resolves kiosk credential IDs to members.
+
+    Lookups go through a process-local LRU cache mapping canonical credential
+    IDs to member primary keys and fall back to one indexed query on
+    WebAuthnCredential.credential_id. Members registered before credentials
+    were recorded are resolved through the indexed BiometricTemplate.primary_hash
+    column instead. A cache hit still loads the member by primary key, so every
+    caller gets its own fresh instance and a member whose biometrics were
+    revoked in another process is rejected at once. Entries expire after
+    KIOSK_CREDENTIAL_CACHE_TTL seconds so credential changes made by other
+    worker processes are picked up within a bounded window.
+    """
+
+    DEFAULT_CACHE_SIZE = 4096
+    DEFAULT_CACHE_TTL = 300
+
+    def __init__(self, max_size=None):
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._max_size = max_size
+
+    @property
+    def max_size(self):
+        if self._max_size is None:
+            return getattr(settings, 'KIOSK_CREDENTIAL_CACHE_SIZE', self.DEFAULT_CACHE_SIZE)
+        return self._max_size
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'KIOSK_CREDENTIAL_CACHE_TTL', self.DEFAULT_CACHE_TTL)
+
+    def _get_cached(self, key):
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            member_pk, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return member_pk
+
+    def _remember(self, keys: Iterable[str], member_pk):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key in keys:
+                self._cache[key] = (member_pk, expires_at)
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def resolve(self, *credential_ids: str) -> Optional[Member]:
+        """Return the member owning any of the given credential IDs"""
+        raw_ids: List[str] = []
+        for credential_id in credential_ids:
+            if credential_id and credential_id not in raw_ids:
+                raw_ids.append(credential_id)
+        keys = list(dict.fromkeys(canonical_credential_id(raw_id) for raw_id in raw_ids))
+        if not keys:
+            return None
+
+        for key in keys:
+            member_pk = self._get_cached(key)
+            if member_pk is None:
+                continue
+            member = Member.objects.filter(pk=member_pk, biometric_registered=True).order_by().first()
+            if member is not None:
+                return member
+            self.forget_member(member_pk)
+
+        from apps.Authentication.models import WebAuthnCredential
+        credential = WebAuthnCredential.objects.select_related('member').filter(
+            credential_id__in=keys, member__biometric_registered=True
+        ).first()
+        member = credential.member if credential else self._resolve_legacy(raw_ids)
+
+        if member is not None:
+            self._remember(keys, member.pk)
+        return member
+
+    def _resolve_legacy(self, raw_ids: List[str]) -> Optional[Member]:
+        """Match credential IDs stored only as Member.biometric_hash"""
+        from .models import BiometricTemplate
+        primary_hashes = [hashlib.sha256(raw_id.encode()).hexdigest() for raw_id in raw_ids]
+        template = BiometricTemplate.objects.select_related('member').filter(
+            primary_hash__in=primary_hashes, member__biometric_registered=True
+        ).first()
+        return template.member if template else None
+
+    def register(self, member: Member, credential_id: str, public_key: str = '', rp_id: str = ''):
+        """Record a WebAuthn credential for the member and return it"""
+        from apps.Authentication.models import WebAuthnCredential
+        key = canonical_credential_id(credential_id)
+        credential, _ = WebAuthnCredential.objects.update_or_create(
+            member=member,
+            credential_id=key,
+            defaults={'public_key': public_key or '', 'rp_id': rp_id or ''}
+        )
+        self.forget_member(member.pk)
+        return credential
+
+    def forget_member(self, member_pk):
+        """Evict every cached credential that resolves to the member"""
+        with self._lock:
+            stale = [key for key, (cached_pk, _) in self._cache.items() if cached_pk == member_pk]
+            for key in stale:
+                del self._cache[key]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared per-process registry used by the kiosk endpoints
+credential_registry = CredentialRegistry()
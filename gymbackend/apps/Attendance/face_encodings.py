@@ -0,0 +1,144 @@
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from django.conf import settings
+
+
+def get_face_comparison():
+    """Return the FaceComparison backend selected by FACE_COMPARISON_BACKEND"""
+    backend = getattr(settings, 'FACE_COMPARISON_BACKEND', 'simple')
+    if backend == 'face_recognition':
+        from .face_utils import FaceComparison
+    else:
+        from .face_utils_simple import FaceComparison
+    return FaceComparison
+
+
+def serialize_encoding(encoding):
+    buffer = io.BytesIO()
+    np.save(buffer, encoding, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def deserialize_encoding(data):
+    return np.load(io.BytesIO(bytes(data)), allow_pickle=False)
+
+
+class ReferenceEncodingCache:
+    """
+    Reference-face encodings for PIN+Photo check-in.
+
+    Encodings are computed once per reference photo, persisted on the member
+    (pin_reference_encoding) and kept in a per-process LRU. Each encoding is
+    stamped with a version built from the backend, photo name, size and
+    mtime, so it is recomputed only when the reference photo changes.
+    """
+
+    DEFAULT_CACHE_SIZE = 1024
+
+    def __init__(self, max_size=None):
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._max_size = max_size
+
+    @property
+    def max_size(self):
+        if self._max_size is None:
+            return getattr(settings, 'FACE_ENCODING_CACHE_SIZE', self.DEFAULT_CACHE_SIZE)
+        return self._max_size
+
+    @staticmethod
+    def version_for(member, face_comparison):
+        """Version stamp of the member's current reference photo, or None"""
+        photo = member.pin_reference_photo
+        if not photo:
+            return None
+        try:
+            stat = os.stat(photo.path)
+        except (OSError, ValueError, NotImplementedError):
+            return None
+        return f"{face_comparison.BACKEND_NAME}:{photo.name}:{stat.st_size}:{int(stat.st_mtime)}"
+
+    def get(self, member, face_comparison=None):
+        """
+        Return the member's reference encoding, computing it if stale
+        Returns: (encoding: np.ndarray or None, error: str)
+        """
+        face_comparison = face_comparison or get_face_comparison()
+        version = self.version_for(member, face_comparison)
+        if version is None:
+            return None, "Could not load reference photo"
+
+        with self._lock:
+            entry = self._cache.get(member.pk)
+            if entry is not None and entry[0] == version:
+                self._cache.move_to_end(member.pk)
+                return entry[1], None
+
+        encoding = None
+        if member.pin_reference_encoding and member.pin_reference_encoding_version == version:
+            try:
+                encoding = deserialize_encoding(member.pin_reference_encoding)
+            except Exception as e:
+                print(f"Discarding unreadable reference encoding for {member.athlete_id}: {e}")
+
+        if encoding is None:
+            encoding, error = self.refresh(member, face_comparison, version)
+            if encoding is None:
+                return None, error
+
+        self._remember(member.pk, version, encoding)
+        return encoding, None
+
+    def refresh(self, member, face_comparison=None, version=None):
+        """
+        Recompute and persist the member's reference encoding
+        Returns: (encoding: np.ndarray or None, error: str)
+        """
+        from apps.Member.models import Member
+
+        face_comparison = face_comparison or get_face_comparison()
+        version = version or self.version_for(member, face_comparison)
+        if version is None:
+            return None, "Could not load reference photo"
+
+        # Encoding runs in the verification pool; FaceServiceBusy/Timeout propagate
+        from .face_service import face_service
+        encoding, error = face_service.encode_reference(member.pin_reference_photo.path)
+        if encoding is None:
+            return None, error
+
+        member.pin_reference_encoding = serialize_encoding(encoding)
+        member.pin_reference_encoding_version = version
+        # Queryset update keeps post_save handlers out of the check-in path
+        Member.objects.filter(pk=member.pk).update(
+            pin_reference_encoding=member.pin_reference_encoding,
+            pin_reference_encoding_version=version
+        )
+        self._remember(member.pk, version, encoding)
+        if member.pin_enabled and getattr(settings, 'FACE_IDENTIFICATION_ENABLED', False):
+            from .face_gallery import face_gallery
+            face_gallery.refresh_member(member.pk, encoding, version)
+        return encoding, None
+
+    def _remember(self, member_pk, version, encoding):
+        with self._lock:
+            self._cache[member_pk] = (version, encoding)
+            self._cache.move_to_end(member_pk)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def forget_member(self, member_pk):
+        with self._lock:
+            self._cache.pop(member_pk, None)
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+
+# Shared per-process cache used by PIN+Photo check-in
+reference_encodings = ReferenceEncodingCache()
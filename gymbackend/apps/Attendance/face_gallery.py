@@ -0,0 +1,208 @@
+import threading
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from django.core.cache import cache
+
+from .face_encodings import ReferenceEncodingCache, deserialize_encoding, get_face_comparison
+
+
+class FaceGallery:
+    """
+    Process-local gallery of enrolled reference faces for 1:N identification.
+
+    Every PIN-enabled member with a stored reference encoding of the active
+    backend contributes one row (the backend's gallery_vector) to a dense
+    float32 matrix, so identifying a live photo is a single vectorized
+    distance computation. Rows are applied incrementally when a reference
+    encoding changes; other processes rebuild from the database when the
+    shared version stamp moves, like the biometric index.
+    """
+
+    VERSION_CACHE_KEY = 'face_gallery_version'
+    INITIAL_CAPACITY = 256
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._version = None
+        self._reset()
+
+    def _reset(self):
+        self._backend = None
+        self._member_ids: List[int] = []        # row -> member pk
+        self._rows: Dict[int, int] = {}         # member pk -> row
+        self._stamps: Dict[int, str] = {}       # member pk -> encoding version
+        self._matrix = np.zeros((self.INITIAL_CAPACITY, 0), dtype=np.float32)
+        self._sq_norms = np.zeros(self.INITIAL_CAPACITY, dtype=np.float32)
+
+    # ------------------------------------------------------------------
+    # Loading and invalidation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _enrolled():
+        from apps.Member.models import Member
+
+        face_comparison = get_face_comparison()
+        return face_comparison, Member.objects.filter(
+            pin_enabled=True,
+            pin_reference_encoding__isnull=False,
+            pin_reference_encoding_version__startswith=f'{face_comparison.BACKEND_NAME}:',
+        )
+
+    def _rebuild(self, version):
+        face_comparison, members = self._enrolled()
+        self._reset()
+        self._backend = face_comparison.BACKEND_NAME
+        rows = members.values_list('pk', 'pin_reference_encoding', 'pin_reference_encoding_version')
+        for member_pk, data, stamp in rows.iterator():
+            try:
+                encoding = deserialize_encoding(data)
+            except Exception as e:
+                print(f"Skipping unreadable reference encoding for member {member_pk}: {e}")
+                continue
+            self._upsert(member_pk, face_comparison.gallery_vector(encoding), stamp)
+        self._version = version
+        self._loaded = True
+        print(f"Face gallery built: {len(self._member_ids)} enrolled faces ({self._backend})")
+
+    def _ensure_current(self):
+        """Build on first use and rebuild when another process changed the gallery"""
+        shared_version = cache.get(self.VERSION_CACHE_KEY)
+        backend = get_face_comparison().BACKEND_NAME
+        if self._loaded and self._backend == backend and (shared_version is None or shared_version == self._version):
+            return
+        with self._lock:
+            if (not self._loaded or self._backend != backend
+                    or (shared_version is not None and shared_version != self._version)):
+                self._rebuild(shared_version)
+
+    def _bump_version(self):
+        self._version = uuid.uuid4().hex
+        cache.set(self.VERSION_CACHE_KEY, self._version, None)
+
+    def invalidate(self):
+        """Drop the gallery in every process, e.g. after a bulk encoding import"""
+        with self._lock:
+            self._loaded = False
+            self._reset()
+            self._bump_version()
+
+    def refresh_member(self, member_pk, encoding, stamp=''):
+        """Incrementally apply a member's (new) reference encoding"""
+        self._ensure_current()
+        with self._lock:
+            if member_pk in self._rows and stamp and self._stamps.get(member_pk) == stamp:
+                return
+            self._upsert(member_pk, get_face_comparison().gallery_vector(encoding), stamp)
+            self._bump_version()
+
+    def remove_member(self, member_pk):
+        """Incrementally drop a member who is no longer enrolled"""
+        self._ensure_current()
+        with self._lock:
+            if member_pk in self._rows:
+                self._remove(member_pk)
+                self._bump_version()
+
+    def sync_member(self, member):
+        """Add, update or drop a member after it was saved"""
+        face_comparison = get_face_comparison()
+        stamp = member.pin_reference_encoding_version or ''
+        # A replaced reference photo drops the member until it is re-encoded
+        enrolled = (
+            member.pin_enabled and member.pin_reference_encoding
+            and stamp == ReferenceEncodingCache.version_for(member, face_comparison)
+        )
+        if not enrolled:
+            self.remove_member(member.pk)
+            return
+        self._ensure_current()
+        if self._stamps.get(member.pk) == stamp:
+            return
+        try:
+            encoding = deserialize_encoding(member.pin_reference_encoding)
+        except Exception as e:
+            print(f"Skipping unreadable reference encoding for {member.athlete_id}: {e}")
+            self.remove_member(member.pk)
+            return
+        self.refresh_member(member.pk, encoding, stamp)
+
+    # ------------------------------------------------------------------
+    # Row storage
+    # ------------------------------------------------------------------
+
+    def _upsert(self, member_pk, vector, stamp):
+        if self._matrix.shape[1] != vector.shape[0]:
+            if self._member_ids:
+                # A different vector size means the rows came from another backend
+                print(f"Dropping face gallery: vector size changed to {vector.shape[0]}")
+                self._member_ids, self._rows, self._stamps = [], {}, {}
+            self._matrix = np.zeros((self.INITIAL_CAPACITY, vector.shape[0]), dtype=np.float32)
+            self._sq_norms = np.zeros(self.INITIAL_CAPACITY, dtype=np.float32)
+
+        row = self._rows.get(member_pk)
+        if row is None:
+            row = len(self._member_ids)
+            if row >= self._matrix.shape[0]:
+                capacity = max(self.INITIAL_CAPACITY, self._matrix.shape[0] * 2)
+                extra = capacity - self._matrix.shape[0]
+                self._matrix = np.pad(self._matrix, ((0, extra), (0, 0)))
+                self._sq_norms = np.pad(self._sq_norms, (0, extra))
+            self._member_ids.append(member_pk)
+            self._rows[member_pk] = row
+        self._matrix[row] = vector
+        self._sq_norms[row] = np.dot(vector, vector)
+        self._stamps[member_pk] = stamp
+
+    def _remove(self, member_pk):
+        row = self._rows.pop(member_pk)
+        self._stamps.pop(member_pk, None)
+        last = len(self._member_ids) - 1
+
+        # Swap the last row into the freed slot to keep the matrix dense
+        if row != last:
+            moved_pk = self._member_ids[last]
+            self._matrix[row] = self._matrix[last]
+            self._sq_norms[row] = self._sq_norms[last]
+            self._member_ids[row] = moved_pk
+            self._rows[moved_pk] = row
+        self._matrix[last] = 0
+        self._sq_norms[last] = 0
+        self._member_ids.pop()
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def identify(self, encoding, tolerance=None) -> Tuple[Optional[int], Optional[float]]:
+        """
+        Nearest enrolled member to a live-photo encoding
+        Returns: (member pk or None when above tolerance, distance or None when empty)
+        """
+        face_comparison = get_face_comparison()
+        tolerance = face_comparison.IDENTIFY_TOLERANCE if tolerance is None else tolerance
+        vector = face_comparison.gallery_vector(encoding)
+
+        self._ensure_current()
+        with self._lock:
+            count = len(self._member_ids)
+            if not count or self._matrix.shape[1] != vector.shape[0]:
+                return None, None
+            # |a - v|^2 = |a|^2 - 2 a.v + |v|^2: one matrix-vector product, no N x D temporary
+            sq_distances = self._sq_norms[:count] - 2 * (self._matrix[:count] @ vector)
+            row = int(np.argmin(sq_distances))
+            distance = float(np.sqrt(max(float(sq_distances[row] + np.dot(vector, vector)), 0.0)))
+            if distance > tolerance:
+                return None, distance
+            return self._member_ids[row], distance
+
+    def __len__(self):
+        self._ensure_current()
+        return len(self._member_ids)
+
+
+# Shared per-process gallery used by the photo-only kiosk check-in
+face_gallery = FaceGallery()
@@ -0,0 +1,233 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from django.conf import settings
+
+from .photo_pipeline import DecodedPhoto
+
+
+class FaceServiceBusy(Exception):
+    """Raised when the verification queue is full"""
+
+
+class FaceServiceTimeout(Exception):
+    """Raised when a verification job does not finish in time"""
+
+
+# ----------------------------------------------------------------------
+# Worker-side functions (run inside the pool processes)
+# ----------------------------------------------------------------------
+
+_worker_backend = None
+
+
+def _load_backend(backend):
+    if backend == 'face_recognition':
+        from .face_utils import FaceComparison
+    else:
+        from .face_utils_simple import FaceComparison
+    return FaceComparison
+
+
+def _warm_worker(backend):
+    """Pool initializer: import the backend (and its models) once per process"""
+    global _worker_backend
+    _worker_backend = _load_backend(backend)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _encode_reference_job(reference_photo_path):
+    return _worker_backend.encode_reference_photo(reference_photo_path)
+
+
+def _verify_job(reference_encoding, photo, tolerance):
+    """Returns (verification result, worker-side stage timings in seconds)"""
+    timings = {}
+    # Decoded once here and shared by validation and comparison
+    started = time.perf_counter()
+    is_valid, validation_error = _worker_backend.validate_face_photo(photo)
+    timings['validation'] = time.perf_counter() - started
+    if not is_valid:
+        return (False, validation_error, False, 0.0, None), timings
+    started = time.perf_counter()
+    is_match, confidence, comparison_error = _worker_backend.compare_with_encoding(
+        reference_encoding, photo, tolerance
+    )
+    timings['face_compare'] = time.perf_counter() - started
+    return (True, None, is_match, confidence, comparison_error), timings
+
+
+def _encode_live_job(photo):
+    """Validate and encode a live photo for 1:N identification"""
+    timings = {}
+    started = time.perf_counter()
+    is_valid, validation_error = _worker_backend.validate_face_photo(photo)
+    timings['validation'] = time.perf_counter() - started
+    if not is_valid:
+        return (False, validation_error, None, None), timings
+    started = time.perf_counter()
+    encoding, encoding_error = _worker_backend.encode_live_photo(photo)
+    timings['face_encode'] = time.perf_counter() - started
+    return (True, None, encoding, encoding_error), timings
+
+
+# ----------------------------------------------------------------------
+# Service
+# ----------------------------------------------------------------------
+
+def _add_timings(trace, timings):
+    """Copy worker-side stage timings onto the caller's CheckInTrace"""
+    if trace is not None:
+        for stage, seconds in timings.items():
+            trace.add(stage, seconds)
+
+
+class FaceVerificationService:
+    """
+    Runs face validation/encoding in a pre-warmed process pool.
+
+    At most FACE_SERVICE_QUEUE_SIZE jobs may be queued or running; further
+    submissions fail immediately with FaceServiceBusy so views can answer
+    429 instead of piling up. Every job is bounded by FACE_SERVICE_TIMEOUT.
+    Workers use the spawn start method so the pool is safe to create from a
+    threaded ASGI server.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    @property
+    def backend(self):
+        return getattr(settings, 'FACE_COMPARISON_BACKEND', 'simple')
+
+    @property
+    def workers(self):
+        return getattr(settings, 'FACE_SERVICE_WORKERS', 2)
+
+    @property
+    def queue_size(self):
+        return getattr(settings, 'FACE_SERVICE_QUEUE_SIZE', self.workers * 4)
+
+    @property
+    def timeout(self):
+        return getattr(settings, 'FACE_SERVICE_TIMEOUT', 10.0)
+
+    @property
+    def tolerance(self):
+        return _load_backend(self.backend).PIN_CHECKIN_TOLERANCE
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_warm_worker,
+                    initargs=(self.backend,),
+                )
+                self._slots = threading.BoundedSemaphore(self.queue_size)
+            return self._executor
+
+    def start(self, wait=False):
+        """Create the pool and spawn every worker ahead of the first request"""
+        executor = self._get_executor()
+        futures = [executor.submit(_ping) for _ in range(self.workers)]
+        if wait:
+            for future in futures:
+                future.result()
+        print(f"Face verification service started: {self.workers} workers ({self.backend})")
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+    def submit(self, fn, *args):
+        """Queue a job, raising FaceServiceBusy when the queue is full"""
+        executor = self._get_executor()
+        slots = self._slots
+        if not slots.acquire(blocking=False):
+            raise FaceServiceBusy('Face verification queue is full')
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        return future
+
+    def _result(self, future):
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise FaceServiceTimeout(f'Face verification exceeded {self.timeout}s')
+
+    async def _aresult(self, future):
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise FaceServiceTimeout(f'Face verification exceeded {self.timeout}s')
+
+    # Sync entry points -------------------------------------------------
+
+    def encode_reference(self, reference_photo_path):
+        """Returns: (encoding: np.ndarray or None, error: str)"""
+        return self._result(self.submit(_encode_reference_job, reference_photo_path))
+
+    def verify(self, reference_encoding, photo, tolerance=None, trace=None):
+        """
+        Validate the live photo (a DecodedPhoto or base64 string) and compare
+        it with the reference encoding. Worker-side stage timings are added
+        to the CheckInTrace when one is given.
+        Returns: (is_valid, validation_error, is_match, confidence, comparison_error)
+        """
+        tolerance = self.tolerance if tolerance is None else tolerance
+        photo = DecodedPhoto.coerce(photo)
+        result, timings = self._result(self.submit(_verify_job, reference_encoding, photo, tolerance))
+        _add_timings(trace, timings)
+        return result
+
+    def encode_live(self, photo, trace=None):
+        """
+        Validate and encode a live photo (a DecodedPhoto or base64 string)
+        Returns: (is_valid, validation_error, encoding, encoding_error)
+        """
+        photo = DecodedPhoto.coerce(photo)
+        result, timings = self._result(self.submit(_encode_live_job, photo))
+        _add_timings(trace, timings)
+        return result
+
+    # Async entry points ------------------------------------------------
+
+    async def aencode_reference(self, reference_photo_path):
+        return await self._aresult(self.submit(_encode_reference_job, reference_photo_path))
+
+    async def averify(self, reference_encoding, photo, tolerance=None, trace=None):
+        tolerance = self.tolerance if tolerance is None else tolerance
+        photo = DecodedPhoto.coerce(photo)
+        result, timings = await self._aresult(self.submit(_verify_job, reference_encoding, photo, tolerance))
+        _add_timings(trace, timings)
+        return result
+
+    async def aencode_live(self, photo, trace=None):
+        photo = DecodedPhoto.coerce(photo)
+        result, timings = await self._aresult(self.submit(_encode_live_job, photo))
+        _add_timings(trace, timings)
+        return result
+
+
+# Shared per-process service used by the face check-in views
+face_service = FaceVerificationService()
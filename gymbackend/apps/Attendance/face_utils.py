@@ -1,60 +1,91 @@
 import face_recognition
 import numpy as np
-from PIL import Image
-import base64
-import io
-import cv2
+from .photo_pipeline import DecodedPhoto
+
+
+def _face_locations(photo):
+    """Face locations on the detection copy, computed once per photo"""
+    if 'face_locations' not in photo.analysis:
+        photo.analysis['face_locations'] = face_recognition.face_locations(photo.detection_array)
+    return photo.analysis['face_locations']
+
 
 class FaceComparison:
+    BACKEND_NAME = 'face_recognition'
+    # Maximum face distance accepted for PIN+Photo check-in
+    PIN_CHECKIN_TOLERANCE = 0.6
+    # Stricter than 1:1 because a photo-only search compares against everyone
+    IDENTIFY_TOLERANCE = 0.5
+
     @staticmethod
-    def compare_faces(reference_photo_path, current_photo_base64, tolerance=0.6):
+    def encode_reference_photo(reference_photo_path):
         """
-        Compare reference photo with current photo
-        Returns: (is_match: bool, confidence: float, error: str)
+        Compute the 128-d encoding of the face in a reference photo
+        Returns: (encoding: np.ndarray or None, error: str)
         """
         try:
-            # Load reference image
             reference_image = face_recognition.load_image_file(reference_photo_path)
             reference_encodings = face_recognition.face_encodings(reference_image)
             
             if not reference_encodings:
-                return False, 0.0, "No face found in reference photo"
-            
-            # Process current photo from base64
-            if current_photo_base64.startswith('data:image/'):
-                _, imgstr = current_photo_base64.split(';base64,')
-            else:
-                imgstr = current_photo_base64
+                return None, "No face found in reference photo"
             
-            # Decode base64 image
-            image_data = base64.b64decode(imgstr)
-            image = Image.open(io.BytesIO(image_data))
+            return reference_encodings[0], None
             
-            # Convert PIL image to numpy array
-            current_image = np.array(image)
-            
-            # Convert RGB to BGR if needed (face_recognition expects RGB)
-            if len(current_image.shape) == 3 and current_image.shape[2] == 3:
-                current_image = cv2.cvtColor(current_image, cv2.COLOR_BGR2RGB)
+        except Exception as e:
+            return None, f"Reference encoding error: {str(e)}"
+    
+    @staticmethod
+    def encode_live_photo(current_photo):
+        """
+        Compute the 128-d encoding of the face in a live photo
+        (a DecodedPhoto or base64 string)
+        Returns: (encoding: np.ndarray or None, error: str)
+        """
+        try:
+            photo = DecodedPhoto.coerce(current_photo)
             
-            # Get face encodings from current image
-            current_encodings = face_recognition.face_encodings(current_image)
+            # Get face encodings from the downscaled RGB copy
+            face_locations = _face_locations(photo)
+            if not face_locations:
+                return None, "No face found in current photo"
+            current_encodings = face_recognition.face_encodings(
+                photo.detection_array, known_face_locations=face_locations[:1]
+            )
             
             if not current_encodings:
-                return False, 0.0, "No face found in current photo"
+                return None, "No face found in current photo"
             
-            # Compare faces
-            reference_encoding = reference_encodings[0]
-            current_encoding = current_encodings[0]
+            return current_encodings[0], None
+            
+        except Exception as e:
+            return None, f"Face encoding error: {str(e)}"
+    
+    @staticmethod
+    def gallery_vector(encoding):
+        """Face encodings are compared by Euclidean distance as they are"""
+        return np.asarray(encoding, dtype=np.float32)
+    
+    @staticmethod
+    def compare_with_encoding(reference_encoding, current_photo, tolerance=0.6):
+        """
+        Compare a precomputed reference encoding with current photo
+        (a DecodedPhoto or base64 string)
+        Returns: (is_match: bool, confidence: float, error: str)
+        """
+        try:
+            current_encoding, error = FaceComparison.encode_live_photo(current_photo)
+            if current_encoding is None:
+                return False, 0.0, error
             
             # Calculate face distance (lower = more similar)
             face_distance = face_recognition.face_distance([reference_encoding], current_encoding)[0]
             
             # Convert distance to confidence (higher = more confident)
-            confidence = 1 - face_distance
+            confidence = float(1 - face_distance)
             
             # Check if faces match within tolerance
-            is_match = face_distance <= tolerance
+            is_match = bool(face_distance <= tolerance)
             
             return is_match, confidence, None
             
@@ -62,28 +93,27 @@ class FaceComparison:
             return False, 0.0, f"Face comparison error: {str(e)}"
     
     @staticmethod
-    def validate_face_photo(photo_base64):
+    def compare_faces(reference_photo_path, current_photo, tolerance=0.6):
         """
-        Validate that photo contains a clear face
+        Compare reference photo with current photo
+        Returns: (is_match: bool, confidence: float, error: str)
+        """
+        reference_encoding, error = FaceComparison.encode_reference_photo(reference_photo_path)
+        if reference_encoding is None:
+            return False, 0.0, error
+        return FaceComparison.compare_with_encoding(reference_encoding, current_photo, tolerance)
+    
+    @staticmethod
+    def validate_face_photo(photo):
+        """
+        Validate that photo (a DecodedPhoto or base64 string) contains a clear face
         Returns: (is_valid: bool, error: str)
         """
         try:
-            if photo_base64.startswith('data:image/'):
-                _, imgstr = photo_base64.split(';base64,')
-            else:
-                imgstr = photo_base64
-            
-            # Decode base64 image
-            image_data = base64.b64decode(imgstr)
-            image = Image.open(io.BytesIO(image_data))
-            current_image = np.array(image)
-            
-            # Convert RGB to BGR if needed
-            if len(current_image.shape) == 3 and current_image.shape[2] == 3:
-                current_image = cv2.cvtColor(current_image, cv2.COLOR_BGR2RGB)
+            photo = DecodedPhoto.coerce(photo)
             
-            # Detect faces
-            face_locations = face_recognition.face_locations(current_image)
+            # Detect faces on the downscaled copy
+            face_locations = _face_locations(photo)
             
             if not face_locations:
                 return False, "No face detected in photo"
@@ -91,10 +121,10 @@ class FaceComparison:
             if len(face_locations) > 1:
                 return False, "Multiple faces detected. Please ensure only one person is in the photo"
             
-            # Check face size (should be reasonable size)
+            # Check face size in original pixels (should be reasonable size)
             top, right, bottom, left = face_locations[0]
-            face_height = bottom - top
-            face_width = right - left
+            face_height = (bottom - top) * photo.detection_scale
+            face_width = (right - left) * photo.detection_scale
             
             if face_height < 50 or face_width < 50:
                 return False, "Face too small. Please move closer to camera"
@@ -102,4 +132,4 @@ class FaceComparison:
             return True, None
             
         except Exception as e:
-            return False, f"Photo validation error: {str(e)}"
\ No newline at end of file
+            return False, f"Photo validation error: {str(e)}"
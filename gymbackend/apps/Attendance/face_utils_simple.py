@@ -1,45 +1,75 @@
 import cv2
 import numpy as np
-from PIL import Image
-import base64
-import io
+from .photo_pipeline import DecodedPhoto
 
 class FaceComparison:
+    BACKEND_NAME = 'simple'
+    # Minimum correlation accepted for PIN+Photo check-in
+    PIN_CHECKIN_TOLERANCE = 0.3
+    COMPARISON_SIZE = (200, 200)
+    # Gallery vectors are zero-mean unit vectors of a downscaled image, so the
+    # Euclidean distance d relates to their correlation c by d^2 = 2(1 - c);
+    # 0.9 requires a correlation of about 0.6 for 1:N identification
+    GALLERY_SIZE = (32, 32)
+    IDENTIFY_TOLERANCE = 0.9
+
     @staticmethod
-    def compare_faces(reference_photo_path, current_photo_base64, tolerance=0.2):
+    def encode_reference_photo(reference_photo_path):
         """
-        Simple face comparison using OpenCV template matching
-        Returns: (is_match: bool, confidence: float, error: str)
+        Prepare the grayscale, resized reference image used for matching
+        Returns: (encoding: np.ndarray or None, error: str)
         """
         try:
-            # Load reference image
             reference_image = cv2.imread(reference_photo_path)
             if reference_image is None:
-                return False, 0.0, "Could not load reference photo"
+                return None, "Could not load reference photo"
             
-            # Process current photo from base64
-            if current_photo_base64.startswith('data:image/'):
-                _, imgstr = current_photo_base64.split(';base64,')
-            else:
-                imgstr = current_photo_base64
+            ref_gray = cv2.cvtColor(reference_image, cv2.COLOR_BGR2GRAY)
+            return cv2.resize(ref_gray, FaceComparison.COMPARISON_SIZE), None
             
-            # Decode base64 image
-            image_data = base64.b64decode(imgstr)
-            image = Image.open(io.BytesIO(image_data))
-            current_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        except Exception as e:
+            return None, f"Reference encoding error: {str(e)}"
+    
+    @staticmethod
+    def encode_live_photo(current_photo):
+        """
+        Encode a live photo (a DecodedPhoto or base64 string) like a reference photo
+        Returns: (encoding: np.ndarray or None, error: str)
+        """
+        try:
+            photo = DecodedPhoto.coerce(current_photo)
             
-            # Convert to grayscale for comparison
-            ref_gray = cv2.cvtColor(reference_image, cv2.COLOR_BGR2GRAY)
-            curr_gray = cv2.cvtColor(current_image, cv2.COLOR_BGR2GRAY)
+            # Convert the downscaled copy to grayscale and resize to the reference size
+            curr_gray = cv2.cvtColor(photo.detection_array, cv2.COLOR_RGB2GRAY)
+            return cv2.resize(curr_gray, FaceComparison.COMPARISON_SIZE), None
             
-            # Resize images to same size for comparison
-            height, width = 200, 200
-            ref_resized = cv2.resize(ref_gray, (width, height))
-            curr_resized = cv2.resize(curr_gray, (width, height))
+        except Exception as e:
+            return None, f"Face encoding error: {str(e)}"
+    
+    @staticmethod
+    def gallery_vector(encoding):
+        """Compact vector of an encoding for the 1:N identification gallery"""
+        small = cv2.resize(encoding, FaceComparison.GALLERY_SIZE, interpolation=cv2.INTER_AREA)
+        vector = small.astype(np.float32).ravel()
+        vector -= vector.mean()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    @staticmethod
+    def compare_with_encoding(reference_encoding, current_photo, tolerance=0.2):
+        """
+        Compare a precomputed reference encoding with current photo
+        (a DecodedPhoto or base64 string)
+        Returns: (is_match: bool, confidence: float, error: str)
+        """
+        try:
+            curr_resized, error = FaceComparison.encode_live_photo(current_photo)
+            if curr_resized is None:
+                return False, 0.0, error
             
             # Calculate structural similarity
             # Simple correlation coefficient
-            correlation = cv2.matchTemplate(ref_resized, curr_resized, cv2.TM_CCOEFF_NORMED)[0][0]
+            correlation = cv2.matchTemplate(reference_encoding, curr_resized, cv2.TM_CCOEFF_NORMED)[0][0]
             
             # Convert to confidence (0-1) and ensure it's a Python float
             confidence = float(max(0, correlation))
@@ -53,27 +83,33 @@ class FaceComparison:
             return False, 0.0, f"Face comparison error: {str(e)}"
     
     @staticmethod
-    def validate_face_photo(photo_base64):
+    def compare_faces(reference_photo_path, current_photo, tolerance=0.2):
+        """
+        Simple face comparison using OpenCV template matching
+        Returns: (is_match: bool, confidence: float, error: str)
+        """
+        reference_encoding, error = FaceComparison.encode_reference_photo(reference_photo_path)
+        if reference_encoding is None:
+            return False, 0.0, error
+        return FaceComparison.compare_with_encoding(reference_encoding, current_photo, tolerance)
+    
+    @staticmethod
+    def validate_face_photo(photo):
         """
         Basic photo validation - simplified to just check if image is valid
+        Accepts a DecodedPhoto or base64 string
         Returns: (is_valid: bool, error: str)
         """
         try:
-            if photo_base64.startswith('data:image/'):
-                _, imgstr = photo_base64.split(';base64,')
-            else:
-                imgstr = photo_base64
-            
-            # Decode base64 image
-            image_data = base64.b64decode(imgstr)
-            image = Image.open(io.BytesIO(image_data))
+            photo = DecodedPhoto.coerce(photo)
             
-            # Basic checks
-            if image.size[0] < 50 or image.size[1] < 50:
+            # Basic checks (header only, no pixel decode)
+            width, height = photo.size
+            if width < 50 or height < 50:
                 return False, "Image too small"
             
             # Skip face detection for now - just validate image is readable
             return True, None
             
         except Exception as e:
-            return False, f"Photo validation error: {str(e)}"
\ No newline at end of file
+            return False, f"Photo validation error: {str(e)}"
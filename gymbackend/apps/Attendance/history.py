@@ -0,0 +1,152 @@
+import base64
+import heapq
+import json
+from datetime import date, datetime
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import Attendance, AttendanceHistory
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+STREAM_BATCH_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def _order_key(attendance):
+    return attendance.date, attendance.check_in_time, attendance.id
+
+
+class HistoryQuery:
+    """
+    Hot Attendance rows and archived AttendanceHistory rows as one newest-first
+    sequence.
+
+    Supports what the history views use: filter() (applied to both tables),
+    slicing from the start and iteration. A slice of n fetches at most n rows
+    from each table and merges them, so every page stays two indexed queries.
+    Archived rows keep their Attendance id, so (date, check_in_time, id) is a
+    total order across both tables.
+    """
+
+    def __init__(self, hot, cold):
+        self.hot = hot
+        self.cold = cold
+
+    def filter(self, *args, **kwargs):
+        return HistoryQuery(self.hot.filter(*args, **kwargs), self.cold.filter(*args, **kwargs))
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.start not in (None, 0) or key.step is not None or key.stop is None:
+            raise TypeError('HistoryQuery only supports [:n] slices')
+        merged = heapq.merge(list(self.hot[:key.stop]), list(self.cold[:key.stop]), key=_order_key, reverse=True)
+        return [row for row, _ in zip(merged, range(key.stop))]
+
+    def __iter__(self):
+        return heapq.merge(self.hot.iterator(), self.cold.iterator(), key=_order_key, reverse=True)
+
+
+def history_queryset():
+    """Attendance rows newest first, hot rows with member and photo joined, plus the archive"""
+    return HistoryQuery(
+        Attendance.objects.select_related('member', 'photo').order_by('-date', '-check_in_time', '-id'),
+        AttendanceHistory.objects.select_related('member').order_by('-date', '-check_in_time', '-id'),
+    )
+
+
+def encode_cursor(attendance):
+    """Opaque cursor pointing just past the given row"""
+    payload = json.dumps([
+        attendance.date.isoformat(),
+        attendance.check_in_time.isoformat(),
+        attendance.id,
+    ])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        row_date, row_time, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        check_in_time = parse_datetime(row_time)
+        if check_in_time is None:
+            raise ValueError(row_time)
+        return date.fromisoformat(row_date), check_in_time, int(row_id)
+    except (ValueError, TypeError) as e:
+        raise InvalidCursor(f'Invalid cursor: {e}')
+
+
+def after_cursor(queryset, cursor):
+    """Keyset filter: rows strictly after the cursor in (date, check_in_time, id) DESC order"""
+    row_date, check_in_time, row_id = decode_cursor(cursor) if isinstance(cursor, str) else cursor
+    return queryset.filter(
+        Q(date__lt=row_date)
+        | Q(date=row_date, check_in_time__lt=check_in_time)
+        | Q(date=row_date, check_in_time=check_in_time, id__lt=row_id)
+    )
+
+
+def page(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE):
+    """Return (rows, next_cursor) for one keyset page"""
+    if cursor:
+        queryset = after_cursor(queryset, cursor)
+    rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    next_cursor = encode_cursor(rows[-1]) if has_more and rows else None
+    return rows, next_cursor
+
+
+def iter_rows(queryset, batch_size=STREAM_BATCH_SIZE):
+    """Walk the whole queryset in keyset batches so only one batch is in memory"""
+    cursor = None
+    while True:
+        batch = list((after_cursor(queryset, cursor) if cursor else queryset)[:batch_size])
+        yield from batch
+        if len(batch) < batch_size:
+            return
+        last = batch[-1]
+        cursor = (last.date, last.check_in_time, last.id)
+
+
+def serialize_attendance(attendance):
+    photo_url = None
+    try:
+        photo_url = attendance.photo.photo.url
+    except Exception:
+        pass
+
+    return {
+        'id': attendance.id,
+        'member_id': attendance.member.athlete_id,
+        'member_name': f"{attendance.member.first_name} {attendance.member.last_name}",
+        'date': attendance.date.strftime('%Y-%m-%d'),
+        'check_in_time': attendance.check_in_time.isoformat() if attendance.check_in_time else None,
+        'check_in_datetime': attendance.check_in_time.isoformat() if attendance.check_in_time else None,
+        'verification_method': attendance.verification_method or 'Manual',
+        'has_photo': photo_url is not None,
+        'photo_url': str(photo_url) if photo_url else None
+    }
+
+
+def stream_ndjson(queryset):
+    for attendance in iter_rows(queryset):
+        yield json.dumps(serialize_attendance(attendance)) + '\n'
+
+
+def stream_json_array(queryset):
+    yield '['
+    first = True
+    for attendance in iter_rows(queryset):
+        yield ('' if first else ',') + json.dumps(serialize_attendance(attendance))
+        first = False
+    yield ']'
+
+
+def parse_date(value):
+    """YYYY-MM-DD -> date (ValueError on bad input)"""
+    return datetime.strptime(value, '%Y-%m-%d').date()
@@ -0,0 +1,139 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+from django.conf import settings
+
+# Stages recorded by the check-in views
+STAGES = (
+    'decode',
+    'member_lookup',
+    'reference_encoding',
+    'validation',
+    'face_encode',
+    'face_compare',
+    'face_search',
+    'attendance_write',
+    'notification_create',
+    'websocket_send',
+    'photo_store',
+    'total',
+)
+
+DEFAULT_RESERVOIR_SIZE = 2048
+# External sensors put client-supplied sensor types into the method name
+MAX_METHODS = 32
+OTHER_METHOD = 'other'
+DEFAULT_SLOW_CHECKIN_SECONDS = 2.0
+
+
+class LatencyRecorder:
+    """
+    In-process latency histograms keyed by (verification method, stage).
+
+    Each key keeps its most recent DEFAULT_RESERVOIR_SIZE samples in a ring
+    buffer plus lifetime count/sum, so percentiles describe recent traffic
+    while memory stays bounded per key.
+    """
+
+    def __init__(self, reservoir_size=DEFAULT_RESERVOIR_SIZE):
+        self._lock = threading.Lock()
+        self._reservoir_size = reservoir_size
+        self._samples = {}
+        self._totals = {}
+        self._methods = set()
+
+    def record(self, method, stage, seconds):
+        with self._lock:
+            if method not in self._methods:
+                if len(self._methods) >= MAX_METHODS:
+                    method = OTHER_METHOD
+                self._methods.add(method)
+            key = (method, stage)
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self._reservoir_size)
+                self._totals[key] = [0, 0.0]
+            samples.append(seconds)
+            self._totals[key][0] += 1
+            self._totals[key][1] += seconds
+
+    def snapshot(self):
+        """{method: {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}}"""
+        with self._lock:
+            items = [(key, np.fromiter(samples, dtype=np.float64), tuple(self._totals[key]))
+                     for key, samples in self._samples.items()]
+
+        order = {stage: index for index, stage in enumerate(STAGES)}
+        report = {}
+        for (method, stage), samples, (count, total) in items:
+            if not samples.size:
+                continue
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99]) * 1000
+            report.setdefault(method, {})[stage] = {
+                'count': count,
+                'window': int(samples.size),
+                'mean_ms': round(total / count * 1000, 2),
+                'p50_ms': round(float(p50), 2),
+                'p95_ms': round(float(p95), 2),
+                'p99_ms': round(float(p99), 2),
+                'max_ms': round(float(samples.max()) * 1000, 2),
+            }
+        return {
+            method: dict(sorted(stages.items(), key=lambda item: order.get(item[0], len(order))))
+            for method, stages in sorted(report.items())
+        }
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+            self._totals.clear()
+            self._methods.clear()
+
+
+# Shared per-process recorder
+latency_recorder = LatencyRecorder()
+
+
+class CheckInTrace:
+    """
+    Timing spans for one check-in request.
+
+    Spans are recorded under the trace's verification method as soon as
+    they close; finish() records the end-to-end 'total'. The method can be
+    set after the trace starts (e.g. once the member's sensor is known).
+    """
+
+    def __init__(self, method, recorder=None):
+        self.method = method
+        self.recorder = recorder or latency_recorder
+        self.started = time.perf_counter()
+        self.timings = {}
+        self._finished = False
+
+    @contextmanager
+    def span(self, stage):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - started)
+
+    def add(self, stage, seconds):
+        """Record an externally measured stage (e.g. inside the face pool)"""
+        self.timings[stage] = self.timings.get(stage, 0.0) + seconds
+        self.recorder.record(self.method, stage, seconds)
+
+    def finish(self):
+        """Record the end-to-end total and log the breakdown of slow check-ins"""
+        if self._finished:
+            return self.timings
+        self._finished = True
+        total = time.perf_counter() - self.started
+        self.add('total', total)
+        if total >= getattr(settings, 'CHECKIN_SLOW_LOG_SECONDS', DEFAULT_SLOW_CHECKIN_SECONDS):
+            breakdown = ', '.join(f"{stage}={seconds * 1000:.0f}ms" for stage, seconds in self.timings.items())
+            print(f"Slow {self.method} check-in: {breakdown}")
+        return self.timings
@@ -0,0 +1,236 @@
+import hashlib
+import hmac
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.Member.models import Member
+from .credential_registry import credential_registry
+from .instrumentation import CheckInTrace
+from .models import Attendance
+
+SIGNATURE_HEADER = 'HTTP_X_KIOSK_SIGNATURE'
+TRACE_METHOD = 'Kiosk-Sync'
+DEFAULT_MAX_EVENT_AGE_DAYS = 7
+DEFAULT_MAX_BATCH_SIZE = 500
+# Tolerated kiosk clock drift into the future
+MAX_CLOCK_SKEW = timedelta(minutes=5)
+
+
+class BatchRejected(Exception):
+    """Raised when a whole sync batch is refused"""
+
+    def __init__(self, message, status=400, error_code='INVALID_BATCH'):
+        super().__init__(message)
+        self.status = status
+        self.error_code = error_code
+
+
+def sign_payload(body, secret=None):
+    """Hex HMAC-SHA256 of the raw request body, as computed by the kiosk"""
+    secret = secret if secret is not None else getattr(settings, 'KIOSK_SYNC_SECRET', '')
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+def verify_signature(request):
+    secret = getattr(settings, 'KIOSK_SYNC_SECRET', '')
+    if not secret:
+        raise BatchRejected('Kiosk sync is not configured', status=503, error_code='SYNC_DISABLED')
+    signature = request.META.get(SIGNATURE_HEADER, '')
+    if not signature or not hmac.compare_digest(signature, sign_payload(request.body, secret)):
+        raise BatchRejected('Invalid batch signature', status=401, error_code='INVALID_SIGNATURE')
+
+
+def _resolve_members(events):
+    """Map each event to a member via athlete_id or WebAuthn credential ID"""
+    athlete_ids = {event.get('athlete_id') for event in events if event.get('athlete_id')}
+    members = {member.athlete_id: member for member in Member.objects.filter(athlete_id__in=athlete_ids)}
+    resolved = []
+    for event in events:
+        member = members.get(event.get('athlete_id'))
+        if member is None and event.get('credential_id'):
+            member = credential_registry.resolve(event['credential_id'])
+        resolved.append(member)
+    return resolved
+
+
+def ingest_batch(kiosk_id, events, trace=None):
+    """
+    Insert queued kiosk check-ins in one bulk_create.
+
+    Each event is {"athlete_id" | "credential_id", "checked_in_at", "method"}.
+    Duplicates (within the batch or against existing rows) are dropped by
+    the (member, date) unique constraint. Returns (created attendances,
+    per-event results with status created/duplicate/rejected).
+    Stage timings cover the whole batch.
+    """
+    trace = trace or CheckInTrace(TRACE_METHOD)
+    max_batch = getattr(settings, 'KIOSK_SYNC_MAX_BATCH', DEFAULT_MAX_BATCH_SIZE)
+    if not isinstance(events, list) or not events:
+        raise BatchRejected('events must be a non-empty list')
+    if len(events) > max_batch:
+        raise BatchRejected(f'Batch too large (max {max_batch} events)', status=413, error_code='BATCH_TOO_LARGE')
+
+    now = timezone.now()
+    oldest = now - timedelta(days=getattr(settings, 'KIOSK_SYNC_MAX_AGE_DAYS', DEFAULT_MAX_EVENT_AGE_DAYS))
+    with trace.span('member_lookup'):
+        members = _resolve_members(events)
+
+    results = []
+    accepted = []
+    candidates = {}
+    winners = {}
+    for index, (event, member) in enumerate(zip(events, members)):
+        checked_in_at = parse_datetime(str(event.get('checked_in_at', '')))
+        if member is None:
+            results.append({'index': index, 'status': 'rejected', 'reason': 'member_not_found'})
+            continue
+        if checked_in_at is None:
+            results.append({'index': index, 'status': 'rejected', 'reason': 'invalid_timestamp'})
+            continue
+        if timezone.is_naive(checked_in_at):
+            checked_in_at = timezone.make_aware(checked_in_at)
+        if checked_in_at > now + MAX_CLOCK_SKEW or checked_in_at < oldest:
+            results.append({'index': index, 'status': 'rejected', 'reason': 'timestamp_out_of_range'})
+            continue
+
+        # Same calendar as the live endpoints, which use date.today()
+        day = checked_in_at.astimezone().date()
+        key = (member.pk, day)
+        method = str(event.get('method') or 'Biometric-Kiosk')[:20]
+        existing = candidates.get(key)
+        # Keep the earliest event per member and day
+        if existing is None or checked_in_at < existing.check_in_time:
+            candidates[key] = Attendance(member=member, date=day, check_in_time=checked_in_at, verification_method=method)
+            winners[key] = index
+        result = {'index': index, 'status': 'created', 'athlete_id': member.athlete_id, 'date': str(day)}
+        results.append(result)
+        accepted.append((result, key))
+
+    if not candidates:
+        return [], results
+
+    from . import checkin_guard, rollups
+
+    member_ids = {member_id for member_id, _ in candidates}
+    days = {day for _, day in candidates}
+    with trace.span('attendance_write'), transaction.atomic():
+        existing = Attendance.objects.filter(member_id__in=member_ids, date__in=days)
+        # A re-sent batch finds its own rows here
+        already = set(existing.values_list('member_id', 'date'))
+        Attendance.objects.bulk_create(list(candidates.values()), ignore_conflicts=True)
+        # ignore_conflicts does not say which rows went in (nor return their pks
+        # on every backend): read the rows back and keep those that are exactly
+        # our candidates, so a live check-in racing the insert is a duplicate
+        stored = {
+            (member_id, day): (pk, check_in_time)
+            for pk, member_id, day, check_in_time in existing.values_list('id', 'member_id', 'date', 'check_in_time')
+        }
+        created = []
+        for key, attendance in candidates.items():
+            pk, check_in_time = stored.get(key, (None, None))
+            if key not in already and check_in_time == attendance.check_in_time:
+                attendance.pk = pk
+                created.append(attendance)
+        # bulk_create skips post_save, so apply the rollups here
+        rollups.record_checkins(created)
+        transaction.on_commit(lambda: checkin_guard.mark_checked_in_many(created))
+
+    created_keys = {(attendance.member_id, attendance.date) for attendance in created}
+    for result, key in accepted:
+        if key not in created_keys or winners[key] != result['index']:
+            result['status'] = 'duplicate'
+
+    print(f"Kiosk sync from {kiosk_id}: {len(events)} events, {len(created)} check-ins created")
+    return created, results
+
+
+def notify_batch(kiosk_id, created, trace=None):
+    """One notification fan-out for the whole batch"""
+    if not created:
+        return
+    trace = trace or CheckInTrace(TRACE_METHOD)
+
+    from channels.layers import get_channel_layer
+    from asgiref.sync import async_to_sync
+    from apps.Notifications.models import Notification
+    from .biometric_views import get_afghanistan_time
+
+    try:
+        with trace.span('notification_create'):
+            notifications = [
+                Notification(
+                    user_id=attendance.member.user_id,
+                    message=f"Welcome back, {attendance.member.first_name}! Checked in at {get_afghanistan_time(attendance.check_in_time).strftime('%I:%M %p')}"
+                )
+                for attendance in created
+            ]
+            # The WebSocket payloads need the ids, which MySQL's bulk INSERT does not return
+            if connection.features.can_return_rows_from_bulk_insert:
+                Notification.objects.bulk_create(notifications)
+            else:
+                with transaction.atomic():
+                    for notification in notifications:
+                        notification.save(force_insert=True)
+            admin_notification = Notification.objects.create(
+                user=None,
+                message=f"{len(created)} offline check-ins synced from kiosk {kiosk_id}"
+            )
+
+        channel_layer = get_channel_layer()
+        messages = [
+            (
+                f"user_{notification.user_id}_notifications",
+                {
+                    "type": "send_notification",
+                    "notification": {
+                        "id": notification.id,
+                        "message": notification.message,
+                        "created_at": notification.created_at.isoformat() if notification.created_at else None,
+                        "is_read": notification.is_read,
+                        "link": "/member-dashboard/attendance"
+                    }
+                }
+            )
+            for notification in notifications
+        ]
+        messages.append((
+            "admin_notifications",
+            {
+                "type": "send_notification",
+                "notification": {
+                    "id": admin_notification.id,
+                    "message": admin_notification.message,
+                    "created_at": admin_notification.created_at.isoformat(),
+                    "is_read": False
+                }
+            }
+        ))
+
+        async def fan_out():
+            for group, message in messages:
+                await channel_layer.group_send(group, message)
+
+        with trace.span('websocket_send'):
+            async_to_sync(fan_out)()
+    except Exception as e:
+        print(f"Failed to send kiosk sync notifications: {e}")
+
+    # One admin email summarising the batch instead of one per check-in
+    try:
+        from apps.Notifications import outbox
+        lines = "\n".join(
+            f"{attendance.member.first_name} {attendance.member.last_name} ({attendance.member.athlete_id}) - "
+            f"{get_afghanistan_time(attendance.check_in_time).strftime('%Y-%m-%d %I:%M %p')}"
+            for attendance in created
+        )
+        outbox.enqueue_admin_email(
+            subject="Offline Check-ins Synced",
+            message=f"Kiosk {kiosk_id} synced {len(created)} offline check-ins:\n\n{lines}",
+            check_preferences=True
+        )
+    except Exception as e:
+        print(f"Failed to queue kiosk sync email: {e}")
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from apps.Attendance.archive import archive_attendance, archive_cutoff, archivable, DEFAULT_CHUNK_SIZE
+
+class Command(BaseCommand):
+    help = 'Move attendance older than the archive horizon into the history table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=None,
+            help='Keep this many days in the hot table (default: ATTENDANCE_ARCHIVE_DAYS)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=DEFAULT_CHUNK_SIZE,
+            help=f'Rows moved per transaction (default: {DEFAULT_CHUNK_SIZE})'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many rows would be archived'
+        )
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            cutoff = archive_cutoff(options['days'])
+            count = archivable(cutoff).count()
+            self.stdout.write(f'{count} attendance records before {cutoff} would be archived')
+            return
+
+        stats = archive_attendance(days=options['days'], chunk_size=options['chunk_size'])
+
+        seconds = stats['seconds']
+        rate = stats['rows'] / seconds if seconds else 0
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Archived {stats['rows']} attendance records before {stats['cutoff']} "
+                f"in {stats['chunks']} chunks, {seconds:.2f}s ({rate:.0f} rows/s)"
+            )
+        )
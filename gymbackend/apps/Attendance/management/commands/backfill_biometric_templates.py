@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.Member.models import Member
+from apps.Attendance.biometric_index import biometric_index
+from apps.Attendance.biometric_utils import BiometricSecurity
+from apps.Attendance.models import BiometricTemplate
+
+class Command(BaseCommand):
+    help = 'Create BiometricTemplate rows for existing members and fill missing canonical hashes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of templates inserted per bulk_create call (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        members = Member.objects.filter(biometric_registered=True).exclude(
+            biometric_hash__isnull=True
+        ).exclude(biometric_hash='').only('pk', 'biometric_hash', 'biometric_registered')
+
+        created_count = 0
+        skipped_count = 0
+        batch = []
+
+        def flush():
+            nonlocal created_count
+            with transaction.atomic():
+                # ignore_conflicts skips members whose template already exists
+                BiometricTemplate.objects.bulk_create(batch, ignore_conflicts=True)
+            created_count += len(batch)
+            batch.clear()
+
+        for member in members.iterator(chunk_size=batch_size):
+            template = BiometricTemplate.build(member, member.biometric_hash)
+            if template is None:
+                skipped_count += 1
+                continue
+            batch.append(template)
+            if len(batch) >= batch_size:
+                flush()
+
+        if batch:
+            flush()
+
+        # Templates created before canonical hashes existed
+        canonicalized_count = 0
+        stale = BiometricTemplate.objects.filter(canonical_hash='').only('pk', 'template_data')
+        for template in stale.iterator(chunk_size=batch_size):
+            template.canonical_hash = BiometricSecurity.canonical_hash(template.template_data)
+            batch.append(template)
+            if len(batch) >= batch_size:
+                BiometricTemplate.objects.bulk_update(batch, ['canonical_hash'])
+                canonicalized_count += len(batch)
+                batch.clear()
+        if batch:
+            BiometricTemplate.objects.bulk_update(batch, ['canonical_hash'])
+            canonicalized_count += len(batch)
+            batch.clear()
+
+        # bulk_create bypasses signals, so rebuild the kiosk index everywhere
+        biometric_index.invalidate()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Processed {created_count} biometric templates '
+                f'({BiometricTemplate.objects.count()} total, {skipped_count} skipped, '
+                f'{canonicalized_count} canonical hashes filled)'
+            )
+        )
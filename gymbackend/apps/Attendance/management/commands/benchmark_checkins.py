@@ -0,0 +1,457 @@
+import io
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import date, timedelta
+
+import django
+import numpy as np
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.Attendance.biometric_index import biometric_index
+from apps.Attendance.instrumentation import latency_recorder
+from apps.Attendance.models import Attendance, BiometricTemplate, CheckInPhoto
+from apps.Authentication.models import CustomUser, WebAuthnCredential
+from apps.Member.models import Member
+
+# Every seeded row carries this prefix so it can be found and removed again
+BENCH_PREFIX = 'bench-'
+# First name of every seeded member; admin notifications quote it
+BENCH_NAME = 'Bench'
+REFERENCE_PHOTO_NAME = 'pin_photos/bench_reference.jpg'
+
+ENDPOINTS = ('kiosk', 'pin', 'external', 'stats')
+ROUTES = {
+    'kiosk': ('POST', '/api/webauthn/kiosk/checkin/', '/api/async/webauthn/kiosk/checkin/'),
+    'pin': ('POST', '/api/pin/checkin/', '/api/async/pin/checkin/'),
+    'external': ('POST', '/api/webauthn/kiosk/external-sensor/', '/api/async/webauthn/kiosk/external-sensor/'),
+    'stats': ('GET', '/api/today_stats/', '/api/today_stats/'),
+}
+
+
+def _synthetic_photo():
+    """A face-free JPEG of kiosk-camera size; whether PIN check-ins accept it depends on the face backend"""
+    from PIL import Image
+
+    gradient = np.linspace(0, 255, 640, dtype=np.uint8)
+    pixels = np.dstack([np.tile(gradient, (480, 1))] * 3)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format='JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def _is_scratch_database():
+    """True for Django test databases and in-memory SQLite"""
+    name = str(connection.settings_dict.get('NAME') or '')
+    return name.startswith('test_') or name == ':memory:' or 'mode=memory' in name
+
+
+def _summary(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not values.size:
+        return None
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {
+        'mean': round(float(values.mean()), 2),
+        'p50': round(float(p50), 2),
+        'p95': round(float(p95), 2),
+        'p99': round(float(p99), 2),
+        'max': round(float(values.max()), 2),
+    }
+
+
+class InProcessTarget:
+    """Drives the views through Django's test client, one client per kiosk thread"""
+
+    name = 'in-process'
+    counts_queries = True
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def request(self, method, path, body, kiosk):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = Client(REMOTE_ADDR=f'10.99.0.{kiosk % 250 + 1}')
+        with CaptureQueriesContext(connection) as queries:
+            if method == 'GET':
+                response = client.get(path)
+            else:
+                response = client.post(path, body, content_type='application/json')
+        return response.status_code, len(queries.captured_queries)
+
+    def close_thread(self):
+        connection.close()
+
+
+class HttpTarget:
+    """Drives a running server over HTTP; queries are not visible from here"""
+
+    counts_queries = False
+
+    def __init__(self, base_url, timeout):
+        self.name = base_url
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, body, kiosk):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=body.encode() if method == 'POST' else None,
+            method=method,
+            headers={'Content-Type': 'application/json'},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+    def close_thread(self):
+        pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed synthetic members and drive the kiosk check-in endpoints from concurrent '
+        'simulated kiosks, reporting throughput, latency percentiles and query counts as JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--members',
+            type=int,
+            default=200,
+            help='Number of synthetic members to seed (default: 200)'
+        )
+        parser.add_argument(
+            '--kiosks',
+            type=int,
+            default=8,
+            help='Number of concurrent simulated kiosks (default: 8)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Measured requests per endpoint (default: 500)'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=int,
+            default=20,
+            help='Unmeasured requests per endpoint before each run (default: 20)'
+        )
+        parser.add_argument(
+            '--endpoints',
+            default=','.join(ENDPOINTS),
+            help=f'Comma-separated endpoints to drive (default: {",".join(ENDPOINTS)})'
+        )
+        parser.add_argument(
+            '--async-routes',
+            action='store_true',
+            help='Use the /api/async/ check-in routes (ASGI deployment)'
+        )
+        parser.add_argument(
+            '--base-url',
+            help='Drive a running server (e.g. http://127.0.0.1:8000) instead of the in-process client'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30.0,
+            help='Per-request timeout in seconds for --base-url (default: 30)'
+        )
+        parser.add_argument(
+            '--photo',
+            help='JPEG with a real face, used as reference and live photo so PIN check-ins can succeed'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed for the request mix (default: 1)'
+        )
+        parser.add_argument(
+            '--output',
+            help='Write the JSON report to this file instead of stdout'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the seeded members and their check-ins afterwards'
+        )
+        parser.add_argument(
+            '--allow-live-database',
+            action='store_true',
+            help='Run against a database that is not a test database (seeds and deletes real rows)'
+        )
+
+    def handle(self, *args, **options):
+        endpoints = [name.strip() for name in options['endpoints'].split(',') if name.strip()]
+        unknown = set(endpoints) - set(ENDPOINTS)
+        if unknown:
+            raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+        if options['members'] < 1 or options['kiosks'] < 1 or options['requests'] < 1:
+            raise CommandError('--members, --kiosks and --requests must be positive')
+        if not _is_scratch_database() and not options['allow_live_database']:
+            raise CommandError(
+                f"Database {connection.settings_dict.get('NAME')!r} is not a test database; "
+                f"pass --allow-live-database to seed and check in benchmark members there"
+            )
+
+        # Check-ins and member deletes would otherwise notify (and email) the admins
+        signals_were_disabled = os.environ.get('DJANGO_DISABLE_SIGNALS')
+        os.environ['DJANGO_DISABLE_SIGNALS'] = 'True'
+        try:
+            self._benchmark(options, endpoints)
+        finally:
+            if signals_were_disabled is None:
+                del os.environ['DJANGO_DISABLE_SIGNALS']
+
+    def _benchmark(self, options, endpoints):
+        if Member.objects.filter(athlete_id__startswith=BENCH_PREFIX).exists():
+            self.stderr.write('Removing benchmark members left over from a previous run')
+            self._cleanup()
+
+        photo_bytes = _synthetic_photo()
+        if options['photo']:
+            with open(options['photo'], 'rb') as f:
+                photo_bytes = f.read()
+
+        if options['base_url']:
+            target = HttpTarget(options['base_url'], options['timeout'])
+            self.stderr.write(
+                'Start the server with DJANGO_DISABLE_SIGNALS=True, or it notifies the admins of every '
+                'benchmark check-in (queued rows are removed again afterwards)'
+            )
+        else:
+            target = InProcessTarget()
+
+        started_at = timezone.now()
+        members = self._seed(options['members'], photo_bytes)
+        self.stderr.write(f"Seeded {len(members)} benchmark members")
+
+        try:
+            if target.counts_queries:
+                # In-memory channel layer, and the test client's host must be allowed
+                with override_settings(
+                    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+                    ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                ):
+                    report = self._run(target, members, endpoints, photo_bytes, options)
+            else:
+                report = self._run(target, members, endpoints, photo_bytes, options)
+        finally:
+            if not options['keep']:
+                self._cleanup(started_at)
+
+        report = {
+            'started_at': started_at.isoformat(),
+            'target': target.name,
+            'django_version': django.get_version(),
+            'database': connection.vendor,
+            'members': len(members),
+            'kiosks': options['kiosks'],
+            'requests_per_endpoint': options['requests'],
+            'async_routes': options['async_routes'],
+            'synthetic_photo': not options['photo'],
+            **report,
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f"Benchmark report written to {options['output']}"))
+        else:
+            self.stdout.write(output)
+
+    # Seeding -----------------------------------------------------------
+
+    def _seed(self, count, photo_bytes):
+        """Bulk-insert members (no post_save, so no revenue or registration side effects)"""
+        reference_name = default_storage.save(REFERENCE_PHOTO_NAME, ContentFile(photo_bytes))
+        used_pins = set(Member.objects.exclude(pin__isnull=True).values_list('pin', flat=True))
+        free_pins = (str(pin) for pin in range(100000, 1000000) if str(pin) not in used_pins)
+        today = date.today()
+
+        with transaction.atomic():
+            CustomUser.objects.bulk_create([
+                CustomUser(
+                    email=f'{BENCH_PREFIX}{index}@benchmark.invalid',
+                    username=f'{BENCH_PREFIX}{index}',
+                    first_name=BENCH_NAME,
+                    last_name=str(index),
+                    password='!',
+                )
+                for index in range(count)
+            ])
+            # Some backends do not return primary keys from bulk_create
+            users = CustomUser.objects.filter(username__startswith=BENCH_PREFIX).order_by('id')
+            members = Member.objects.bulk_create([
+                Member(
+                    user=user,
+                    athlete_id=user.username,
+                    first_name=user.first_name,
+                    last_name=user.last_name,
+                    biometric_hash=f'{user.username}-credential',
+                    biometric_registered=True,
+                    pin=next(free_pins),
+                    pin_enabled=True,
+                    pin_reference_photo=reference_name,
+                    monthly_fee=0,
+                    start_date=today,
+                    expiry_date=today + timedelta(days=30),
+                )
+                for user in users
+            ])
+            WebAuthnCredential.objects.bulk_create([
+                WebAuthnCredential(member=member, credential_id=member.biometric_hash, public_key='', rp_id='localhost')
+                for member in members
+            ])
+            BiometricTemplate.objects.bulk_create(
+                [template for template in (BiometricTemplate.build(member, member.biometric_hash) for member in members) if template],
+                ignore_conflicts=True,
+            )
+
+        # bulk_create bypasses signals, so rebuild the kiosk index everywhere
+        biometric_index.invalidate()
+        return members
+
+    def _cleanup(self, started_at=None):
+        """Delete the seeded members, their check-ins and files, and any notifications about them"""
+        from apps.Notifications.models import Notification, NotificationOutbox
+
+        bench_members = Member.objects.filter(athlete_id__startswith=BENCH_PREFIX)
+        photos = set(CheckInPhoto.objects.filter(attendance__member__in=bench_members).values_list('photo', flat=True))
+        photos |= set(bench_members.values_list('pin_reference_photo', flat=True).distinct())
+        for name in photos:
+            if name:
+                default_storage.delete(name)
+        # Row-by-row deletes keep the attendance rollups consistent
+        Attendance.objects.filter(member__in=bench_members).delete()
+        CustomUser.objects.filter(username__startswith=BENCH_PREFIX).delete()
+        biometric_index.invalidate()
+
+        # Members' own notifications went with their users; admin ones quote the member
+        admin_notifications = Notification.objects.filter(user__isnull=True, message__contains=f'{BENCH_NAME} ')
+        queued_emails = NotificationOutbox.objects.filter(payload__message__icontains=f'Athlete ID: {BENCH_PREFIX}')
+        if started_at is not None:
+            admin_notifications = admin_notifications.filter(created_at__gte=started_at)
+            queued_emails = queued_emails.filter(created_at__gte=started_at)
+        admin_notifications.delete()
+        queued_emails.delete()
+
+    # Load generation ---------------------------------------------------
+
+    def _request_body(self, endpoint, member, photo_data):
+        if endpoint == 'kiosk':
+            return json.dumps({'assertion': {'rawId': member.biometric_hash, 'id': member.biometric_hash}})
+        if endpoint == 'pin':
+            return json.dumps({'pin': member.pin, 'photo': photo_data})
+        if endpoint == 'external':
+            return json.dumps({
+                'fingerprint_data': {'template': member.biometric_hash},
+                'sensor_type': 'benchmark',
+                'quality': 'high'
+            })
+        return None
+
+    def _drive(self, target, requests, kiosks):
+        """Run (method, path, body) requests from `kiosks` threads; returns samples and wall time"""
+        samples = []
+        lock = threading.Lock()
+        cursor = iter(requests)
+
+        def kiosk_loop(kiosk):
+            local = []
+            try:
+                while True:
+                    with lock:
+                        job = next(cursor, None)
+                    if job is None:
+                        break
+                    method, path, body = job
+                    started = time.perf_counter()
+                    try:
+                        status, queries = target.request(method, path, body, kiosk)
+                    except Exception as e:
+                        status, queries = f'error: {type(e).__name__}', None
+                    local.append((time.perf_counter() - started, status, queries))
+            finally:
+                target.close_thread()
+                with lock:
+                    samples.extend(local)
+
+        threads = [threading.Thread(target=kiosk_loop, args=(kiosk,)) for kiosk in range(kiosks)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, time.perf_counter() - started
+
+    def _run(self, target, members, endpoints, photo_bytes, options):
+        import base64
+
+        rng = random.Random(options['seed'])
+        photo_data = 'data:image/jpeg;base64,' + base64.b64encode(photo_bytes).decode()
+        route_index = 2 if options['async_routes'] else 1
+
+        if 'pin' in endpoints and target.counts_queries:
+            # Spawn the face pool up front so worker start-up is not measured
+            from apps.Attendance.face_service import face_service
+            face_service.start(wait=True)
+
+        latency_recorder.reset()
+        results = {}
+        for endpoint in endpoints:
+            method, path = ROUTES[endpoint][0], ROUTES[endpoint][route_index]
+            # Each check-in run starts with nobody checked in today
+            Attendance.objects.filter(member__in=members, date=date.today()).delete()
+
+            def jobs(count):
+                return [
+                    (method, path, self._request_body(endpoint, rng.choice(members), photo_data))
+                    for _ in range(count)
+                ]
+
+            if options['warmup']:
+                self._drive(target, jobs(options['warmup']), options['kiosks'])
+            samples, wall_time = self._drive(target, jobs(options['requests']), options['kiosks'])
+
+            status_codes = {}
+            for _, status, _ in samples:
+                status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+            queries = [count for _, _, count in samples if count is not None]
+            results[endpoint] = {
+                'path': path,
+                'requests': len(samples),
+                'seconds': round(wall_time, 3),
+                'throughput_rps': round(len(samples) / wall_time, 2) if wall_time else None,
+                'latency_ms': _summary([seconds * 1000 for seconds, _, _ in samples]),
+                'status_codes': status_codes,
+                'queries_per_request': _summary(queries) if target.counts_queries else None,
+            }
+            self.stderr.write(
+                f"{endpoint}: {results[endpoint]['throughput_rps']} req/s, "
+                f"p95 {results[endpoint]['latency_ms']['p95']} ms, status {status_codes}"
+            )
+
+        report = {'endpoints': results}
+        if target.counts_queries:
+            # Per-stage breakdown from the check-in views' own instrumentation
+            report['stages'] = latency_recorder.snapshot()
+        return report
@@ -1,35 +1,49 @@
 from django.core.management.base import BaseCommand
 from django.utils import timezone
 from datetime import timedelta
-import os
-from apps.Attendance.models import CheckInPhoto
+from apps.Attendance.photo_cleanup import cleanup_expired_photos
 
 class Command(BaseCommand):
     help = 'Delete check-in photos older than 24 hours'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Delete photos older than this many hours (default: 24)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Number of rows deleted per DELETE statement (default: 1000)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Threads used for individual file deletes (default: 8)'
+        )
+
     def handle(self, *args, **options):
-        # Calculate 24 hours ago
-        cutoff_time = timezone.now() - timedelta(hours=24)
-        
-        # Find photos older than 24 hours
-        old_photos = CheckInPhoto.objects.filter(created_at__lt=cutoff_time)
-        
-        deleted_count = 0
-        for photo in old_photos:
-            try:
-                # Delete the actual file
-                if photo.photo and os.path.exists(photo.photo.path):
-                    os.remove(photo.photo.path)
-                
-                # Delete the database record
-                photo.delete()
-                deleted_count += 1
-                
-            except Exception as e:
-                self.stdout.write(
-                    self.style.ERROR(f'Error deleting photo {photo.id}: {e}')
-                )
-        
+        cutoff_time = timezone.now() - timedelta(hours=options['hours'])
+
+        stats = cleanup_expired_photos(
+            cutoff_time,
+            chunk_size=options['chunk_size'],
+            workers=options['workers']
+        )
+
+        seconds = stats['seconds']
+        rate = stats['rows'] / seconds if seconds else 0
+        if stats['errors']:
+            self.stdout.write(self.style.ERROR(f"{stats['errors']} files or directories could not be deleted"))
+
         self.stdout.write(
-            self.style.SUCCESS(f'Successfully deleted {deleted_count} old check-in photos')
-        )
\ No newline at end of file
+            self.style.SUCCESS(
+                f"Successfully deleted {stats['rows']} old check-in photos "
+                f"({stats['directories']} date directories removed, {stats['files']} files unlinked) "
+                f"in {seconds:.2f}s ({rate:.0f} photos/s)"
+            )
+        )
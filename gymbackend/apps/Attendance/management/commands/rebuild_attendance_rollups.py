@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from apps.Attendance import rollups
+
+class Command(BaseCommand):
+    help = 'Rebuild AttendanceDailySummary and MemberAttendanceCounter from the Attendance table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of rows inserted per bulk_create call (default: 500)'
+        )
+        parser.add_argument(
+            '--recent-only',
+            action='store_true',
+            help='Only slide the rolling window of the member counters to today'
+        )
+
+    def handle(self, *args, **options):
+        if options['recent_only']:
+            rollups.refresh_recent_counts(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS('Refreshed rolling member attendance counts'))
+            return
+
+        summary_count, counter_count = rollups.rebuild(batch_size=options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Rebuilt {summary_count} daily summaries and {counter_count} member counters'
+            )
+        )
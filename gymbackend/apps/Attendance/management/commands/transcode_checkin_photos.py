@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from datetime import timedelta
+from apps.Attendance.photo_transcode import transcode_pending
+
+class Command(BaseCommand):
+    help = 'Re-encode pending check-in photos and generate their review thumbnails'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Maximum number of photos to process (default: all pending)'
+        )
+        parser.add_argument(
+            '--min-age',
+            type=int,
+            default=5,
+            help='Only process photos older than this many minutes, leaving fresh ones '
+                 'to the background transcoder (default: 5, 0 processes all)'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = None
+        if options['min_age']:
+            cutoff = timezone.now() - timedelta(minutes=options['min_age'])
+
+        stats = transcode_pending(limit=options['limit'], cutoff=cutoff)
+
+        if stats['errors']:
+            self.stdout.write(self.style.ERROR(f"{stats['errors']} photos could not be transcoded"))
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Transcoded {stats['photos']} check-in photos, "
+                f"saving {stats['bytes_saved'] / 1024:.0f} KiB"
+            )
+        )
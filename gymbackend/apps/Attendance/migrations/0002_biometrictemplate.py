@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-17 17:52
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Attendance', '0001_initial'),
+        ('Member', '0002_member_pin_member_pin_enabled_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BiometricTemplate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('template_data', models.TextField(help_text='Raw credential or template string as received from the sensor', verbose_name='Template Data')),
+                ('primary_hash', models.CharField(db_index=True, max_length=64, verbose_name='Primary Hash')),
+                ('secondary_hash', models.CharField(db_index=True, max_length=32, verbose_name='Secondary Hash')),
+                ('length_signature', models.PositiveIntegerField(db_index=True, verbose_name='Length Signature')),
+                ('pattern_signature', models.CharField(db_index=True, max_length=64, verbose_name='Pattern Signature')),
+                ('char_frequency', models.JSONField(default=dict, verbose_name='Character Frequency')),
+                ('source', models.CharField(choices=[('member_hash', 'Member biometric hash'), ('webauthn', 'WebAuthn credential'), ('external', 'External sensor')], default='member_hash', max_length=20, verbose_name='Source')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('member', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprint_templates', to='Member.member', verbose_name='Member')),
+            ],
+            options={
+                'verbose_name': 'Biometric Template',
+                'verbose_name_plural': 'Biometric Templates',
+                'ordering': ['-created_at'],
+                'unique_together': {('member', 'primary_hash')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Attendance', '0002_biometrictemplate'),
+        ('Member', '0003_member_pin_reference_encoding'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['-date', '-check_in_time', '-id'], name='attendance_history_idx'),
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.1 on 2026-10-17 18:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Attendance', '0003_attendance_history_idx'),
+        ('Member', '0003_member_pin_reference_encoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MemberAttendanceCounter',
+            fields=[
+                ('member', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='attendance_counter', serialize=False, to='Member.member', verbose_name='Member')),
+                ('total_count', models.PositiveIntegerField(default=0, verbose_name='Total Check-ins')),
+                ('recent_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Recent Check-ins')),
+                ('window_date', models.DateField(blank=True, null=True, verbose_name='Window End Date')),
+                ('last_check_in_date', models.DateField(blank=True, null=True, verbose_name='Last Check-in Date')),
+            ],
+            options={
+                'verbose_name': 'Member Attendance Counter',
+                'verbose_name_plural': 'Member Attendance Counters',
+                'ordering': ['-recent_count'],
+            },
+        ),
+        migrations.CreateModel(
+            name='AttendanceDailySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(db_index=True, verbose_name='Date')),
+                ('time_slot', models.CharField(choices=[('morning', 'Morning'), ('afternoon', 'Afternoon'), ('evening', 'Evening')], max_length=10, verbose_name='Time Slot')),
+                ('verification_method', models.CharField(max_length=20, verbose_name='Verification Method')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Check-ins')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Updated At')),
+            ],
+            options={
+                'verbose_name': 'Attendance Daily Summary',
+                'verbose_name_plural': 'Attendance Daily Summaries',
+                'ordering': ['-date', 'time_slot', 'verification_method'],
+                'unique_together': {('date', 'time_slot', 'verification_method')},
+            },
+        ),
+    ]
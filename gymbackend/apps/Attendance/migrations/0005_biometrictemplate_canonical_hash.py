@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 18:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Attendance', '0004_attendance_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='biometrictemplate',
+            name='canonical_hash',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='SHA-256 of the sensor-independent canonical template form', max_length=64, verbose_name='Canonical Hash'),
+        ),
+    ]
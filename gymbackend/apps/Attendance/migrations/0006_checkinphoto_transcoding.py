@@ -0,0 +1,49 @@
+# Generated by Django 5.1.1 on 2026-10-17 18:40
+
+import apps.Attendance.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Attendance', '0005_biometrictemplate_canonical_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkinphoto',
+            name='file_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Bytes of the stored (transcoded) photo', null=True, verbose_name='File Size'),
+        ),
+        migrations.AddField(
+            model_name='checkinphoto',
+            name='height',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Height'),
+        ),
+        migrations.AddField(
+            model_name='checkinphoto',
+            name='original_size',
+            field=models.PositiveIntegerField(blank=True, help_text='Bytes of the photo as uploaded by the kiosk', null=True, verbose_name='Original Size'),
+        ),
+        migrations.AddField(
+            model_name='checkinphoto',
+            name='processed_at',
+            field=models.DateTimeField(blank=True, db_index=True, help_text='When the photo was transcoded; empty while pending', null=True, verbose_name='Processed At'),
+        ),
+        migrations.AddField(
+            model_name='checkinphoto',
+            name='thumbnail',
+            field=models.ImageField(blank=True, help_text='Small review copy generated in the background', upload_to=apps.Attendance.models.checkin_thumbnail_path, verbose_name='Thumbnail'),
+        ),
+        migrations.AddField(
+            model_name='checkinphoto',
+            name='thumbnail_size',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Thumbnail Size'),
+        ),
+        migrations.AddField(
+            model_name='checkinphoto',
+            name='width',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='Width'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.1 on 2026-10-17 18:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Attendance', '0006_checkinphoto_transcoding'),
+        ('Member', '0003_member_pin_reference_encoding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AttendanceHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Date')),
+                ('check_in_time', models.DateTimeField(verbose_name='Check-in Time')),
+                ('verification_method', models.CharField(default='Biometric', max_length=20, verbose_name='Verification Method')),
+                ('member', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendances', to='Member.member', verbose_name='Member')),
+            ],
+            options={
+                'verbose_name': 'Archived Attendance',
+                'verbose_name_plural': 'Archived Attendances',
+                'ordering': ['-date', '-check_in_time'],
+                'indexes': [models.Index(fields=['-date', '-check_in_time', '-id'], name='attendance_archive_idx')],
+                'unique_together': {('member', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 20:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Attendance', '0007_attendancehistory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='checkinphoto',
+            name='transcode_claimed_at',
+            field=models.DateTimeField(blank=True, editable=False, help_text='When a worker started transcoding; stale after CHECKIN_PHOTO_TRANSCODE_LEASE seconds', null=True, verbose_name='Transcode Claimed At'),
+        ),
+    ]
@@ -7,6 +7,10 @@ def checkin_photo_path(instance, filename):
     """Generate path for check-in photos"""
     return f'checkin_photos/{instance.attendance.date}/{instance.attendance.member.athlete_id}_{filename}'
 
+def checkin_thumbnail_path(instance, filename):
+    """Generate path for check-in photo thumbnails (inside the photo's date directory)"""
+    return f'checkin_photos/{instance.attendance.date}/thumbs/{filename}'
+
 class Attendance(models.Model):
     member = models.ForeignKey(
         Member, 
@@ -35,6 +39,10 @@ class Attendance(models.Model):
         verbose_name = _('Attendance')
         verbose_name_plural = _('Attendances')
         ordering = ['-date', '-check_in_time']
+        indexes = [
+            # Keyset pagination of attendance history
+            models.Index(fields=['-date', '-check_in_time', '-id'], name='attendance_history_idx'),
+        ]
         
     def __str__(self):
         return f"{self.member.first_name} {self.member.last_name} - {self.date}"
@@ -46,6 +54,44 @@ class Attendance(models.Model):
             return self.check_in_time.strftime('%I:%M:%S %p')
         return "N/A"
 
+class AttendanceHistory(models.Model):
+    """Archived attendance (cold table)
+    
+    Rows older than ATTENDANCE_ARCHIVE_DAYS are moved here by
+    apps.Attendance.archive. They keep their Attendance id, so history
+    cursors stay valid across archival and ids never clash with hot rows.
+    """
+    id = models.BigIntegerField(primary_key=True, verbose_name=_('ID'))
+    member = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name='archived_attendances',
+        # (member, date) unique index already covers member lookups
+        db_index=False,
+        verbose_name=_('Member')
+    )
+    date = models.DateField(verbose_name=_('Date'))
+    check_in_time = models.DateTimeField(verbose_name=_('Check-in Time'))
+    verification_method = models.CharField(
+        max_length=20,
+        default='Biometric',
+        verbose_name=_('Verification Method')
+    )
+
+    class Meta:
+        app_label = 'Attendance'
+        unique_together = ('member', 'date')
+        verbose_name = _('Archived Attendance')
+        verbose_name_plural = _('Archived Attendances')
+        ordering = ['-date', '-check_in_time']
+        indexes = [
+            models.Index(fields=['-date', '-check_in_time', '-id'], name='attendance_archive_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.member.first_name} {self.member.last_name} - {self.date} (archived)"
+
+
 class CheckInPhoto(models.Model):
     """Store photos taken during PIN check-in for security verification
     
@@ -62,6 +108,41 @@ class CheckInPhoto(models.Model):
         verbose_name=_('Check-in Photo'),
         help_text=_('Photo taken during check-in for security verification. Auto-deleted after 24 hours.')
     )
+    thumbnail = models.ImageField(
+        upload_to=checkin_thumbnail_path,
+        blank=True,
+        verbose_name=_('Thumbnail'),
+        help_text=_('Small review copy generated in the background')
+    )
+    width = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Width'))
+    height = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Height'))
+    original_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('Original Size'),
+        help_text=_('Bytes of the photo as uploaded by the kiosk')
+    )
+    file_size = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name=_('File Size'),
+        help_text=_('Bytes of the stored (transcoded) photo')
+    )
+    thumbnail_size = models.PositiveIntegerField(null=True, blank=True, verbose_name=_('Thumbnail Size'))
+    processed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name=_('Processed At'),
+        help_text=_('When the photo was transcoded; empty while pending')
+    )
+    transcode_claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name=_('Transcode Claimed At'),
+        help_text=_('When a worker started transcoding; stale after CHECKIN_PHOTO_TRANSCODE_LEASE seconds')
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name=_('Created At')
@@ -76,3 +157,163 @@ class CheckInPhoto(models.Model):
     def __str__(self):
         return f"Photo for {self.attendance.member.first_name} {self.attendance.member.last_name} - {self.attendance.date}"
 
+
+class BiometricTemplate(models.Model):
+    """Registered biometric credential with its matching features precomputed
+    
+    Several templates may belong to one member. The template mirrored from the
+    legacy ``Member.biometric_hash`` field uses the ``member_hash`` source.
+    """
+    SOURCE_MEMBER_HASH = 'member_hash'
+    SOURCE_CHOICES = [
+        (SOURCE_MEMBER_HASH, _('Member biometric hash')),
+        ('webauthn', _('WebAuthn credential')),
+        ('external', _('External sensor')),
+    ]
+
+    member = models.ForeignKey(
+        Member,
+        on_delete=models.CASCADE,
+        related_name='fingerprint_templates',
+        verbose_name=_('Member')
+    )
+    template_data = models.TextField(
+        verbose_name=_('Template Data'),
+        help_text=_('Raw credential or template string as received from the sensor')
+    )
+    primary_hash = models.CharField(max_length=64, db_index=True, verbose_name=_('Primary Hash'))
+    secondary_hash = models.CharField(max_length=32, db_index=True, verbose_name=_('Secondary Hash'))
+    length_signature = models.PositiveIntegerField(db_index=True, verbose_name=_('Length Signature'))
+    pattern_signature = models.CharField(max_length=64, db_index=True, verbose_name=_('Pattern Signature'))
+    canonical_hash = models.CharField(
+        max_length=64,
+        db_index=True,
+        blank=True,
+        default='',
+        verbose_name=_('Canonical Hash'),
+        help_text=_('SHA-256 of the sensor-independent canonical template form')
+    )
+    char_frequency = models.JSONField(default=dict, verbose_name=_('Character Frequency'))
+    source = models.CharField(
+        max_length=20,
+        choices=SOURCE_CHOICES,
+        default=SOURCE_MEMBER_HASH,
+        verbose_name=_('Source')
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name=_('Created At')
+    )
+
+    class Meta:
+        app_label = 'Attendance'
+        unique_together = ('member', 'primary_hash')
+        verbose_name = _('Biometric Template')
+        verbose_name_plural = _('Biometric Templates')
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Template {self.primary_hash[:12]} for {self.member.first_name} {self.member.last_name}"
+
+    @property
+    def features(self):
+        """Feature dict in the shape produced by BiometricSecurity.extract_biometric_features"""
+        return {
+            'primary_hash': self.primary_hash,
+            'secondary_hash': self.secondary_hash,
+            'length_signature': self.length_signature,
+            'char_frequency': self.char_frequency,
+            'pattern_signature': self.pattern_signature,
+        }
+
+    @classmethod
+    def build(cls, member, template_data, source=SOURCE_MEMBER_HASH):
+        """Create an unsaved template with its features extracted"""
+        from .biometric_utils import BiometricSecurity
+        features = BiometricSecurity.extract_biometric_features(template_data)
+        if not features:
+            return None
+        return cls(
+            member=member,
+            template_data=template_data,
+            source=source,
+            canonical_hash=BiometricSecurity.canonical_hash(template_data),
+            **features
+        )
+
+    @classmethod
+    def sync_member_hash(cls, member):
+        """Mirror the member's legacy biometric_hash into the template table"""
+        if not (member.biometric_registered and member.biometric_hash):
+            cls.objects.filter(member=member).delete()
+            return None
+
+        template = cls.build(member, member.biometric_hash)
+        if template is None:
+            return None
+
+        cls.objects.filter(member=member, source=cls.SOURCE_MEMBER_HASH).exclude(
+            primary_hash=template.primary_hash
+        ).delete()
+
+        existing = cls.objects.filter(member=member, primary_hash=template.primary_hash).first()
+        if existing:
+            return existing
+        template.save()
+        return template
+
+
+
+class AttendanceDailySummary(models.Model):
+    """Materialized check-in count per day, time slot and verification method
+    
+    Maintained by apps.Attendance.rollups as attendance rows are created or
+    deleted; rebuild with ``manage.py rebuild_attendance_rollups``.
+    """
+    date = models.DateField(db_index=True, verbose_name=_('Date'))
+    time_slot = models.CharField(
+        max_length=10,
+        choices=Member.TIME_SLOT_CHOICES,
+        verbose_name=_('Time Slot')
+    )
+    verification_method = models.CharField(max_length=20, verbose_name=_('Verification Method'))
+    count = models.PositiveIntegerField(default=0, verbose_name=_('Check-ins'))
+    updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Updated At'))
+
+    class Meta:
+        app_label = 'Attendance'
+        unique_together = ('date', 'time_slot', 'verification_method')
+        verbose_name = _('Attendance Daily Summary')
+        verbose_name_plural = _('Attendance Daily Summaries')
+        ordering = ['-date', 'time_slot', 'verification_method']
+
+    def __str__(self):
+        return f"{self.date} {self.time_slot} {self.verification_method}: {self.count}"
+
+
+class MemberAttendanceCounter(models.Model):
+    """Per-member attendance counters
+    
+    ``recent_count`` covers the rolling window ending on ``window_date``
+    (see rollups.ROLLING_WINDOW_DAYS) and is recomputed once a day.
+    """
+    member = models.OneToOneField(
+        Member,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='attendance_counter',
+        verbose_name=_('Member')
+    )
+    total_count = models.PositiveIntegerField(default=0, verbose_name=_('Total Check-ins'))
+    recent_count = models.PositiveIntegerField(default=0, db_index=True, verbose_name=_('Recent Check-ins'))
+    window_date = models.DateField(null=True, blank=True, verbose_name=_('Window End Date'))
+    last_check_in_date = models.DateField(null=True, blank=True, verbose_name=_('Last Check-in Date'))
+
+    class Meta:
+        app_label = 'Attendance'
+        verbose_name = _('Member Attendance Counter')
+        verbose_name_plural = _('Member Attendance Counters')
+        ordering = ['-recent_count']
+
+    def __str__(self):
+        return f"{self.member.first_name} {self.member.last_name}: {self.recent_count} recent / {self.total_count} total"
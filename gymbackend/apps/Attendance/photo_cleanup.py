@@ -0,0 +1,97 @@
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date as date_class
+
+from django.core.files.storage import default_storage
+from django.utils import timezone
+
+from .models import CheckInPhoto
+
+# checkin_photo_path stores files under <PHOTO_ROOT>/<attendance date>/
+PHOTO_ROOT = 'checkin_photos'
+
+
+def _local_root():
+    """Filesystem path of the photo root, or None for non-local storage"""
+    try:
+        return default_storage.path(PHOTO_ROOT)
+    except NotImplementedError:
+        return None
+
+
+def _date_directories(root):
+    """{date: path} for every date-named directory under the photo root"""
+    directories = {}
+    if not root or not os.path.isdir(root):
+        return directories
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if not entry.is_dir():
+                continue
+            try:
+                directories[date_class.fromisoformat(entry.name)] = entry.path
+            except ValueError:
+                continue
+    return directories
+
+
+def _unlink(name):
+    try:
+        default_storage.delete(name)
+        return True
+    except Exception as e:
+        print(f"Failed to delete photo file {name}: {e}")
+        return False
+
+
+def cleanup_expired_photos(cutoff, chunk_size=1000, workers=8):
+    """
+    Delete CheckInPhoto rows created before cutoff together with their files.
+
+    Rows are deleted in chunks of bulk DELETEs. Date directories with no
+    remaining photos are removed whole with one rmtree; files of rows that
+    share a directory with live photos are unlinked on a thread pool.
+    Returns a stats dict (rows, directories, files, errors, seconds).
+    """
+    started = time.monotonic()
+    expired = CheckInPhoto.objects.filter(created_at__lt=cutoff)
+    live_dates = set(
+        CheckInPhoto.objects.filter(created_at__gte=cutoff).values_list('attendance__date', flat=True).distinct()
+    )
+    root = _local_root()
+    directories = _date_directories(root)
+    # Whole partitions can go only when nothing live still points into them;
+    # directories are named by local (TIME_ZONE) attendance date
+    cutoff_date = timezone.localdate(cutoff)
+    removable_dates = {day for day in directories if day not in live_dates and day < cutoff_date}
+
+    stats = {'rows': 0, 'directories': 0, 'files': 0, 'errors': 0}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            chunk = list(expired.values_list('pk', 'photo', 'thumbnail', 'attendance__date')[:chunk_size])
+            if not chunk:
+                break
+            # No delete receivers or cascades on CheckInPhoto, so this is one DELETE
+            CheckInPhoto.objects.filter(pk__in=[pk for pk, _, _, _ in chunk]).delete()
+            stats['rows'] += len(chunk)
+
+            names = [
+                name
+                for _, photo, thumbnail, day in chunk if day not in removable_dates
+                for name in (photo, thumbnail) if name
+            ]
+            for deleted in executor.map(_unlink, names):
+                stats['files' if deleted else 'errors'] += 1
+
+    for day in sorted(removable_dates):
+        try:
+            shutil.rmtree(directories[day])
+            stats['directories'] += 1
+        except OSError as e:
+            print(f"Failed to remove photo directory {directories[day]}: {e}")
+            stats['errors'] += 1
+
+    stats['seconds'] = time.monotonic() - started
+    return stats
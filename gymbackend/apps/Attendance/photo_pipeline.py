@@ -0,0 +1,97 @@
+import base64
+import io
+
+import numpy as np
+from PIL import Image
+
+# Longest side of the copy used for face detection/encoding
+DETECTION_MAX_SIDE = 640
+
+
+class DecodedPhoto:
+    """
+    A check-in photo decoded once and shared by validation, comparison and
+    storage.
+
+    Carries the raw image bytes, the full-resolution RGB array and a
+    downscaled RGB detection copy. The arrays are decoded lazily; JPEG
+    frames are decoded straight at reduced scale for the detection copy so
+    full-resolution kiosk frames never need to be expanded in memory unless
+    `array` is asked for. Only the raw bytes are pickled, so sending a photo
+    to the verification pool costs one copy of the compressed image.
+    """
+
+    def __init__(self, raw_bytes, detection_max_side=DETECTION_MAX_SIDE):
+        self.raw_bytes = raw_bytes
+        self.detection_max_side = detection_max_side
+        self._size = None
+        self._array = None
+        self._detection_array = None
+        # Per-photo results a backend wants to reuse (e.g. face locations)
+        self.analysis = {}
+
+    @classmethod
+    def from_base64(cls, photo_base64, **kwargs):
+        """Decode a base64 string, with or without a data:image/ prefix"""
+        if photo_base64.startswith('data:image/'):
+            _, imgstr = photo_base64.split(';base64,')
+        else:
+            imgstr = photo_base64
+        return cls(base64.b64decode(imgstr), **kwargs)
+
+    @classmethod
+    def coerce(cls, photo):
+        """Accept either a DecodedPhoto or a base64 string"""
+        if isinstance(photo, cls):
+            return photo
+        return cls.from_base64(photo)
+
+    def __getstate__(self):
+        return {'raw_bytes': self.raw_bytes, 'detection_max_side': self.detection_max_side}
+
+    def __setstate__(self, state):
+        self.__init__(state['raw_bytes'], state['detection_max_side'])
+
+    def _open(self):
+        return Image.open(io.BytesIO(self.raw_bytes))
+
+    @property
+    def size(self):
+        """(width, height) of the original image, read from the header only"""
+        if self._size is None:
+            self._size = self._open().size
+        return self._size
+
+    @property
+    def array(self):
+        """Full-resolution RGB array"""
+        if self._array is None:
+            self._array = np.asarray(self._open().convert('RGB'))
+        return self._array
+
+    @property
+    def detection_array(self):
+        """RGB array whose longest side is at most detection_max_side"""
+        if self._detection_array is None:
+            if self._array is not None:
+                image = Image.fromarray(self._array)
+            else:
+                image = self._open()
+                self._size = image.size
+                # JPEG: let the decoder skip the full-resolution pass
+                image.draft('RGB', (self.detection_max_side, self.detection_max_side))
+            image = image.convert('RGB')
+            if max(image.size) > self.detection_max_side:
+                image.thumbnail((self.detection_max_side, self.detection_max_side))
+            self._detection_array = np.asarray(image)
+        return self._detection_array
+
+    @property
+    def detection_scale(self):
+        """Factor mapping detection-copy pixels back to original pixels"""
+        return max(self.size) / max(self.detection_array.shape[:2])
+
+    def content_file(self, name):
+        """ContentFile for saving the original bytes to an ImageField"""
+        from django.core.files.base import ContentFile
+        return ContentFile(self.raw_bytes, name=name)
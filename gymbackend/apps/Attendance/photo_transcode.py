@@ -0,0 +1,205 @@
+import io
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import CheckInPhoto
+
+DEFAULT_FORMAT = 'JPEG'
+DEFAULT_MAX_SIDE = 1280
+DEFAULT_QUALITY = 80
+DEFAULT_THUMBNAIL_SIDE = 320
+DEFAULT_TRANSCODE_LEASE = 10 * 60  # seconds before a claimed photo counts as abandoned
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _encode(image, image_format, quality):
+    buffer = io.BytesIO()
+    options = {'quality': quality}
+    if image_format == 'JPEG':
+        options.update(optimize=True, progressive=True)
+    else:
+        options['method'] = 4
+    image.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def thumbnail_path(photo_name, extension):
+    """checkin_photos/<date>/thumbs/<photo stem>.<ext>, next to the photo's date partition"""
+    directory, filename = posixpath.split(photo_name)
+    stem = os.path.splitext(filename)[0]
+    return posixpath.join(directory, 'thumbs', f'{stem}.{extension}')
+
+
+def transcode_photo(photo):
+    """
+    Re-encode a stored check-in photo to a compact JPEG/WebP, create its
+    review thumbnail and record dimensions and byte sizes.
+    The original file is replaced only when the re-encoded copy is smaller.
+    Returns: bytes saved on the photo itself
+    """
+    image_format = str(_setting('CHECKIN_PHOTO_FORMAT', DEFAULT_FORMAT)).upper()
+    if image_format not in EXTENSIONS:
+        image_format = DEFAULT_FORMAT
+    extension = EXTENSIONS[image_format]
+    max_side = _setting('CHECKIN_PHOTO_MAX_SIDE', DEFAULT_MAX_SIDE)
+    quality = _setting('CHECKIN_PHOTO_QUALITY', DEFAULT_QUALITY)
+    thumbnail_side = _setting('CHECKIN_THUMBNAIL_SIDE', DEFAULT_THUMBNAIL_SIDE)
+
+    old_name = photo.photo.name
+    with default_storage.open(old_name, 'rb') as source:
+        raw_bytes = source.read()
+
+    image = Image.open(io.BytesIO(raw_bytes))
+    # Kiosk cameras may only rotate via EXIF; bake it in before dropping metadata
+    image = ImageOps.exif_transpose(image).convert('RGB')
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+
+    compact = _encode(image, image_format, quality)
+    new_name = old_name
+    file_size = len(raw_bytes)
+    if len(compact) < len(raw_bytes):
+        stem = os.path.splitext(old_name)[0]
+        new_name = default_storage.save(f'{stem}.{extension}', ContentFile(compact))
+        file_size = len(compact)
+    else:
+        # Already compact; keep the stored file but still report its real size
+        image = Image.open(io.BytesIO(raw_bytes))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+
+    thumbnail = image.copy()
+    thumbnail.thumbnail((thumbnail_side, thumbnail_side), Image.LANCZOS)
+    thumbnail_bytes = _encode(thumbnail, image_format, quality)
+    old_thumbnail = photo.thumbnail.name if photo.thumbnail else None
+    thumbnail_name = default_storage.save(thumbnail_path(new_name, extension), ContentFile(thumbnail_bytes))
+
+    photo.photo.name = new_name
+    photo.thumbnail.name = thumbnail_name
+    photo.width, photo.height = image.size
+    photo.original_size = photo.original_size or len(raw_bytes)
+    photo.file_size = file_size
+    photo.thumbnail_size = len(thumbnail_bytes)
+    photo.processed_at = timezone.now()
+    photo.save(update_fields=[
+        'photo', 'thumbnail', 'width', 'height', 'original_size',
+        'file_size', 'thumbnail_size', 'processed_at'
+    ])
+
+    # Drop replaced files only after the row points at the new ones
+    for name in (old_name if new_name != old_name else None, old_thumbnail):
+        if name and name != thumbnail_name:
+            try:
+                default_storage.delete(name)
+            except Exception as e:
+                print(f"Failed to delete replaced photo file {name}: {e}")
+    return len(raw_bytes) - file_size
+
+
+def _unclaimed(now):
+    """Pending photos nobody is working on: never claimed, or the claim's lease ran out"""
+    stale = now - timedelta(seconds=_setting('CHECKIN_PHOTO_TRANSCODE_LEASE', DEFAULT_TRANSCODE_LEASE))
+    return Q(processed_at__isnull=True) & (Q(transcode_claimed_at__isnull=True) | Q(transcode_claimed_at__lt=stale))
+
+
+def _claim(photo_pk):
+    """
+    Lease a pending photo before working on it, so the post_save job and a
+    sweep never transcode the same row. A worker that dies mid-transcode
+    leaves the photo pending; its lease expires and the next sweep retries it.
+    Returns: whether this caller got the photo
+    """
+    now = timezone.now()
+    return CheckInPhoto.objects.filter(_unclaimed(now), pk=photo_pk).update(transcode_claimed_at=now) == 1
+
+
+def _transcode_or_skip(photo):
+    """
+    Claim and transcode_photo, except that a missing or undecodable file is
+    marked processed (served as stored) so it is not retried on every sweep
+    Returns: bytes saved, or None when another worker has the photo
+    """
+    if not _claim(photo.pk):
+        return None
+    try:
+        return transcode_photo(photo)
+    except OSError as e:
+        # PIL's UnidentifiedImageError and FileNotFoundError are both OSErrors
+        print(f"Skipping check-in photo {photo.pk}: {e}")
+        CheckInPhoto.objects.filter(pk=photo.pk).update(processed_at=timezone.now())
+        return 0
+    except Exception:
+        # Anything else may be transient: leave the photo to the next sweep
+        CheckInPhoto.objects.filter(pk=photo.pk).update(transcode_claimed_at=None)
+        raise
+
+
+def transcode_photo_by_pk(photo_pk):
+    """Background job: transcode one photo if it still exists and is pending"""
+    try:
+        photo = CheckInPhoto.objects.filter(pk=photo_pk, processed_at__isnull=True).first()
+        if photo and photo.photo:
+            _transcode_or_skip(photo)
+    except Exception as e:
+        print(f"Check-in photo transcoding failed for {photo_pk}: {e}")
+    finally:
+        close_old_connections()
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=_setting('CHECKIN_PHOTO_TRANSCODE_WORKERS', 1),
+                    thread_name_prefix='checkin-photo'
+                )
+    return _executor
+
+
+def schedule_transcode(photo_pk):
+    """Transcode a freshly stored photo off the request path"""
+    return _get_executor().submit(transcode_photo_by_pk, photo_pk)
+
+
+def transcode_pending(limit=None, cutoff=None):
+    """
+    Transcode photos that were never processed (backlog, or jobs lost on restart)
+    Returns: stats dict (photos, errors, bytes_saved)
+    """
+    pending = CheckInPhoto.objects.filter(_unclaimed(timezone.now())).exclude(photo='').order_by('pk')
+    if cutoff is not None:
+        pending = pending.filter(created_at__lt=cutoff)
+    if limit:
+        pending = pending[:limit]
+
+    stats = {'photos': 0, 'errors': 0, 'bytes_saved': 0}
+    for photo in pending.iterator(chunk_size=100):
+        try:
+            saved = _transcode_or_skip(photo)
+            if saved is None:
+                continue
+            stats['bytes_saved'] += saved
+            stats['photos'] += 1
+        except Exception as e:
+            print(f"Check-in photo transcoding failed for {photo.pk}: {e}")
+            stats['errors'] += 1
+    return stats
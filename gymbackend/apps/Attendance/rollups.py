@@ -0,0 +1,180 @@
+from datetime import date as date_class, timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum
+
+from .models import Attendance, AttendanceDailySummary, AttendanceHistory, MemberAttendanceCounter
+
+# Matches the dashboard's "last 30 days" (inclusive date range)
+ROLLING_WINDOW_DAYS = 30
+WINDOW_CACHE_KEY = 'attendance_rollups_window'
+
+
+def _summary_key(attendance):
+    return {
+        'date': attendance.date,
+        'time_slot': attendance.member.time_slot,
+        'verification_method': attendance.verification_method or 'Biometric',
+    }
+
+
+def _in_window(day, window_date):
+    return window_date is not None and window_date - timedelta(days=ROLLING_WINDOW_DAYS) <= day <= window_date
+
+
+def record_checkin(attendance):
+    """Add a newly created attendance row to the rollups (same transaction)"""
+    with transaction.atomic():
+        summary, _ = AttendanceDailySummary.objects.get_or_create(**_summary_key(attendance))
+        AttendanceDailySummary.objects.filter(pk=summary.pk).update(count=F('count') + 1)
+
+        counter, _ = MemberAttendanceCounter.objects.get_or_create(member_id=attendance.member_id)
+        counter = MemberAttendanceCounter.objects.select_for_update().get(pk=counter.pk)
+        counter.total_count += 1
+        if counter.window_date is None:
+            counter.window_date = date_class.today()
+        if _in_window(attendance.date, counter.window_date):
+            counter.recent_count += 1
+        if counter.last_check_in_date is None or attendance.date > counter.last_check_in_date:
+            counter.last_check_in_date = attendance.date
+        counter.save()
+
+
+def record_checkins(attendances):
+    """Bulk variant of record_checkin for rows inserted with bulk_create"""
+    summary_counts = {}
+    member_rows = {}
+    for attendance in attendances:
+        key = tuple(_summary_key(attendance).items())
+        summary_counts[key] = summary_counts.get(key, 0) + 1
+        member_rows.setdefault(attendance.member_id, []).append(attendance.date)
+
+    with transaction.atomic():
+        for key, count in summary_counts.items():
+            summary, _ = AttendanceDailySummary.objects.get_or_create(**dict(key))
+            AttendanceDailySummary.objects.filter(pk=summary.pk).update(count=F('count') + count)
+
+        for member_id in member_rows:
+            MemberAttendanceCounter.objects.get_or_create(member_id=member_id)
+        counters = MemberAttendanceCounter.objects.select_for_update().filter(member_id__in=member_rows.keys())
+        for counter in counters:
+            days = member_rows[counter.member_id]
+            counter.total_count += len(days)
+            if counter.window_date is None:
+                counter.window_date = date_class.today()
+            counter.recent_count += sum(1 for day in days if _in_window(day, counter.window_date))
+            if counter.last_check_in_date is None or max(days) > counter.last_check_in_date:
+                counter.last_check_in_date = max(days)
+            counter.save()
+
+
+def record_removal(attendance):
+    """Remove a deleted attendance row from the rollups"""
+    with transaction.atomic():
+        AttendanceDailySummary.objects.filter(
+            count__gt=0, **_summary_key(attendance)
+        ).update(count=F('count') - 1)
+
+        counter = MemberAttendanceCounter.objects.select_for_update().filter(
+            member_id=attendance.member_id
+        ).first()
+        if counter is None:
+            return
+        counter.total_count = max(counter.total_count - 1, 0)
+        if _in_window(attendance.date, counter.window_date):
+            counter.recent_count = max(counter.recent_count - 1, 0)
+        counter.save(update_fields=['total_count', 'recent_count'])
+
+
+def _recent_counts(today):
+    start = today - timedelta(days=ROLLING_WINDOW_DAYS)
+    return dict(
+        Attendance.objects.filter(date__range=[start, today])
+        .values_list('member_id').annotate(count=Count('id')).order_by()
+    )
+
+
+def refresh_recent_counts(today=None, batch_size=500):
+    """Slide every member's rolling window to end on today"""
+    today = today or date_class.today()
+    counts = _recent_counts(today)
+    with transaction.atomic():
+        MemberAttendanceCounter.objects.update(recent_count=0, window_date=today)
+        counters = list(MemberAttendanceCounter.objects.filter(member_id__in=counts.keys()))
+        for counter in counters:
+            counter.recent_count = counts[counter.member_id]
+        MemberAttendanceCounter.objects.bulk_update(counters, ['recent_count'], batch_size=batch_size)
+    cache.set(WINDOW_CACHE_KEY, today.isoformat(), 60 * 60 * 24)
+
+
+def ensure_recent_counts_current(today=None):
+    """Refresh rolling counts at most once per day (first read after midnight)"""
+    today = today or date_class.today()
+    if cache.get(WINDOW_CACHE_KEY) == today.isoformat():
+        return
+    if MemberAttendanceCounter.objects.exclude(window_date=today).exists():
+        refresh_recent_counts(today)
+    else:
+        cache.set(WINDOW_CACHE_KEY, today.isoformat(), 60 * 60 * 24)
+
+
+def rebuild(batch_size=500, today=None):
+    """Recompute every summary and counter from the hot and archived attendance tables"""
+    today = today or date_class.today()
+    with transaction.atomic():
+        AttendanceDailySummary.objects.all().delete()
+        summary_counts = {}
+        for model in (Attendance, AttendanceHistory):
+            summaries = (
+                model.objects.values('date', 'member__time_slot', 'verification_method')
+                .annotate(count=Count('id')).order_by()
+            )
+            for row in summaries.iterator(chunk_size=batch_size):
+                key = (row['date'], row['member__time_slot'], row['verification_method'] or 'Biometric')
+                summary_counts[key] = summary_counts.get(key, 0) + row['count']
+        AttendanceDailySummary.objects.bulk_create(
+            [
+                AttendanceDailySummary(date=day, time_slot=time_slot, verification_method=method, count=count)
+                for (day, time_slot, method), count in summary_counts.items()
+            ],
+            batch_size=batch_size,
+        )
+
+        MemberAttendanceCounter.objects.all().delete()
+        recent = _recent_counts(today)
+        totals = {}
+        for model in (Attendance, AttendanceHistory):
+            rows = model.objects.values('member_id').annotate(total=Count('id'), last=Max('date')).order_by()
+            for row in rows.iterator(chunk_size=batch_size):
+                total, last = totals.get(row['member_id'], (0, row['last']))
+                totals[row['member_id']] = (total + row['total'], max(last, row['last']))
+        MemberAttendanceCounter.objects.bulk_create(
+            [
+                MemberAttendanceCounter(
+                    member_id=member_id,
+                    total_count=total,
+                    recent_count=recent.get(member_id, 0),
+                    window_date=today,
+                    last_check_in_date=last,
+                )
+                for member_id, (total, last) in totals.items()
+            ],
+            batch_size=batch_size,
+        )
+    cache.set(WINDOW_CACHE_KEY, today.isoformat(), 60 * 60 * 24)
+    return AttendanceDailySummary.objects.count(), MemberAttendanceCounter.objects.count()
+
+
+def day_count(day):
+    """Total check-ins on a day"""
+    return AttendanceDailySummary.objects.filter(date=day).aggregate(total=Sum('count'))['total'] or 0
+
+
+def top_members(limit=5, today=None):
+    """Counters with the most check-ins in the rolling window"""
+    ensure_recent_counts_current(today)
+    return (
+        MemberAttendanceCounter.objects.select_related('member')
+        .filter(recent_count__gt=0).order_by('-recent_count', '-last_check_in_date')[:limit]
+    )
@@ -0,0 +1,119 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.Member.models import Member
+from apps.Authentication.models import WebAuthnCredential
+from .biometric_index import biometric_index
+from .credential_registry import credential_registry
+from .face_gallery import face_gallery
+from .models import Attendance, AttendanceHistory, BiometricTemplate, CheckInPhoto
+from . import analytics, checkin_guard, rollups
+
+BIOMETRIC_FIELDS = {'biometric_hash', 'biometric_registered'}
+
+
+@receiver(post_save, sender=Member)
+def sync_member_biometric_template(sender, instance, update_fields=None, **kwargs):
+    """Mirror the member's biometric_hash into the BiometricTemplate table"""
+    credential_registry.forget_member(instance.pk)
+    if update_fields is not None and not BIOMETRIC_FIELDS.intersection(update_fields):
+        return
+    BiometricTemplate.sync_member_hash(instance)
+
+
+@receiver(post_delete, sender=Member)
+def forget_deleted_member_credentials(sender, instance, **kwargs):
+    """Evict a deleted member from the kiosk credential cache"""
+    credential_registry.forget_member(instance.pk)
+
+
+@receiver(post_save, sender=WebAuthnCredential)
+@receiver(post_delete, sender=WebAuthnCredential)
+def forget_changed_credential(sender, instance, **kwargs):
+    """Evict cached lookups when a WebAuthn credential changes"""
+    credential_registry.forget_member(instance.member_id)
+
+
+@receiver(post_save, sender=Member)
+def sync_member_face_gallery(sender, instance, **kwargs):
+    """Keep the photo-only identification gallery in sync with PIN enrolment"""
+    if not getattr(settings, 'FACE_IDENTIFICATION_ENABLED', False):
+        return
+
+    def sync():
+        try:
+            face_gallery.sync_member(instance)
+        except Exception as e:
+            print(f"Face gallery update failed for {instance.athlete_id}: {e}")
+    transaction.on_commit(sync)
+
+
+@receiver(post_delete, sender=Member)
+def remove_deleted_member_face(sender, instance, **kwargs):
+    """Drop a deleted member from the identification gallery"""
+    if not getattr(settings, 'FACE_IDENTIFICATION_ENABLED', False):
+        return
+    member_pk = instance.pk
+    transaction.on_commit(lambda: face_gallery.remove_member(member_pk))
+
+
+@receiver(post_save, sender=BiometricTemplate)
+def refresh_biometric_index_on_save(sender, instance, **kwargs):
+    """Keep the in-memory biometric index in sync with the template table"""
+    transaction.on_commit(lambda: biometric_index.refresh_template(instance))
+
+
+@receiver(post_delete, sender=BiometricTemplate)
+def refresh_biometric_index_on_delete(sender, instance, **kwargs):
+    """Drop a deleted template from the in-memory biometric index"""
+    template_pk = instance.pk
+    transaction.on_commit(lambda: biometric_index.remove_template(template_pk))
+
+
+@receiver(post_save, sender=CheckInPhoto)
+def transcode_new_checkin_photo(sender, instance, created, **kwargs):
+    """Re-encode the kiosk photo and build its thumbnail off the request path"""
+    if not created or not getattr(settings, 'CHECKIN_PHOTO_TRANSCODE_ON_SAVE', True):
+        return
+    from .photo_transcode import schedule_transcode
+    photo_pk = instance.pk
+    transaction.on_commit(lambda: schedule_transcode(photo_pk))
+
+
+@receiver(post_save, sender=Attendance)
+def add_attendance_to_rollups(sender, instance, created, **kwargs):
+    """Count a new check-in in the daily summary and member counters"""
+    if created:
+        rollups.record_checkin(instance)
+
+
+@receiver(post_save, sender=Attendance)
+def mark_member_checked_in(sender, instance, created, **kwargs):
+    """Remember today's check-in so repeated attempts skip verification"""
+    if created:
+        transaction.on_commit(lambda: checkin_guard.mark_checked_in(instance))
+
+
+@receiver(post_delete, sender=Attendance)
+def forget_member_checked_in(sender, instance, **kwargs):
+    """A deleted check-in must not short-circuit the member's next attempt"""
+    checkin_guard.forget_checked_in(instance)
+
+
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=AttendanceHistory)
+def remove_attendance_from_rollups(sender, instance, **kwargs):
+    """Uncount a deleted check-in (hot or archived, e.g. when its member is deleted)"""
+    try:
+        rollups.record_removal(instance)
+    except Member.DoesNotExist:
+        # Member already gone (cascade); its counter row goes with it
+        pass
+
+
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=AttendanceHistory)
+def invalidate_attendance_analytics(sender, instance, **kwargs):
+    """Cached analytics may include the deleted check-in"""
+    analytics.note_removal()
@@ -1,3 +1,341 @@
-from django.test import TestCase
+import json
+from datetime import date, datetime, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.Authentication.models import CustomUser
+from apps.Member.models import Member
+from . import analytics, archive, checkin_guard, history, kiosk_sync, rollups
+from .biometric_index import BiometricIndex
+from .models import Attendance, AttendanceDailySummary, AttendanceHistory, MemberAttendanceCounter
+
+
+def checkin_array(rows):
+    """(member pk, date) pairs -> analytics.CHECKIN_DTYPE array"""
+    return np.array([(member, np.datetime64(day), 9) for member, day in rows], dtype=analytics.CHECKIN_DTYPE)
+
+
+def make_member(index, **fields):
+    user = CustomUser.objects.create_user(
+        email=f'member{index}@example.com', password='x', username=f'member{index}'
+    )
+    return Member.objects.create(
+        user=user, athlete_id=f'A{index}', first_name='Member', last_name=str(index), monthly_fee=10,
+        start_date=date.today(), expiry_date=date.today() + timedelta(days=30), **fields
+    )
+
+
+def at_noon(day, minutes=0):
+    """Aware local datetime on the given day, on the same calendar as the check-in views"""
+    return (datetime.combine(day, time(12)) + timedelta(minutes=minutes)).astimezone()
+
+
+class RetentionCurveTests(SimpleTestCase):
+
+    def test_only_fully_observed_weeks_count(self):
+        start, end = date(2026, 1, 1), date(2026, 3, 31)
+        checkins = checkin_array([
+            # 1: first visit 31 days before the end, weeks 0-3 observed; back in weeks 1 and 3
+            (1, '2026-03-01'), (1, '2026-03-09'), (1, '2026-03-25'),
+            # 2: 12 days before the end, only week 0 observed; its week 1 visit is ignored
+            (2, '2026-03-20'), (2, '2026-03-28'),
+            # 3: 4 days before the end, not even week 0 is complete
+            (3, '2026-03-28'),
+            # 4: February cohort, observed past the 4 weeks asked for; back in week 2
+            (4, '2026-02-01'), (4, '2026-02-15'),
+            # 5: first visit before the range, not in any cohort
+            (5, '2026-01-05'),
+        ])
+        members = np.unique(checkins['member'])
+        first_checkins = {
+            1: date(2026, 3, 1), 2: date(2026, 3, 20), 3: date(2026, 3, 28),
+            4: date(2026, 2, 1), 5: date(2025, 12, 20),
+        }
+
+        curves = analytics.retention_curves(checkins, members, first_checkins, start, end, weeks=4)
+
+        self.assertEqual(curves['weeks'], [0, 1, 2, 3, 4])
+        self.assertEqual(curves['cohort_size'], 4)
+        # eligible [3, 2, 2, 2, 1], retained [3, 1, 1, 1, 0]
+        self.assertEqual(curves['overall'], [1.0, 0.5, 0.5, 0.5, 0.0])
+        self.assertEqual(curves['cohorts'], [
+            {'month': '2026-02', 'size': 1, 'retention': [1.0, 0.0, 1.0, 0.0, 0.0]},
+            {'month': '2026-03', 'size': 2, 'retention': [1.0, 1.0, 0.0, 1.0, None]},
+        ])
+
+    def test_no_checkins(self):
+        checkins = checkin_array([])
+        curves = analytics.retention_curves(checkins, np.unique(checkins['member']), {}, date(2026, 1, 1), date(2026, 3, 31), weeks=2)
+        self.assertEqual(curves['overall'], [None, None, None])
+        self.assertEqual(curves['cohorts'], [])
+
+
+class BiometricIndexSyncTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        # Stands in for another worker process; built empty at changelog version 0
+        self.worker = BiometricIndex()
+        self.assertEqual(len(self.worker), 0)
+
+    def register(self, index, template_data):
+        with self.captureOnCommitCallbacks(execute=True):
+            member = make_member(index, biometric_registered=True, biometric_hash=template_data)
+        return member, member.fingerprint_templates.get()
+
+    def test_catches_up_from_the_changelog(self):
+        member, template = self.register(1, 'fingerprint-template-0001')
+        features = template.features
+
+        with mock.patch.object(self.worker, '_rebuild', side_effect=AssertionError('rebuilt instead of catching up')):
+            self.assertEqual(self.worker.best_match(features, 0.9), (member.pk, 1.0))
+            with self.captureOnCommitCallbacks(execute=True):
+                template.delete()
+            self.assertEqual(self.worker.best_match(features, 0.9)[0], None)
+            self.assertEqual(len(self.worker), 0)
+
+    def assert_rebuilds_to_match(self, member, template):
+        with mock.patch.object(self.worker, '_rebuild', wraps=self.worker._rebuild) as rebuild:
+            self.assertEqual(self.worker.best_match(template.features, 0.9), (member.pk, 1.0))
+        rebuild.assert_called_once()
+
+    def test_rebuilds_when_a_change_expired(self):
+        member, template = self.register(1, 'fingerprint-template-0001')
+        version = cache.get(BiometricIndex.VERSION_CACHE_KEY)
+        cache.delete(BiometricIndex.CHANGE_CACHE_KEY.format(version=version))
+
+        self.assert_rebuilds_to_match(member, template)
+
+    def test_rebuilds_when_too_far_behind(self):
+        member, template = self.register(1, 'fingerprint-template-0001')
+        cache.incr(BiometricIndex.VERSION_CACHE_KEY, BiometricIndex.MAX_DELTA)
+
+        self.assert_rebuilds_to_match(member, template)
+
+
+class HistoryCursorTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.today = date.today()
+        self.members = [make_member(index) for index in range(3)]
+        for days_ago in (0, 1, 40, 41, 60):
+            day = self.today - timedelta(days=days_ago)
+            for member in self.members:
+                # Same check-in time for everyone, so the id breaks the ties
+                Attendance.objects.create(member=member, date=day, check_in_time=at_noon(day))
+        archive.archive_attendance(days=archive.MIN_ARCHIVE_DAYS, today=self.today)
+
+    def expected_ids(self, member=None):
+        rows = [*Attendance.objects.all(), *AttendanceHistory.objects.all()]
+        rows.sort(key=lambda row: (row.date, row.check_in_time, row.id), reverse=True)
+        return [row.id for row in rows if member is None or row.member_id == member.pk]
+
+    def walk(self, queryset, page_size):
+        ids, cursor = [], None
+        while True:
+            rows, cursor = history.page(queryset, cursor, page_size)
+            ids.extend(row.id for row in rows)
+            if cursor is None:
+                return ids
+
+    def test_pages_run_across_hot_and_archived_rows(self):
+        self.assertEqual(Attendance.objects.count(), 6)
+        self.assertEqual(AttendanceHistory.objects.count(), 9)
+
+        self.assertEqual(self.walk(history.history_queryset(), 4), self.expected_ids())
+        member = self.members[1]
+        self.assertEqual(self.walk(history.history_queryset().filter(member=member), 2), self.expected_ids(member))
+        streamed = history.iter_rows(history.history_queryset(), batch_size=4)
+        self.assertEqual([row.id for row in streamed], self.expected_ids())
+
+    def test_cursor_round_trip(self):
+        for row in (Attendance.objects.first(), AttendanceHistory.objects.first()):
+            self.assertEqual(
+                history.decode_cursor(history.encode_cursor(row)), (row.date, row.check_in_time, row.id)
+            )
+        with self.assertRaises(history.InvalidCursor):
+            history.decode_cursor('not-a-cursor')
+
+
+class CheckInGuardTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.member = make_member(1)
+
+    def test_repeat_check_in_skips_the_database(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance, created = checkin_guard.get_or_create_today(self.member, 'Face')
+        self.assertTrue(created)
+
+        with self.assertNumQueries(0):
+            repeat, created = checkin_guard.get_or_create_today(self.member, 'Face')
+        self.assertFalse(created)
+        self.assertEqual(repeat.check_in_time, attendance.check_in_time)
+        self.assertEqual(Attendance.objects.count(), 1)
+
+    def test_deleted_check_in_is_forgotten(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            attendance, _ = checkin_guard.get_or_create_today(self.member, 'Face')
+        attendance.delete()
+
+        self.assertIsNone(checkin_guard.checked_in_today(self.member))
+        _, created = checkin_guard.get_or_create_today(self.member, 'Face')
+        self.assertTrue(created)
+
+
+class IdempotentCheckInTests(SimpleTestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.factory = RequestFactory()
+        self.calls = 0
+        self.status = 200
+        self.during_call = None
+
+        @checkin_guard.idempotent_checkin
+        def view(request):
+            self.calls += 1
+            if self.during_call:
+                during_call, self.during_call = self.during_call, None
+                during_call()
+            return JsonResponse({'call': self.calls}, status=self.status)
+
+        self.view = view
+
+    def post(self, body=b'{"pin": "1234"}', key='retry-1'):
+        request = self.factory.post('/api/checkin/', body, content_type='application/json', HTTP_IDEMPOTENCY_KEY=key)
+        return self.view(request)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.post()
+        retry = self.post()
+
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(retry.status_code, 200)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.post(key='retry-2')
+        self.assertEqual(self.calls, 2)
+
+    def test_key_reused_for_another_request(self):
+        self.post()
+        response = self.post(body=b'{"pin": "9999"}')
+
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.calls, 1)
+
+    def test_duplicate_while_in_flight_is_refused(self):
+        self.during_call = lambda: self.assertEqual(self.post().status_code, 409)
+        self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(self.calls, 1)
+
+    def test_server_errors_are_not_stored(self):
+        self.status = 500
+        self.post()
+        self.status = 200
+        self.assertEqual(self.post().status_code, 200)
+        self.assertEqual(self.calls, 2)
+
+
+@override_settings(KIOSK_SYNC_SECRET='kiosk-secret')
+class KioskSyncTests(TestCase):
+    url = '/api/kiosk/sync/'
+
+    def setUp(self):
+        cache.clear()
+        self.first = make_member(1)
+        self.second = make_member(2)
+        self.day = date.today() - timedelta(days=1)
+
+    def sync(self, events, secret='kiosk-secret'):
+        body = json.dumps({'kiosk_id': 'front-desk', 'events': events}).encode()
+        return self.client.post(
+            self.url, body, content_type='application/json',
+            HTTP_X_KIOSK_SIGNATURE=kiosk_sync.sign_payload(body, secret)
+        )
+
+    def events(self):
+        return [
+            {'athlete_id': 'A1', 'checked_in_at': at_noon(self.day).isoformat()},
+            {'athlete_id': 'A1', 'checked_in_at': at_noon(self.day, 30).isoformat()},
+            {'athlete_id': 'A2', 'checked_in_at': at_noon(self.day).isoformat(), 'method': 'PIN'},
+            {'athlete_id': 'missing', 'checked_in_at': at_noon(self.day).isoformat()},
+        ]
+
+    def day_total(self):
+        return sum(AttendanceDailySummary.objects.filter(date=self.day).values_list('count', flat=True))
+
+    def test_signature_is_required(self):
+        response = self.sync(self.events(), secret='wrong')
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()['error_code'], 'INVALID_SIGNATURE')
+
+        with override_settings(KIOSK_SYNC_SECRET=''):
+            self.assertEqual(self.sync(self.events(), secret='').status_code, 503)
+        self.assertFalse(Attendance.objects.exists())
+
+    def test_batch_and_resend_are_deduplicated(self):
+        response = self.sync(self.events())
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([result['status'] for result in data['results']], ['created', 'duplicate', 'created', 'rejected'])
+        self.assertEqual((data['created'], data['duplicates'], data['rejected']), (2, 1, 1))
+        # The earliest event of the day wins
+        self.assertEqual(Attendance.objects.get(member=self.first).check_in_time, at_noon(self.day))
+        self.assertEqual(Attendance.objects.get(member=self.second).verification_method, 'PIN')
+        self.assertEqual(self.day_total(), 2)
+
+        data = self.sync(self.events()).json()
+        self.assertEqual((data['created'], data['duplicates'], data['rejected']), (0, 3, 1))
+        self.assertEqual(Attendance.objects.count(), 2)
+        self.assertEqual(self.day_total(), 2)
+        self.assertEqual(MemberAttendanceCounter.objects.get(member=self.first).total_count, 1)
+
+
+class RollupConsistencyTests(TestCase):
+
+    def snapshot(self):
+        summaries = AttendanceDailySummary.objects.filter(count__gt=0).values_list(
+            'date', 'time_slot', 'verification_method', 'count'
+        )
+        counters = MemberAttendanceCounter.objects.values_list(
+            'member_id', 'total_count', 'recent_count', 'last_check_in_date'
+        )
+        return set(summaries), set(counters)
+
+    def test_incremental_updates_match_a_rebuild(self):
+        cache.clear()
+        today = date.today()
+        members = [make_member(index, time_slot=slot) for index, slot in enumerate(['morning', 'evening', 'morning'])]
+        for member in members:
+            for days_ago in (0, 3, 20, 45, 90):
+                day = today - timedelta(days=days_ago)
+                method = 'Face' if days_ago % 2 else 'Biometric'
+                Attendance.objects.create(member=member, date=day, check_in_time=at_noon(day), verification_method=method)
+        # Kiosk sync path: bulk_create skips post_save
+        bulk = [
+            Attendance(member=member, date=day, check_in_time=at_noon(day), verification_method='Biometric-Kiosk')
+            for member in members for day in (today - timedelta(days=5), today - timedelta(days=60))
+        ]
+        rollups.record_checkins(Attendance.objects.bulk_create(bulk))
+
+        archive.archive_attendance(days=archive.MIN_ARCHIVE_DAYS, today=today)
+        Attendance.objects.get(member=members[0], date=today - timedelta(days=3)).delete()
+        AttendanceHistory.objects.get(member=members[0], date=today - timedelta(days=90)).delete()
+        members[2].delete()
+
+        incremental = self.snapshot()
+        summaries, counters = incremental
+        self.assertEqual(sum(row[3] for row in summaries), 12)
+        self.assertEqual(len(counters), 2)
+
+        rollups.rebuild(today=today)
+        self.assertEqual(self.snapshot(), incremental)
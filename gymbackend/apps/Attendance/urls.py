@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
 from . import biometric_views
+from . import async_views
 
 router = DefaultRouter()
 router.register(r'attendance', views.AttendanceViewSet)
@@ -20,6 +21,7 @@ urlpatterns = [
     path('webauthn/kiosk/options/', biometric_views.kiosk_authentication_options, name='kiosk-auth-options'),
     path('webauthn/kiosk/checkin/', biometric_views.kiosk_checkin, name='kiosk-checkin'),
     path('webauthn/kiosk/external-sensor/', biometric_views.external_sensor_checkin, name='external-sensor-checkin'),
+    path('kiosk/sync/', biometric_views.kiosk_sync_checkins, name='kiosk-sync-checkins'),
     
     # PIN endpoints
     path('pin/checkin/', biometric_views.pin_checkin, name='pin-checkin'),
@@ -27,6 +29,20 @@ urlpatterns = [
     path('pin/check/', biometric_views.check_member_pin, name='check-member-pin'),
     path('pin/reset/', biometric_views.reset_member_pin, name='reset-member-pin'),
     
+    # Photo-only check-in (FACE_IDENTIFICATION_ENABLED)
+    path('face/identify/checkin/', biometric_views.face_identify_checkin, name='face-identify-checkin'),
+    
+    # Async check-in endpoints (ASGI deployment)
+    path('async/webauthn/checkin/', async_views.webauthn_check_in, name='async-webauthn-checkin'),
+    path('async/webauthn/kiosk/checkin/', async_views.kiosk_checkin, name='async-kiosk-checkin'),
+    path('async/webauthn/kiosk/external-sensor/', async_views.external_sensor_checkin, name='async-external-sensor-checkin'),
+    path('async/pin/checkin/', async_views.pin_checkin, name='async-pin-checkin'),
+    path('async/face/identify/checkin/', async_views.face_identify_checkin, name='async-face-identify-checkin'),
+    
+    # Admin instrumentation
+    path('admin/checkin-latency/', views.checkin_latency, name='checkin-latency'),
+    path('admin/analytics/', views.attendance_analytics, name='attendance-analytics'),
+    
     # Debug endpoints
     path('debug/', biometric_views.debug_attendance, name='debug-attendance'),
     
@@ -1,6 +1,7 @@
 from django.shortcuts import render
 from rest_framework import viewsets
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 from datetime import date
 from dateutil.parser import parse as parse_date
@@ -9,6 +10,7 @@ from channels.layers import get_channel_layer
 from asgiref.sync import async_to_sync
 from .models import Attendance
 from .serializers import AttendanceSerializer
+from . import history
 
 def send_member_notification(member, message):
     """Send real-time notification to member and save to database"""
@@ -143,10 +145,10 @@ class AttendanceViewSet(viewsets.ModelViewSet):
                     (hasattr(request.user, 'member') and request.user.member == member)):
                 return Response({"error": "Permission denied"}, status=403)
             
+            # Hot rows plus archived ones, newest first
+            data = history.history_queryset().filter(member=member)
             if today_only:
-                data = Attendance.objects.filter(member=member, date=date.today())
-            else:
-                data = Attendance.objects.filter(member=member)
+                data = data.filter(date=date.today())
 
             serializer = self.get_serializer(data, many=True)
             return Response(serializer.data)
@@ -166,6 +168,55 @@ class AttendanceViewSet(viewsets.ModelViewSet):
         if not parsed_date:
             return Response({"error": "Invalid date format. Use YYYY-MM-DD."}, status=400)
 
-        records = Attendance.objects.filter(date=parsed_date)
+        records = history.history_queryset().filter(date=parsed_date)
         serializer = self.get_serializer(records, many=True)
         return Response(serializer.data)
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def checkin_latency(request):
+    """
+    Check-in latency percentiles (p50/p95/p99 in ms) per verification method
+    and stage, for this server process. DELETE clears the histograms.
+    """
+    from .instrumentation import STAGES, latency_recorder
+
+    if request.method == 'DELETE':
+        latency_recorder.reset()
+        return Response({"message": "Check-in latency histograms reset"})
+
+    return Response({
+        "stages": list(STAGES),
+        "methods": latency_recorder.snapshot(),
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def attendance_analytics(request):
+    """
+    Weekday x hour check-in heatmap, time slot utilization and weekly
+    retention curves for ?start=YYYY-MM-DD&end=YYYY-MM-DD (default: the
+    last 365 days), optionally with ?weeks=N retention weeks (max 52)
+    """
+    from . import analytics
+
+    try:
+        start = parse_date(request.query_params['start']).date() if request.query_params.get('start') else None
+        end = parse_date(request.query_params['end']).date() if request.query_params.get('end') else None
+        weeks = int(request.query_params.get('weeks', analytics.DEFAULT_RETENTION_WEEKS))
+    except (ValueError, OverflowError):
+        return Response({"error": "Invalid parameters. Use YYYY-MM-DD dates and an integer number of weeks."}, status=400)
+
+    if start and end and start > end:
+        return Response({"error": "'start' must not be after 'end'"}, status=400)
+    if not 1 <= weeks <= 52:
+        return Response({"error": "'weeks' must be between 1 and 52"}, status=400)
+
+    try:
+        data, cached = analytics.attendance_analytics(start, end, weeks)
+    except Exception as e:
+        print(f"Attendance analytics error: {e}")
+        return Response({"error": str(e)}, status=500)
+    return Response(dict(data, cached=cached))
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-17 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Authentication', '0002_webauthncredential'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='webauthncredential',
+            name='credential_id',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+    ]
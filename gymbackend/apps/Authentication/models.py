@@ -10,7 +10,7 @@ from django.utils import timezone
 
 class WebAuthnCredential(models.Model):
     member = models.ForeignKey('Member.Member', on_delete=models.CASCADE, related_name='webauthn_credentials')
-    credential_id = models.CharField(max_length=255)
+    credential_id = models.CharField(max_length=255, db_index=True)
     public_key = models.TextField()
     sign_count = models.PositiveIntegerField(default=0)
     rp_id = models.CharField(max_length=255)
@@ -363,34 +363,23 @@ class AdminDashboardViewSet(viewsets.ViewSet):
     def top_active_members(self, request):
         """Get top active members with attendance data"""
         try:
-            from apps.Attendance.models import Attendance
-            from django.db.models import Count
-            from datetime import datetime, timedelta
-            
-            # Get last 30 days
-            end_date = datetime.now().date()
-            start_date = end_date - timedelta(days=30)
-            
-            # Get attendance counts per member
-            attendance_counts = Attendance.objects.filter(
-                date__range=[start_date, end_date]
-            ).values('member__athlete_id', 'member__first_name', 'member__last_name', 'member__membership_type').annotate(
-                count=Count('id')
-            ).order_by('-count')[:5]
+            from apps.Attendance import rollups
             
+            # Rolling 30-day counters, maintained as members check in
             top_members = []
-            for item in attendance_counts:
-                name = f"{item['member__first_name'] or ''} {item['member__last_name'] or ''}".strip()
+            for counter in rollups.top_members(limit=5):
+                member = counter.member
+                name = f"{member.first_name or ''} {member.last_name or ''}".strip()
                 if not name:
-                    name = f"Member #{item['member__athlete_id']}"
+                    name = f"Member #{member.athlete_id}"
                     
                 top_members.append({
-                    'id': item['member__athlete_id'],
+                    'id': member.athlete_id,
                     'name': name,
-                    'count': item['count'],
+                    'count': counter.recent_count,
                     'trend': 'up',
-                    'membershipType': item['member__membership_type'] or 'Standard',
-                    'avatar': (item['member__first_name'] or 'M')[0] + (item['member__last_name'] or 'M')[0]
+                    'membershipType': member.membership_type or 'Standard',
+                    'avatar': (member.first_name or 'M')[0] + (member.last_name or 'M')[0]
                 })
             
             # If no attendance data, get recent members
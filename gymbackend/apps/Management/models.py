@@ -1,4 +1,10 @@
-from django.db import models
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import models, transaction
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
@@ -21,9 +27,76 @@ class SiteSettings(models.Model):
 
     @classmethod
     def get_settings(cls):
+        """The settings row, read from the database (use this to change settings)"""
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
 
+    @classmethod
+    def cached(cls):
+        """The settings served from process memory; treat as read-only"""
+        return site_settings_cache.get()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        transaction.on_commit(site_settings_cache.invalidate)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        transaction.on_commit(site_settings_cache.invalidate)
+        return result
+
+
+class SiteSettingsCache:
+    """
+    Process-local copy of the SiteSettings row.
+
+    Reads are served from memory. At most every SITE_SETTINGS_CACHE_CHECK
+    seconds a read compares the copy's version with the stamp in the shared
+    cache, which SiteSettings.save() bumps on commit, and reloads when it
+    moved; so every worker process sees a change within that window. The
+    copy is also reloaded after SITE_SETTINGS_CACHE_TTL seconds regardless,
+    for changes that bypass save() (queryset.update, raw SQL).
+    """
+
+    VERSION_CACHE_KEY = 'site_settings_version'
+    DEFAULT_CHECK_INTERVAL = 2
+    DEFAULT_TTL = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._obj = None
+        self._version = None
+        self._loaded_at = 0.0
+        self._checked_at = 0.0
+
+    def get(self):
+        now = time.monotonic()
+        obj = self._obj
+        fresh = obj is not None and now - self._loaded_at < getattr(settings, 'SITE_SETTINGS_CACHE_TTL', self.DEFAULT_TTL)
+        if fresh and now - self._checked_at < getattr(settings, 'SITE_SETTINGS_CACHE_CHECK', self.DEFAULT_CHECK_INTERVAL):
+            return obj
+        version = cache.get(self.VERSION_CACHE_KEY)
+        if fresh and version == self._version:
+            self._checked_at = now
+            return obj
+        with self._lock:
+            if self._obj is not None and self._obj is not obj:
+                return self._obj  # another thread reloaded meanwhile
+            # The stamp is read before the row so a concurrent save is never missed
+            obj = SiteSettings.get_settings()
+            self._obj, self._version = obj, version
+            self._loaded_at = self._checked_at = time.monotonic()
+            return obj
+
+    def invalidate(self):
+        """Reload here on the next read and in every other process within the check interval"""
+        # No lock: get_settings() creating the row inside get() ends up here
+        self._obj = None
+        cache.set(self.VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+site_settings_cache = SiteSettingsCache()
+
 
 @api_view(['POST'])
 @permission_classes([IsAdminUser])
@@ -0,0 +1,34 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .models import SiteSettings, SiteSettingsCache, site_settings_cache
+
+
+class SiteSettingsCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        site_settings_cache.invalidate()
+
+    def test_reads_are_served_from_memory(self):
+        SiteSettings.cached()
+        with self.assertNumQueries(0):
+            for _ in range(10):
+                self.assertFalse(SiteSettings.cached().maintenance_mode_enabled)
+
+    def test_other_processes_reload_after_the_check_interval(self):
+        other_process = SiteSettingsCache()
+        self.assertTrue(other_process.get().email_notifications_enabled)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            site_settings = SiteSettings.get_settings()
+            site_settings.email_notifications_enabled = False
+            site_settings.save()
+
+        self.assertFalse(SiteSettings.cached().email_notifications_enabled)
+        # Within the check interval the other process still serves its copy
+        self.assertTrue(other_process.get().email_notifications_enabled)
+        with override_settings(SITE_SETTINGS_CACHE_CHECK=0):
+            self.assertFalse(other_process.get().email_notifications_enabled)
+            with self.assertNumQueries(0):
+                other_process.get()
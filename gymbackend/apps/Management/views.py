@@ -168,7 +168,7 @@ def create_emergency_backup():
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, IsAdminUser])
 def get_global_notification_settings(request):
-    settings_obj = SiteSettings.get_settings()
+    settings_obj = SiteSettings.cached()
     return Response({
         'email_notifications_enabled': settings_obj.email_notifications_enabled,
         'whatsapp_notifications_enabled': settings_obj.whatsapp_notifications_enabled
@@ -197,7 +197,7 @@ def get_maintenance_mode(request):
     """
     Get maintenance mode status - accessible to all users
     """
-    settings_obj = SiteSettings.get_settings()
+    settings_obj = SiteSettings.cached()
     return Response({
         'enabled': settings_obj.maintenance_mode_enabled
     })
@@ -208,7 +208,7 @@ def get_maintenance_mode_public(request):
     Public maintenance mode endpoint that bypasses DRF authentication
     """
     if request.method == 'GET':
-        settings_obj = SiteSettings.get_settings()
+        settings_obj = SiteSettings.cached()
         return JsonResponse({
             'enabled': settings_obj.maintenance_mode_enabled
         })
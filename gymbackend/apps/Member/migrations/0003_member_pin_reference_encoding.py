@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-17 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Member', '0002_member_pin_member_pin_enabled_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='member',
+            name='pin_reference_encoding',
+            field=models.BinaryField(blank=True, help_text='Precomputed face encoding of the reference photo', null=True),
+        ),
+        migrations.AddField(
+            model_name='member',
+            name='pin_reference_encoding_version',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Reference photo version the encoding was computed from', max_length=255),
+        ),
+    ]
@@ -54,6 +54,8 @@ class Member(models.Model):
     pin = models.CharField(max_length=6, unique=True, null=True, blank=True, help_text="4-6 digit PIN for check-in")
     pin_enabled = models.BooleanField(default=False, help_text="Enable PIN-based check-in for this member")
     pin_reference_photo = models.ImageField(upload_to='pin_photos/', null=True, blank=True, help_text="Reference photo for PIN verification")
+    pin_reference_encoding = models.BinaryField(null=True, blank=True, editable=False, help_text="Precomputed face encoding of the reference photo")
+    pin_reference_encoding_version = models.CharField(max_length=255, blank=True, default='', editable=False, help_text="Reference photo version the encoding was computed from")
 
     
     first_name = models.CharField(
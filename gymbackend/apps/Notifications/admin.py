@@ -1,3 +1,19 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import NotificationOutbox
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ['id', 'channel', 'status', 'attempts', 'available_at', 'created_at', 'sent_at']
+    list_filter = ['channel', 'status']
+    readonly_fields = ['channel', 'payload', 'attempts', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_now']
+
+    @admin.action(description='Retry selected notifications now')
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=NotificationOutbox.STATUS_SENT).update(
+            status=NotificationOutbox.STATUS_PENDING, attempts=0, available_at=timezone.now()
+        )
+        self.message_user(request, f"{updated} notifications queued for delivery")
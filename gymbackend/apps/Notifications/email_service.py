@@ -36,11 +36,10 @@ Usage:
 from django.core.mail import send_mail
 from django.conf import settings
 from django.template.loader import render_to_string
-from django.utils.html import strip_tags
 import logging
-from django.utils import timezone
-import ssl
-import smtplib
+from .email_templates import render_admin_notification
+from .recipients import recipient_registry
+from .smtp_pool import get_pool
 
 logger = logging.getLogger(__name__)
 
@@ -60,17 +59,19 @@ class EmailNotificationService:
     """
     
     @staticmethod
-    def send_admin_notification_email(subject, message, admin_emails=None, check_preferences=True):
+    def send_admin_notification_email(subject, message, admin_emails=None, check_preferences=True, fail_silently=True):
         """
         Send email notification to admin users with preference checking.
+        
+        Returns False when email is disabled or there are no recipients. SMTP
+        errors also return False unless fail_silently is False, in which case
+        they are re-raised (the notification worker retries them).
         """
         print("EMAIL SERVICE: Starting email send process...")
 
-        # Check global notification toggle from database (not Django settings)
+        # Check global notification toggle from database (not Django settings), cached with the recipients
         try:
-            from apps.Management.models import SiteSettings
-            site_settings = SiteSettings.get_settings()
-            if not site_settings.email_notifications_enabled:
+            if not recipient_registry.email_enabled():
                 print("Global email notifications are DISABLED in database. No email will be sent.")
                 logger.info("Email notification skipped: Global email notifications disabled")
                 return False
@@ -84,20 +85,8 @@ class EmailNotificationService:
         
         # Auto-fetch admin emails if not provided
         if not admin_emails:
-            from apps.Authentication.models import CustomUser
-            if check_preferences:
-                # Only get admins who have email notifications enabled
-                admin_users = CustomUser.objects.filter(
-                    is_staff=True, 
-                    is_active=True,
-                    email_notifications=True  # Check preference
-                )
-                admin_emails = list(admin_users.values_list('email', flat=True))
-            else:
-                admin_emails = list(
-                    CustomUser.objects.filter(is_staff=True, is_active=True)
-                    .values_list('email', flat=True)
-                )
+            # Only admins who have email notifications enabled when check_preferences
+            admin_emails = recipient_registry.admin_emails(check_preferences)
             
             # Fallback to sender email for testing if no admin emails found
             if not admin_emails:
@@ -113,71 +102,22 @@ class EmailNotificationService:
             return False
         
         try:
-            # Environment-aware SSL configuration
-            if getattr(settings, 'DEBUG', False) and getattr(settings, 'EMAIL_DEV_SSL_BYPASS', False):
-                # Development: Allow SSL bypass for local testing
-                print("DEV MODE: Using SSL bypass for development")
-                ssl_context = ssl.create_default_context()
-                ssl_context.check_hostname = False
-                ssl_context.verify_mode = ssl.CERT_NONE
-            else:
-                # Production: Use proper SSL verification
-                print("PROD MODE: Using secure SSL verification")
-                ssl_context = ssl.create_default_context()
-            
-            # Create SMTP connection manually for better control
-            server = smtplib.SMTP(settings.EMAIL_HOST, settings.EMAIL_PORT)
-            server.starttls(context=ssl_context)
-            server.login(settings.EMAIL_HOST_USER, settings.EMAIL_HOST_PASSWORD)
-            
-            print("✅ SMTP connection opened successfully")
+            # Authenticated sessions are pooled and reused across calls and threads
+            # (SSL verification is environment-aware, see smtp_pool.build_ssl_context)
+            server = get_pool()
             
-            # Create and send email for each recipient
-            from email.mime.multipart import MIMEMultipart
-            from email.mime.text import MIMEText
-            
-            for email in admin_emails:
-                # Create HTML content with gym branding for each email
-                html_content = f"""
-                <div style="font-family: Arial, sans-serif; max-width: 600px; margin: 0 auto;">
-                    <div style="background-color: #f8f9fa; padding: 20px; border-radius: 8px;">
-                        <h2 style="color: #333; margin-bottom: 20px;">🏋️ Gym Management System Notification</h2>
-                        <div style="background-color: white; padding: 20px; border-radius: 6px; border-left: 4px solid #007bff;">
-                            <p style="color: #555; line-height: 1.6; margin: 0;"><strong>Message:</strong> {message}</p>
-                            <hr style="margin: 15px 0;">
-                            <p style="color: #666; font-size: 14px;">
-                                <strong>Sent from:</strong> {settings.EMAIL_HOST_USER}<br>
-                                <strong>Sent to:</strong> {email}<br>
-                                <strong>Time:</strong> {timezone.now()}
-                            </p>
-                        </div>
-                        <p style="color: #666; font-size: 12px; margin-top: 20px;">
-                            This is an automated notification from your Gym Management System.
-                        </p>
-                    </div>
-                </div>
-                """
-                
-                # Create multipart message (supports both HTML and plain text)
-                msg = MIMEMultipart('alternative')
-                msg['Subject'] = f"[Gym Management] {subject}"
-                msg['From'] = settings.EMAIL_HOST_USER
-                msg['To'] = email
-                
-                # Add both plain text and HTML versions
-                plain_text = strip_tags(html_content)
-                part1 = MIMEText(plain_text, 'plain')
-                part2 = MIMEText(html_content, 'html')
-                
-                msg.attach(part1)
-                msg.attach(part2)
-                
-                # Send the email
-                server.send_message(msg)
-                print(f"Email sent to: {email}")
+            # Render the HTML and plain-text parts once; each envelope only adds its headers
+            email = render_admin_notification(subject, message)
+
+            # One SMTP transaction per batch of Bcc'd admins (EMAIL_BCC_BATCH_SIZE)
+            for recipients, msg in email.batches(admin_emails):
+                # Reconnects transparently if the pooled session was dropped
+                refused = server.sendmail(email.from_email, recipients, msg)
+                for address, (code, response) in refused.items():
+                    print(f"Email refused for {address}: {code} {response!r}")
+                    logger.warning(f"Email notification refused for {address}: {code} {response!r}")
+                print(f"Email sent to: {', '.join(r for r in recipients if r not in refused)}")
             
-            # Close SMTP connection
-            server.quit()
             print(f"Email sent successfully to {len(admin_emails)} recipients")
             logger.info(f"Email notification sent successfully: {subject} to {len(admin_emails)} recipients")
             return True
@@ -185,12 +125,8 @@ class EmailNotificationService:
         except Exception as e:
             print(f"Email send failed: {str(e)}")
             logger.error(f"Failed to send email notification: {subject} - Error: {str(e)}")
-            
-            # Ensure SMTP connection is closed even if error occurs
-            try:
-                server.quit()
-            except:
-                pass
+            if not fail_silently:
+                raise
             return False
 
     @staticmethod
@@ -234,11 +170,7 @@ class EmailNotificationService:
             >>> print(f"Admin emails: {emails}")
         """
         try:
-            from apps.Authentication.models import CustomUser
-            return list(
-                CustomUser.objects.filter(is_staff=True, is_active=True)
-                .values_list('email', flat=True)
-            )
+            return recipient_registry.admin_emails(check_preferences=False)
         except Exception as e:
             logger.error(f"Failed to fetch admin emails: {str(e)}")
             return []
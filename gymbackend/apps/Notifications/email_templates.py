@@ -0,0 +1,98 @@
+"""
+Render-once email composition for admin notifications
+
+A notification used to be rebuilt for every recipient: the HTML body as an
+f-string, strip_tags() over it and a fresh MIME tree. Now the HTML and
+plain-text parts are rendered once from the (cached, compiled) templates in
+templates/notifications/email/, the MIME body is serialized once, and each
+SMTP envelope only prepends its own To/Date/Message-ID headers.
+
+Envelopes carry up to EMAIL_BCC_BATCH_SIZE recipients. Batched recipients
+appear only in the SMTP envelope (RCPT TO), i.e. they are Bcc'd and the To
+header reads "undisclosed-recipients:;". A batch of one gets a personal To
+header.
+"""
+
+from email.charset import QP, Charset
+from email.header import Header
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from email.policy import compat32
+from email.utils import formatdate, make_msgid
+
+from django.conf import settings
+from django.core.mail.message import sanitize_address
+from django.core.mail.utils import DNS_NAME
+from django.template.loader import get_template
+from django.utils import timezone
+
+DEFAULT_BCC_BATCH_SIZE = 50
+UNDISCLOSED_RECIPIENTS = 'undisclosed-recipients:;'
+
+ADMIN_NOTIFICATION_TEMPLATE = 'notifications/email/admin_notification'
+
+# The legacy MIME classes serialize several times faster than EmailMessage
+WIRE_POLICY = compat32.clone(linesep='\r\n')
+
+# Quoted-printable keeps mostly-ASCII bodies readable and smaller than base64
+UTF8_QP = Charset('utf-8')
+UTF8_QP.body_encoding = QP
+
+
+class RenderedEmail:
+    """A message whose body is serialized once and reused for every envelope"""
+
+    def __init__(self, subject, from_email, text, html=None):
+        self.subject = subject
+        self.from_email = from_email
+
+        if html is None:
+            message = MIMEText(text, 'plain', UTF8_QP)
+        else:
+            message = MIMEMultipart('alternative')
+            message.attach(MIMEText(text, 'plain', UTF8_QP))
+            message.attach(MIMEText(html, 'html', UTF8_QP))
+        message['Subject'] = Header(subject, 'utf-8')
+        message['From'] = sanitize_address(from_email, 'utf-8')
+        self.body = message.as_bytes(policy=WIRE_POLICY)
+
+    def envelope_headers(self, recipients):
+        """Header lines that differ per envelope (the rest of the header block is in self.body)"""
+        to = sanitize_address(recipients[0], 'utf-8') if len(recipients) == 1 else UNDISCLOSED_RECIPIENTS
+        return (
+            f"To: {to}\r\n"
+            f"Date: {formatdate(localtime=True)}\r\n"
+            f"Message-ID: {make_msgid(domain=DNS_NAME)}\r\n"
+        ).encode('ascii')
+
+    def as_bytes(self, recipients):
+        """Wire format of the message for one envelope"""
+        return self.envelope_headers(recipients) + self.body
+
+    def batches(self, recipients, batch_size=None):
+        """(recipients, message bytes) per SMTP transaction"""
+        if batch_size is None:
+            batch_size = getattr(settings, 'EMAIL_BCC_BATCH_SIZE', DEFAULT_BCC_BATCH_SIZE)
+        batch_size = max(int(batch_size), 1)
+        for start in range(0, len(recipients), batch_size):
+            batch = list(recipients[start:start + batch_size])
+            yield batch, self.as_bytes(batch)
+
+
+def render_email(template_name, subject, from_email, context):
+    """Render <template_name>.txt and <template_name>.html once into a RenderedEmail"""
+    text = get_template(f'{template_name}.txt').render(context)
+    html = get_template(f'{template_name}.html').render(context)
+    return RenderedEmail(subject, from_email, text, html)
+
+
+def render_admin_notification(subject, message, from_email=None):
+    """The branded admin notification for send_admin_notification_email"""
+    # Unauthenticated relays have no EMAIL_HOST_USER to send from
+    from_email = from_email or settings.EMAIL_HOST_USER or settings.DEFAULT_FROM_EMAIL
+    return render_email(
+        ADMIN_NOTIFICATION_TEMPLATE,
+        f"[Gym Management] {subject}",
+        from_email,
+        {'message': message, 'sender': from_email, 'sent_at': timezone.now()},
+    )
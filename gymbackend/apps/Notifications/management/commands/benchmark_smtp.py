@@ -0,0 +1,124 @@
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.Notifications import smtp_sink
+from apps.Notifications.smtp_pool import SMTPConnectionPool, build_ssl_context
+
+
+def _message(call, recipient):
+    message = EmailMessage()
+    message['Subject'] = f'[Gym Management] SMTP benchmark {call}'
+    message['From'] = 'benchmark@example.com'
+    message['To'] = f'admin{recipient}@example.com'
+    message.set_content('SMTP benchmark message\n' * 20)
+    return message
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare notification email throughput of a new SMTP session per call '
+        '(the previous EmailNotificationService behaviour) with the pooled sessions'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--calls', type=int, default=100, help='Notification calls per mode (default: 100)')
+        parser.add_argument('--recipients', type=int, default=3, help='Messages per call, one per admin (default: 3)')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent callers (default: 4)')
+        parser.add_argument('--pool-size', type=int, default=4, help='Pooled sessions (default: 4)')
+        parser.add_argument(
+            '--host',
+            default=None,
+            help='SMTP server to use; default is a local sink. Only point this at a test server.'
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0,
+            help='Milliseconds the local sink waits before each reply, to model a remote server (default: 0)'
+        )
+        parser.add_argument('--port', type=int, default=25)
+        parser.add_argument('--tls', action='store_true', help='Use STARTTLS')
+        parser.add_argument('--user', default='')
+        parser.add_argument('--password', default='')
+
+    def handle(self, *args, **options):
+        sink = None
+        host, port = options['host'], options['port']
+        if host is None:
+            if not smtp_sink.available:
+                raise CommandError('No local SMTP sink available (install aiosmtpd) and no --host given')
+            try:
+                sink = smtp_sink.LocalSMTPSink(latency=options['latency'] / 1000).start()
+            except RuntimeError as e:
+                raise CommandError(str(e))
+            host, port = sink.host, sink.port
+            self.stdout.write(f"Using local SMTP sink on {host}:{port}, {options['latency']:g}ms per reply")
+
+        try:
+            per_call = self._run(options, self._per_call_sender(options, host, port))
+            pool = SMTPConnectionPool(
+                host, port, options['user'], options['password'], use_tls=options['tls'],
+                max_size=options['pool_size'],
+            )
+            try:
+                pooled = self._run(options, lambda messages: [pool.send_message(message) for message in messages])
+            finally:
+                pool.close()
+        finally:
+            if sink is not None:
+                sink.stop()
+
+        for label, (messages, seconds) in (('session per call', per_call), ('pooled sessions', pooled)):
+            self.stdout.write(f'{label:>17}: {messages} messages in {seconds:.2f}s = {messages / seconds:.1f} msg/s')
+        self.stdout.write(f'Pool stats: {pool.stats}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Speed-up: {(pooled[0] / pooled[1]) / (per_call[0] / per_call[1]):.1f}x'
+        ))
+
+    def _per_call_sender(self, options, host, port):
+        """One notification call as EmailNotificationService made it: connect, STARTTLS, AUTH, send, QUIT"""
+        def send_call(messages):
+            server = smtplib.SMTP(host, port, timeout=30)
+            try:
+                if options['tls']:
+                    server.starttls(context=build_ssl_context())
+                if options['user']:
+                    server.login(options['user'], options['password'])
+                for message in messages:
+                    server.send_message(message)
+            finally:
+                server.quit()
+        return send_call
+
+    def _run(self, options, send_call):
+        calls, recipients, threads = options['calls'], options['recipients'], options['threads']
+        next_call = iter(range(calls))
+        lock = threading.Lock()
+        errors = []
+
+        def worker():
+            while True:
+                with lock:
+                    call = next(next_call, None)
+                if call is None:
+                    return
+                messages = [_message(call, recipient) for recipient in range(recipients)]
+                try:
+                    send_call(messages)
+                except Exception as e:
+                    errors.append(e)
+
+        workers = [threading.Thread(target=worker) for _ in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        seconds = time.perf_counter() - started
+        if errors:
+            raise CommandError(f'{len(errors)} calls failed, first error: {errors[0]}')
+        return calls * recipients, seconds
@@ -0,0 +1,103 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.Notifications import outbox
+from apps.Notifications.smtp_pool import close_pool
+
+class Command(BaseCommand):
+    help = 'Deliver queued email, WhatsApp and WebSocket notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Deliver everything currently due, then exit'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Only print the queue depth'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=getattr(settings, 'NOTIFICATION_OUTBOX_BATCH_SIZE', outbox.DEFAULT_BATCH_SIZE),
+            help='Rows claimed per round (default: NOTIFICATION_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=getattr(settings, 'NOTIFICATION_OUTBOX_POLL_INTERVAL', 1.0),
+            help='Seconds to sleep when nothing is due (default: NOTIFICATION_OUTBOX_POLL_INTERVAL)'
+        )
+        parser.add_argument(
+            '--report-interval',
+            type=float,
+            default=60.0,
+            help='Seconds between queue depth reports (default: 60)'
+        )
+        parser.add_argument(
+            '--purge-days',
+            type=int,
+            default=7,
+            help='Delete sent and skipped rows older than this many days, checked hourly (default: 7, 0 keeps them)'
+        )
+
+    def _report(self, totals=None):
+        depth = outbox.queue_depth()
+        line = (
+            f"Outbox: {depth['pending']} pending ({depth['due']} due, {depth['retrying']} retrying), "
+            f"{depth['failed']} failed, oldest due {depth['oldest_due_seconds']}s"
+        )
+        if depth['by_channel']:
+            line += ' | ' + ', '.join(f"{channel}: {count}" for channel, count in sorted(depth['by_channel'].items()))
+        if totals is not None:
+            line += ' | delivered since last report: ' + (
+                ', '.join(f"{status}: {count}" for status, count in sorted(totals.items())) or 'none'
+            )
+        self.stdout.write(line)
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self._report()
+            return
+
+        batch_size = options['batch_size']
+        totals = {}
+        next_report = time.monotonic() + options['report_interval']
+        next_purge = time.monotonic()
+        self.stdout.write(self.style.SUCCESS('Notification worker started'))
+        self._report()
+
+        try:
+            while True:
+                # Long-running process: never reuse a connection the server has dropped
+                close_old_connections()
+                outcome = outbox.process_batch(batch_size)
+                for status, count in outcome.items():
+                    totals[status] = totals.get(status, 0) + count
+
+                now = time.monotonic()
+                if options['purge_days'] and now >= next_purge:
+                    purged = outbox.purge_delivered(options['purge_days'])
+                    if purged:
+                        self.stdout.write(f"Purged {purged} delivered outbox rows")
+                    next_purge = now + 3600
+                if now >= next_report:
+                    self._report(totals)
+                    totals = {}
+                    next_report = now + options['report_interval']
+
+                if sum(outcome.values()) < batch_size:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+        except KeyboardInterrupt:
+            self.stdout.write('Notification worker stopping')
+        finally:
+            close_pool()
+
+        self._report(totals)
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.1 on 2026-10-17 19:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('email', 'Email'), ('whatsapp', 'WhatsApp'), ('websocket', 'WebSocket')], max_length=10, verbose_name='Channel')),
+                ('payload', models.JSONField(verbose_name='Payload')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('sent', 'Sent'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=10, verbose_name='Status')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Attempts')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, help_text='Earliest time of the next delivery attempt', verbose_name='Available At')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Last Error')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Created At')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Sent At')),
+            ],
+            options={
+                'verbose_name': 'Notification Outbox Entry',
+                'verbose_name_plural': 'Notification Outbox',
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['status', 'available_at'], name='outbox_due_idx')],
+            },
+        ),
+    ]
@@ -1,5 +1,7 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
 
 
@@ -10,6 +12,59 @@ class Notification(models.Model):
     message = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
-  
-  
-  
\ No newline at end of file
+
+
+class NotificationOutbox(models.Model):
+    """Email, WhatsApp or WebSocket delivery waiting for the notification worker
+
+    Rows are written in the same transaction as the change that caused them
+    and delivered by ``manage.py notification_worker`` (see outbox.py).
+    """
+    CHANNEL_EMAIL = 'email'
+    CHANNEL_WHATSAPP = 'whatsapp'
+    CHANNEL_WEBSOCKET = 'websocket'
+    CHANNEL_CHOICES = [
+        (CHANNEL_EMAIL, _('Email')),
+        (CHANNEL_WHATSAPP, _('WhatsApp')),
+        (CHANNEL_WEBSOCKET, _('WebSocket')),
+    ]
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_SKIPPED = 'skipped'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, _('Pending')),
+        (STATUS_SENT, _('Sent')),
+        (STATUS_SKIPPED, _('Skipped')),
+        (STATUS_FAILED, _('Failed')),
+    ]
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, verbose_name=_('Channel'))
+    payload = models.JSONField(verbose_name=_('Payload'))
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name=_('Status')
+    )
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name=_('Attempts'))
+    available_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name=_('Available At'),
+        help_text=_('Earliest time of the next delivery attempt')
+    )
+    last_error = models.TextField(blank=True, default='', verbose_name=_('Last Error'))
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Created At'))
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name=_('Sent At'))
+
+    class Meta:
+        verbose_name = _('Notification Outbox Entry')
+        verbose_name_plural = _('Notification Outbox')
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.channel} #{self.pk} ({self.status}, {self.attempts} attempts)"
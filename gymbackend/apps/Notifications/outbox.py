@@ -0,0 +1,225 @@
+"""
+Notification outbox
+
+Request code never talks to SMTP or WhatsApp providers directly: it writes
+an outbox row in its own transaction (so a rolled back change never
+notifies, and a committed one is never lost) and the long-running
+``manage.py notification_worker`` delivers it. In-app WebSocket
+notifications do not depend on a provider and are sent from the request
+process on commit instead (realtime.py).
+
+Delivery claims due rows with a lease (available_at moves into the future
+and attempts goes up) so several workers can run side by side and a row
+whose worker died is picked up again once its lease expires. Failures are
+retried with exponential backoff up to NOTIFICATION_OUTBOX_MAX_ATTEMPTS.
+"""
+
+import logging
+from datetime import timedelta
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+
+from .models import NotificationOutbox
+from .recipients import recipient_registry
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_RETRY_BASE = 30           # seconds before the first retry
+DEFAULT_RETRY_MAX = 60 * 60       # backoff cap in seconds
+DEFAULT_LEASE = 5 * 60            # seconds a claimed row is reserved for its worker
+DEFAULT_BATCH_SIZE = 50
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class SkipDelivery(Exception):
+    """The notification is not wanted any more (channel disabled, no recipients)"""
+
+
+# ----------------------------------------------------------------------
+# Enqueueing (request side)
+# ----------------------------------------------------------------------
+
+def enqueue(channel, payload):
+    """Queue one delivery; runs in the caller's transaction"""
+    return NotificationOutbox.objects.create(channel=channel, payload=payload)
+
+
+def enqueue_admin_email(subject, message, admin_emails=None, check_preferences=True):
+    """Queued EmailNotificationService.send_admin_notification_email"""
+    return enqueue(NotificationOutbox.CHANNEL_EMAIL, {
+        'subject': subject,
+        'message': message,
+        'admin_emails': admin_emails,
+        'check_preferences': check_preferences,
+    })
+
+
+def enqueue_admin_whatsapp(message, admin_phones=None):
+    """Queued WhatsAppNotificationService.send_admin_whatsapp_notification"""
+    return enqueue(NotificationOutbox.CHANNEL_WHATSAPP, {
+        'message': message,
+        'admin_phones': admin_phones,
+    })
+
+
+# ----------------------------------------------------------------------
+# Delivery (worker side)
+# ----------------------------------------------------------------------
+
+def _deliver_email(payload):
+    from .email_service import EmailNotificationService
+
+    sent = EmailNotificationService.send_admin_notification_email(
+        payload['subject'],
+        payload['message'],
+        admin_emails=payload.get('admin_emails'),
+        check_preferences=payload.get('check_preferences', True),
+        fail_silently=False,
+    )
+    if not sent:
+        raise SkipDelivery('email notifications disabled or no recipients')
+
+
+def _deliver_whatsapp(payload):
+    from .whatsapp_service import WhatsAppNotificationService
+
+    if not recipient_registry.whatsapp_enabled():
+        raise SkipDelivery('WhatsApp notifications disabled')
+    service = WhatsAppNotificationService()
+    if not (payload.get('admin_phones') or service._get_admin_phone_numbers()):
+        raise SkipDelivery('no admin phone numbers')
+    # The providers report failures as False rather than raising
+    if not service.send_admin_whatsapp_notification(payload['message'], payload.get('admin_phones')):
+        raise RuntimeError('WhatsApp provider did not accept the message')
+
+
+def _deliver_websocket(payload):
+    # In-app notifications are sent from the request process (see realtime.py);
+    # this only drains rows queued before that
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        raise SkipDelivery('channel layer not configured')
+    if isinstance(channel_layer, InMemoryChannelLayer):
+        # A worker-private layer reaches no browser
+        raise SkipDelivery('in-memory channel layer is local to the worker process')
+    async_to_sync(channel_layer.group_send)(
+        payload['group'],
+        {"type": "send_notification", "notification": payload['notification']}
+    )
+
+
+DELIVERERS = {
+    NotificationOutbox.CHANNEL_EMAIL: _deliver_email,
+    NotificationOutbox.CHANNEL_WHATSAPP: _deliver_whatsapp,
+    NotificationOutbox.CHANNEL_WEBSOCKET: _deliver_websocket,
+}
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the given number of failed attempts"""
+    base = _setting('NOTIFICATION_OUTBOX_RETRY_BASE', DEFAULT_RETRY_BASE)
+    cap = _setting('NOTIFICATION_OUTBOX_RETRY_MAX', DEFAULT_RETRY_MAX)
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def claim_due(batch_size=DEFAULT_BATCH_SIZE, now=None):
+    """Lease up to batch_size due rows to this worker and return them"""
+    now = now or timezone.now()
+    lease = timedelta(seconds=_setting('NOTIFICATION_OUTBOX_LEASE', DEFAULT_LEASE))
+    skip_locked = connection.features.has_select_for_update_skip_locked
+    with transaction.atomic():
+        rows = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=skip_locked)
+            .filter(status=NotificationOutbox.STATUS_PENDING, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        for entry in rows:
+            entry.attempts += 1
+            entry.available_at = now + lease
+        NotificationOutbox.objects.bulk_update(rows, ['attempts', 'available_at'])
+    return rows
+
+
+def deliver(entry):
+    """
+    Attempt one claimed row and record the outcome
+    Returns: the row's new status
+    """
+    deliverer = DELIVERERS.get(entry.channel)
+    try:
+        if deliverer is None:
+            raise SkipDelivery(f'unknown channel {entry.channel}')
+        deliverer(entry.payload)
+    except SkipDelivery as e:
+        entry.status = NotificationOutbox.STATUS_SKIPPED
+        entry.last_error = str(e)
+    except Exception as e:
+        entry.last_error = f"{type(e).__name__}: {e}"
+        if entry.attempts >= _setting('NOTIFICATION_OUTBOX_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS):
+            entry.status = NotificationOutbox.STATUS_FAILED
+            logger.error(f"Notification outbox #{entry.pk} ({entry.channel}) gave up: {entry.last_error}")
+        else:
+            entry.available_at = timezone.now() + retry_delay(entry.attempts)
+            logger.warning(
+                f"Notification outbox #{entry.pk} ({entry.channel}) attempt {entry.attempts} failed, "
+                f"retrying at {entry.available_at}: {entry.last_error}"
+            )
+    else:
+        entry.status = NotificationOutbox.STATUS_SENT
+        entry.sent_at = timezone.now()
+        entry.last_error = ''
+    entry.save(update_fields=['status', 'available_at', 'last_error', 'sent_at'])
+    return entry.status
+
+
+def process_batch(batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Claim and deliver one batch of due rows
+    Returns: {outcome: count} for the batch (sent, skipped, failed, retrying)
+    """
+    outcome = {}
+    for entry in claim_due(batch_size):
+        status = deliver(entry)
+        if status == NotificationOutbox.STATUS_PENDING:
+            status = 'retrying'
+        outcome[status] = outcome.get(status, 0) + 1
+    return outcome
+
+
+def queue_depth(now=None):
+    """Pending / due / retrying / failed counts and the age of the oldest due row"""
+    now = now or timezone.now()
+    pending = Q(status=NotificationOutbox.STATUS_PENDING)
+    due = pending & Q(available_at__lte=now)
+    stats = NotificationOutbox.objects.aggregate(
+        pending=Count('pk', filter=pending),
+        due=Count('pk', filter=due),
+        retrying=Count('pk', filter=pending & Q(attempts__gt=0)),
+        failed=Count('pk', filter=Q(status=NotificationOutbox.STATUS_FAILED)),
+        oldest_due=Min('created_at', filter=due),
+    )
+    oldest = stats.pop('oldest_due')
+    stats['oldest_due_seconds'] = round((now - oldest).total_seconds(), 1) if oldest else 0
+    stats['by_channel'] = dict(
+        NotificationOutbox.objects.filter(pending).values_list('channel').annotate(count=Count('pk')).order_by()
+    )
+    return stats
+
+
+def purge_delivered(older_than_days=7):
+    """Delete sent and skipped rows older than the given age"""
+    cutoff = timezone.now() - timedelta(days=older_than_days)
+    deleted, _ = NotificationOutbox.objects.filter(
+        status__in=[NotificationOutbox.STATUS_SENT, NotificationOutbox.STATUS_SKIPPED],
+        created_at__lt=cutoff,
+    ).delete()
+    return deleted
@@ -0,0 +1,46 @@
+"""
+In-app (WebSocket) notifications
+
+These go to the channel layer from the request process once the surrounding
+transaction commits, like the Attendance check-in sends: they never depend
+on an external provider, so they do not go through the notification outbox
+(and with the InMemoryChannelLayer fallback only the serving process can
+reach its browsers anyway).
+"""
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+def send_on_commit(group, notification):
+    """group_send one send_notification event after commit"""
+    send_many_on_commit([(group, notification)])
+
+
+def send_many_on_commit(messages):
+    """group_send (group, notification) pairs after commit, in one event loop hop"""
+    messages = list(messages)
+    if not messages:
+        return
+
+    def send():
+        channel_layer = get_channel_layer()
+        if channel_layer is None:
+            logger.warning("Channel layer not available for real-time notifications")
+            return
+
+        async def fan_out():
+            for group, notification in messages:
+                try:
+                    await channel_layer.group_send(group, {"type": "send_notification", "notification": notification})
+                except Exception as e:
+                    logger.error(f"Failed to send real-time notification to {group}: {e}")
+
+        async_to_sync(fan_out)()
+
+    transaction.on_commit(send)
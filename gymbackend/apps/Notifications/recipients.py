@@ -0,0 +1,116 @@
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+# CustomUser fields the snapshot is built from; saves touching none of them keep it
+RECIPIENT_FIELDS = {'email', 'phone', 'is_staff', 'is_active', 'email_notifications', 'whatsapp_notifications'}
+
+
+class RecipientRegistry:
+    """
+    Who gets admin notifications, without a query per send.
+
+    A snapshot holds the active staff recipients (all emails, emails that
+    opted in to email notifications, phone numbers). It is kept in process
+    memory and in the shared cache under a version stamp: a send costs one
+    cache GET of the stamp, and only the first process to see a new stamp
+    queries the database. Signals bump the stamp when a user changes;
+    snapshots also expire after NOTIFICATION_RECIPIENTS_CACHE_TTL seconds so
+    changes made behind the ORM's back (queryset.update, raw SQL) are picked
+    up within a bounded window. The site-wide email/WhatsApp toggles come
+    from the cached SiteSettings.
+    """
+
+    VERSION_CACHE_KEY = 'notification_recipients_version'
+    SNAPSHOT_CACHE_KEY = 'notification_recipients:{version}'
+    DEFAULT_CACHE_TTL = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._expires_at = 0.0
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'NOTIFICATION_RECIPIENTS_CACHE_TTL', self.DEFAULT_CACHE_TTL)
+
+    @staticmethod
+    def _load():
+        from apps.Authentication.models import CustomUser
+
+        snapshot = {
+            'admin_emails': [],
+            'opted_in_emails': [],
+            'admin_phones': [],
+        }
+        # CustomUser has no phone column today (admin numbers are passed explicitly)
+        has_phone = any(field.name == 'phone' for field in CustomUser._meta.concrete_fields)
+        fields = ('email', 'email_notifications', 'phone') if has_phone else ('email', 'email_notifications')
+        admins = CustomUser.objects.filter(is_staff=True, is_active=True).values_list(*fields)
+        for email, email_notifications, *phone in admins:
+            snapshot['admin_emails'].append(email)
+            if email_notifications:
+                snapshot['opted_in_emails'].append(email)
+            if phone and phone[0]:
+                snapshot['admin_phones'].append(phone[0])
+        return snapshot
+
+    def _shared_version(self):
+        version = cache.get(self.VERSION_CACHE_KEY)
+        if version is None:
+            # First use (or the cache was flushed): agree on one stamp across processes
+            cache.add(self.VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+            version = cache.get(self.VERSION_CACHE_KEY)
+        return version
+
+    def snapshot(self):
+        """The current recipients snapshot (a dict; do not mutate)"""
+        version = self._shared_version()
+        snapshot = self._snapshot
+        if snapshot is not None and self._version == version and time.monotonic() < self._expires_at:
+            return snapshot
+        with self._lock:
+            if self._snapshot is not None and self._version == version and time.monotonic() < self._expires_at:
+                return self._snapshot
+            snapshot_key = self.SNAPSHOT_CACHE_KEY.format(version=version)
+            snapshot = cache.get(snapshot_key)
+            if snapshot is None:
+                snapshot = self._load()
+                cache.set(snapshot_key, snapshot, self.ttl)
+            self._snapshot, self._version = snapshot, version
+            self._expires_at = time.monotonic() + self.ttl
+            return snapshot
+
+    def invalidate(self):
+        """Make every process rebuild its snapshot on the next send"""
+        # No lock needed: the new stamp alone forces the rebuild
+        self._snapshot = None
+        cache.set(self.VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def email_enabled():
+        from apps.Management.models import SiteSettings
+        return SiteSettings.cached().email_notifications_enabled
+
+    @staticmethod
+    def whatsapp_enabled():
+        from apps.Management.models import SiteSettings
+        return SiteSettings.cached().whatsapp_notifications_enabled
+
+    def admin_emails(self, check_preferences=True):
+        """Active staff emails, only those who opted in to email notifications if check_preferences"""
+        key = 'opted_in_emails' if check_preferences else 'admin_emails'
+        return list(self.snapshot()[key])
+
+    def admin_phones(self):
+        """Active staff phone numbers"""
+        return list(self.snapshot()['admin_phones'])
+
+
+recipient_registry = RecipientRegistry()
@@ -1,8 +1,9 @@
 # users/services.py - Service layer for notifications
 from .models import Notification
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 import logging
+from . import outbox, realtime
+from .recipients import recipient_registry
 from .email_service import EmailNotificationService
 from .whatsapp_service import WhatsAppNotificationService
 from django.utils import timezone
@@ -40,11 +41,11 @@ class NotificationService:
         if send_whatsapp:
             whatsapp_sent = self._send_whatsapp_notification(message)
         
-        logger.info(f"Custom notification created: {message} | Email: {email_sent} | WhatsApp: {whatsapp_sent}")
+        logger.info(f"Custom notification created: {message} | Email queued: {email_sent} | WhatsApp queued: {whatsapp_sent}")
         return notification
     
     def _send_websocket_notification(self, notification):
-        """Send notification via WebSocket to relevant users"""
+        """Send notification via WebSocket to relevant users once the transaction commits"""
         try:
             # Admin notifications: user_id is None, send to admin_notifications group
             # Member notifications: user_id is set, send to specific user group
@@ -55,16 +56,13 @@ class NotificationService:
                 group_name = f"user_{notification.user_id}_notifications"
                 print(f"✅ Sending member WebSocket notification to user {notification.user_id}: {notification.message}")
             
-            async_to_sync(self.channel_layer.group_send)(
+            realtime.send_on_commit(
                 group_name,
                 {
-                    "type": "send_notification",
-                    "notification": {
-                        "id": notification.id,
-                        "message": notification.message,
-                        "created_at": notification.created_at.isoformat(),
-                        "is_read": notification.is_read
-                    }
+                    "id": notification.id,
+                    "message": notification.message,
+                    "created_at": notification.created_at.isoformat(),
+                    "is_read": notification.is_read
                 }
             )
             logger.info(f"WebSocket notification sent to {group_name}: {notification.message}")
@@ -73,35 +71,33 @@ class NotificationService:
             print(f"❌ WebSocket notification failed: {str(e)}")
     
     def _send_email_notification(self, message):
-        """Send email notification to admins if email notifications are enabled"""
+        """Queue email notification to admins if email notifications are enabled"""
         try:
             # Check if email notifications are enabled globally from database
-            from apps.Management.models import SiteSettings
-            site_settings = SiteSettings.get_settings()
-            if not site_settings.email_notifications_enabled:
+            if not recipient_registry.email_enabled():
                 return False
             
-            # Send email with preference checking enabled
+            # Queue email with preference checking enabled
             subject = "System Notification"
-            return self.email_service.send_admin_notification_email(
+            outbox.enqueue_admin_email(
                 subject, 
                 message, 
                 check_preferences=True  # Enable preference checking
             )
+            return True
         except Exception as e:
             logger.error(f"Failed to send email notification: {str(e)}")
             return False
     
     def _send_whatsapp_notification(self, message):
-        """Send WhatsApp notification to admins if WhatsApp notifications are enabled"""
+        """Queue WhatsApp notification to admins if WhatsApp notifications are enabled"""
         try:
             # Check if WhatsApp notifications are enabled globally from database
-            from apps.Management.models import SiteSettings
-            site_settings = SiteSettings.get_settings()
-            if not site_settings.whatsapp_notifications_enabled:
+            if not recipient_registry.whatsapp_enabled():
                 return False
             
-            return self.whatsapp_service.send_admin_whatsapp_notification(message)
+            outbox.enqueue_admin_whatsapp(message)
+            return True
         except Exception as e:
             logger.error(f"Failed to send WhatsApp notification: {str(e)}")
             return False
@@ -114,8 +110,8 @@ class NotificationService:
         # Create admin-only notification
         notification = self.create_notification(message, user_id=None)
         
-        # Send email notification only to admins with email notifications enabled
-        self.email_service.send_admin_notification_email(
+        # Queue email notification only to admins with email notifications enabled
+        outbox.enqueue_admin_email(
             subject="Member Membership Renewed",
             message=f"A member has renewed their membership:\n\n"
                    f"Name: {member.first_name} {member.last_name}\n"
@@ -190,8 +186,8 @@ class NotificationService:
         
         notification = admin_notification
         
-        # Send email notification only to admins with email notifications enabled
-        self.email_service.send_admin_notification_email(
+        # Queue email notification only to admins with email notifications enabled
+        outbox.enqueue_admin_email(
             subject="Member Check-in",
             message=f"A member has checked in today:\n\n"
                    f"Name: {member.first_name} {member.last_name}\n"
@@ -1,7 +1,11 @@
 # users/signals.py - Centralized notification system
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .models import Notification
+from . import outbox, realtime
+from .recipients import RECIPIENT_FIELDS, recipient_registry
+from apps.Authentication.models import CustomUser
 from apps.Member.models import Member,Trainer
 from apps.Community.models import Post,Announcement,Challenge,SupportTicket,Comment,ChallengeParticipant,TicketResponse
 from apps.Attendance.models import Attendance
@@ -10,7 +14,6 @@ import pytz
 import os
         
 from channels.layers import get_channel_layer
-from asgiref.sync import async_to_sync
 import logging
 
 logger = logging.getLogger(__name__)
@@ -54,12 +57,9 @@ def member_created_notification(sender, instance, created, **kwargs):
             except:
                 notification = None
         
-        # Send email notification only to admins with email notifications enabled
+        # Queue email notification only to admins with email notifications enabled
         try:
-            from .email_service import EmailNotificationService
-            email_service = EmailNotificationService()
-            
-            email_success = email_service.send_admin_notification_email(
+            outbox.enqueue_admin_email(
                 subject="New Member Registration",
                 message=f"A new member has been registered:\n\n"
                        f"Name: {instance.first_name} {instance.last_name}\n"
@@ -72,7 +72,7 @@ def member_created_notification(sender, instance, created, **kwargs):
                 check_preferences=True  # Enable preference checking
             )
             
-            print(f"📧 Email notification sent: {email_success}")
+            print("📧 Email notification queued")
         except Exception as e:
             print(f"📧 Email notification failed: {str(e)}")
         
@@ -138,11 +138,8 @@ def trainer_deleted_notification(sender, instance, **kwargs):
         message=message
     )
     
-    # Send email notification
-    from .email_service import EmailNotificationService
-    email_service = EmailNotificationService()
-    
-    email_success = email_service.send_admin_notification_email(
+    # Queue email notification
+    outbox.enqueue_admin_email(
         subject="Trainer Deleted",
         message=f"A trainer has been deleted from the system:\n\n"
                f"Name: {instance.first_name} {instance.last_name}\n"
@@ -154,7 +151,7 @@ def trainer_deleted_notification(sender, instance, **kwargs):
                f"Start Date: {getattr(instance, 'start_date', 'N/A')}"
     )
     
-    print(f"📧 Trainer deletion email notification sent: {email_success}")
+    print("📧 Trainer deletion email notification queued")
     
     # Send real-time WebSocket notification
     send_realtime_notification(message, notification.id)
@@ -169,45 +166,40 @@ def challenge_created_notification(sender, instance, created, **kwargs):
     if created:
         # Send to all members
         members = Member.objects.all()
+        messages = []
         for member in members:
             if member.user:
                 notification = Notification.objects.create(
                     user=member.user,
                     message=f"New challenge available: {instance.title}"
                 )
-                # Send real-time notification
-                async_to_sync(channel_layer.group_send)(
+                messages.append((
                     f"user_{member.user.id}_notifications",
                     {
-                        "type": "send_notification",
-                        "notification": {
-                            "id": notification.id,
-                            "message": notification.message,
-                            "created_at": notification.created_at.isoformat(),
-                            "is_read": notification.is_read,
-                            "link": "/member-dashboard/community"
-                        }
+                        "id": notification.id,
+                        "message": notification.message,
+                        "created_at": notification.created_at.isoformat(),
+                        "is_read": notification.is_read,
+                        "link": "/member-dashboard/community"
                     }
-                )
+                ))
         
         # Send to admin
         admin_notification = Notification.objects.create(
             user=None,
             message=f"New admin challenge created: {instance.title}"
         )
-        # Send real-time notification to admin
-        async_to_sync(channel_layer.group_send)(
+        messages.append((
             "admin_notifications",
             {
-                "type": "send_notification",
-                "notification": {
-                    "id": admin_notification.id,
-                    "message": admin_notification.message,
-                    "created_at": admin_notification.created_at.isoformat(),
-                    "is_read": admin_notification.is_read
-                }
+                "id": admin_notification.id,
+                "message": admin_notification.message,
+                "created_at": admin_notification.created_at.isoformat(),
+                "is_read": admin_notification.is_read
             }
-        )
+        ))
+        # Real-time notifications go out from this process once the challenge is committed
+        realtime.send_many_on_commit(messages)
 
 @receiver(post_save, sender=Announcement)
 def announcement_created_notification(sender, instance, created, **kwargs):
@@ -291,20 +283,17 @@ def send_realtime_notification_with_post(message, notification_id, post_id, post
     """Send real-time WebSocket notification with post data for clickable links"""
     if channel_layer:
         try:
-            # Send to admin notification group with post data
-            async_to_sync(channel_layer.group_send)(
+            # Send to admin notification group with post data once committed
+            realtime.send_on_commit(
                 "admin_notifications",
                 {
-                    "type": "send_notification",
-                    "notification": {
-                        "id": notification_id,
-                        "message": message,
-                        "created_at": "now",
-                        "is_read": False,
-                        "notification_type": "community_post",
-                        "post_id": post_id,
-                        "post_title": post_title
-                    }
+                    "id": notification_id,
+                    "message": message,
+                    "created_at": "now",
+                    "is_read": False,
+                    "notification_type": "community_post",
+                    "post_id": post_id,
+                    "post_title": post_title
                 }
             )
             logger.info(f"Real-time post notification sent: {message}")
@@ -317,17 +306,14 @@ def send_realtime_notification(message, notification_id):
     """Send real-time WebSocket notification to all admin users"""
     if channel_layer:
         try:
-            # Send to admin notification group
-            async_to_sync(channel_layer.group_send)(
+            # Send to admin notification group once committed
+            realtime.send_on_commit(
                 "admin_notifications",
                 {
-                    "type": "send_notification",
-                    "notification": {
-                        "id": notification_id,
-                        "message": message,
-                        "created_at": "now",
-                        "is_read": False
-                    }
+                    "id": notification_id,
+                    "message": message,
+                    "created_at": "now",
+                    "is_read": False
                 }
             )
             logger.info(f"Real-time notification sent: {message}")
@@ -350,11 +336,8 @@ def member_deleted_notification(sender, instance, **kwargs):
         message=message
     )
     
-    # Send email notification
-    from .email_service import EmailNotificationService
-    email_service = EmailNotificationService()
-    
-    email_success = email_service.send_admin_notification_email(
+    # Queue email notification
+    outbox.enqueue_admin_email(
         subject="Member Deleted",
         message=f"A member has been deleted from the system:\n\n"
                f"Name: {instance.first_name} {instance.last_name}\n"
@@ -366,7 +349,7 @@ def member_deleted_notification(sender, instance, **kwargs):
                f"Expiry Date: {instance.expiry_date}"
     )
     
-    print(f"📧 Member deletion email notification sent: {email_success}")
+    print("📧 Member deletion email notification queued")
     
     # Send real-time WebSocket notification
     send_realtime_notification(message, notification.id)
@@ -392,11 +375,8 @@ def member_checkin_notification(sender, instance, created, **kwargs):
         kabul_tz = pytz.timezone('Asia/Kabul')
         local_time = instance.check_in_time.astimezone(kabul_tz)
         
-        # Send email notification only to admins with email notifications enabled
-        from .email_service import EmailNotificationService
-        email_service = EmailNotificationService()
-        
-        email_success = email_service.send_admin_notification_email(
+        # Queue email notification only to admins with email notifications enabled
+        outbox.enqueue_admin_email(
             subject="Member Check-in Notification",
             message=f"A member has checked in today:\n\n"
                    f"Name: {member.first_name} {member.last_name}\n"
@@ -409,7 +389,7 @@ def member_checkin_notification(sender, instance, created, **kwargs):
             check_preferences=True  # Enable preference checking
         )
         
-        print(f"📧 Email notification sent: {email_success}")
+        print("📧 Email notification queued")
         
         # Send real-time WebSocket notification
         send_realtime_notification(message, notification.id)
@@ -466,4 +446,20 @@ def ticket_response_notification(sender, instance, created, **kwargs):
     Notification.objects.create(
         user=instance.ticket.member.user,
         message=f"Your support ticket #{instance.ticket.id} has received a response from our team"
-    )
\ No newline at end of file
+    )
+
+
+# Recipient registry invalidation (not subject to DJANGO_DISABLE_SIGNALS: a stale
+# registry would email the wrong people)
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_recipients_on_user_save(sender, instance, update_fields=None, **kwargs):
+    """Rebuild the admin recipient snapshot when a user's recipient fields may have changed"""
+    if update_fields is not None and not RECIPIENT_FIELDS.intersection(update_fields):
+        return  # e.g. the last_login update on every login
+    transaction.on_commit(recipient_registry.invalidate)
+
+@receiver(post_delete, sender=CustomUser)
+def invalidate_recipients_on_user_delete(sender, instance, **kwargs):
+    """Rebuild the admin recipient snapshot when a user is deleted"""
+    transaction.on_commit(recipient_registry.invalidate)
@@ -0,0 +1,255 @@
+"""
+Pooled SMTP sessions for EmailNotificationService
+
+Opening a session costs a TCP connect, EHLO, STARTTLS and AUTH, which used
+to be paid for every notification email. The pool keeps authenticated
+sessions alive and hands them out one thread at a time:
+
+- a session idle for longer than ``check_after`` seconds is probed with
+  NOOP before reuse; one idle for longer than ``max_idle`` is closed
+  (servers drop idle clients anyway)
+- a session that fails while sending is discarded and the message is
+  retried once on a fresh session, so server-side disconnects are
+  invisible to callers
+- at most ``max_size`` sessions exist; further callers wait for one
+"""
+
+import smtplib
+import ssl
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from django.conf import settings
+
+DEFAULT_MAX_SIZE = 4
+DEFAULT_MAX_IDLE = 60      # seconds; close sessions idle for longer
+DEFAULT_CHECK_AFTER = 5    # seconds; NOOP-probe sessions idle for longer
+DEFAULT_TIMEOUT = 30       # seconds per socket operation
+DEFAULT_WAIT = 30          # seconds to wait for a free session
+
+
+def is_connection_error(exc):
+    """
+    True if exc means the session itself is gone (socket errors, server
+    hang-up). SMTPException subclasses OSError, but protocol replies such as
+    a refused recipient leave the session usable and must not be retried.
+    """
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(exc, OSError) and not isinstance(exc, smtplib.SMTPException)
+
+
+def build_ssl_context():
+    """Environment-aware SSL context: verification may only be bypassed in DEBUG with EMAIL_DEV_SSL_BYPASS"""
+    context = ssl.create_default_context()
+    if getattr(settings, 'DEBUG', False) and getattr(settings, 'EMAIL_DEV_SSL_BYPASS', False):
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+    return context
+
+
+class PoolExhausted(smtplib.SMTPException):
+    """No SMTP session became free within the wait timeout"""
+
+
+class SMTPConnectionPool:
+    """Thread-safe pool of authenticated smtplib sessions to one server"""
+
+    def __init__(self, host, port, username='', password='', use_tls=True, use_ssl=False,
+                 timeout=DEFAULT_TIMEOUT, ssl_context=None, max_size=DEFAULT_MAX_SIZE,
+                 max_idle=DEFAULT_MAX_IDLE, check_after=DEFAULT_CHECK_AFTER, wait=DEFAULT_WAIT):
+        self.host = host
+        self.port = int(port)
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self.wait = wait
+
+        self._lock = threading.Lock()
+        self._idle = deque()    # (session, last used monotonic time), most recent on the right
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._closed = False
+        self.stats = {'opened': 0, 'reused': 0, 'probes': 0, 'discarded': 0, 'retries': 0, 'sent': 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    # ------------------------------------------------------------------
+
+    def _open(self):
+        context = self.ssl_context or build_ssl_context()
+        if self.use_ssl:
+            session = smtplib.SMTP_SSL(self.host, self.port, timeout=self.timeout, context=context)
+        else:
+            session = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls and not self.use_ssl:
+                session.starttls(context=context)
+            if self.username:
+                session.login(self.username, self.password)
+        except BaseException:
+            self._close(session)
+            raise
+        self._count('opened')
+        return session
+
+    @staticmethod
+    def _close(session):
+        try:
+            session.quit()
+        except Exception:
+            try:
+                session.close()
+            except Exception:
+                pass
+
+    def _alive(self, session):
+        self._count('probes')
+        try:
+            return session.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _checkout(self):
+        """Most recently used healthy idle session, or a new one"""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                session, last_used = self._idle.pop()
+            idle_for = now - last_used
+            if idle_for <= self.max_idle and (idle_for <= self.check_after or self._alive(session)):
+                self._count('reused')
+                return session
+            self._count('discarded')
+            self._close(session)
+        return self._open()
+
+    def _checkin(self, session):
+        with self._lock:
+            if not self._closed:
+                self._idle.append((session, time.monotonic()))
+                return
+        self._close(session)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a session; it returns to the pool unless the block failed on the connection"""
+        if not self._slots.acquire(timeout=self.wait):
+            raise PoolExhausted(f"No SMTP session to {self.host}:{self.port} became free within {self.wait}s")
+        session = None
+        try:
+            session = self._checkout()
+            yield session
+        except Exception as e:
+            if session is not None and is_connection_error(e):
+                self._count('discarded')
+                self._close(session)
+                session = None
+            raise
+        finally:
+            if session is not None:
+                self._checkin(session)
+            self._slots.release()
+
+    def _send(self, send):
+        """Run send(session), retrying once on a fresh session if the borrowed one turns out to be dead"""
+        try:
+            with self.connection() as session:
+                result = send(session)
+        except Exception as e:
+            if not is_connection_error(e):
+                raise
+            self._count('retries')
+            with self.connection() as session:
+                result = send(session)
+        self._count('sent')
+        return result
+
+    def send_message(self, message, from_addr=None, to_addrs=None):
+        """Send an email.message.Message (see _send for the retry)"""
+        return self._send(lambda session: session.send_message(message, from_addr, to_addrs))
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        """
+        Send an already serialized message to the envelope recipients in one
+        transaction (see _send for the retry)
+        Returns: {recipient: (code, response)} for the refused recipients
+        """
+        return self._send(lambda session: session.sendmail(from_addr, to_addrs, msg))
+
+    def close(self):
+        """Close every idle session; borrowed ones are closed when returned"""
+        with self._lock:
+            self._closed = True
+            sessions = [session for session, _ in self._idle]
+            self._idle.clear()
+        for session in sessions:
+            self._close(session)
+
+    @property
+    def idle_count(self):
+        with self._lock:
+            return len(self._idle)
+
+
+_pool = None
+_pool_key = None
+_pool_lock = threading.Lock()
+
+
+def _flag(value):
+    # EMAIL_USE_TLS/SSL are read with env() without a cast, so may be strings
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return bool(value)
+
+
+def _settings_key():
+    return (
+        settings.EMAIL_HOST,
+        int(getattr(settings, 'EMAIL_PORT', 25)),
+        getattr(settings, 'EMAIL_HOST_USER', ''),
+        getattr(settings, 'EMAIL_HOST_PASSWORD', ''),
+        _flag(getattr(settings, 'EMAIL_USE_TLS', True)),
+        _flag(getattr(settings, 'EMAIL_USE_SSL', False)),
+    )
+
+
+def get_pool():
+    """Process-wide pool for the configured EMAIL_* server; rebuilt if the settings change"""
+    global _pool, _pool_key
+    key = _settings_key()
+    with _pool_lock:
+        if _pool is None or _pool_key != key:
+            if _pool is not None:
+                _pool.close()
+            host, port, username, password, use_tls, use_ssl = key
+            _pool = SMTPConnectionPool(
+                host, port, username, password, use_tls=use_tls, use_ssl=use_ssl,
+                timeout=getattr(settings, 'EMAIL_TIMEOUT', None) or DEFAULT_TIMEOUT,
+                max_size=getattr(settings, 'EMAIL_POOL_SIZE', DEFAULT_MAX_SIZE),
+                max_idle=getattr(settings, 'EMAIL_POOL_MAX_IDLE', DEFAULT_MAX_IDLE),
+                check_after=getattr(settings, 'EMAIL_POOL_CHECK_AFTER', DEFAULT_CHECK_AFTER),
+            )
+            _pool_key = key
+        return _pool
+
+
+def close_pool():
+    """Close the process-wide pool (tests, worker shutdown)"""
+    global _pool, _pool_key
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = _pool_key = None
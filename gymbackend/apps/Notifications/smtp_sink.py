@@ -0,0 +1,212 @@
+"""
+Local SMTP sink for the SMTP pool tests and ``manage.py benchmark_smtp``
+
+Accepts every message on 127.0.0.1 (no TLS, no AUTH) and records it.
+Uses aiosmtpd when installed and the standard library's smtpd (Python
+3.11 and older) otherwise. Neither is imported until a sink starts, so
+loading this module from the app costs nothing. Messages whose content
+contains REJECT_MARKER are refused at DATA with a 554 so protocol errors
+can be exercised, and drop_connections() hangs up on every client to
+simulate a server-side disconnect. With aiosmtpd, ``latency`` delays every reply by that many
+seconds to model the round trips to a remote provider.
+"""
+
+import asyncio
+import socket
+import threading
+import time
+import unittest
+from importlib.util import find_spec
+
+REJECT_MARKER = b'X-Sink-Reject'
+
+has_aiosmtpd = find_spec('aiosmtpd') is not None
+has_smtpd = find_spec('smtpd') is not None and find_spec('asyncore') is not None
+available = has_aiosmtpd or has_smtpd
+skip_unless_available = unittest.skipUnless(available, 'aiosmtpd (or smtpd on Python < 3.12) is required')
+
+
+def _free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+class LocalSMTPSink:
+    """Context manager running a recording SMTP server in a background thread"""
+
+    def __init__(self, port=None, latency=0):
+        if not available:
+            raise RuntimeError('Neither aiosmtpd nor smtpd is available')
+        if latency and not has_aiosmtpd:
+            raise RuntimeError('Simulated latency requires aiosmtpd')
+        self.latency = latency
+        self.host = '127.0.0.1'
+        self.port = port or _free_port()
+        self.messages = []
+        self.envelopes = []     # RCPT TO addresses of each accepted message
+        self.connections = 0
+        self.active = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    # -- bookkeeping shared by both backends ---------------------------
+
+    def _connected(self):
+        with self._lock:
+            self.connections += 1
+            self.active += 1
+
+    def _disconnected(self):
+        with self._lock:
+            self.active -= 1
+
+    def _received(self, content, recipients):
+        if REJECT_MARKER in content:
+            return '554 Message rejected'
+        with self._lock:
+            self.messages.append(content)
+            self.envelopes.append(list(recipients))
+        return None
+
+    def reset(self):
+        with self._lock:
+            self.messages = []
+            self.envelopes = []
+            self.connections = 0
+
+    # -- lifecycle -----------------------------------------------------
+
+    def start(self):
+        self._server = _AioBackend(self) if has_aiosmtpd else _SmtpdBackend(self)
+        self._server.start()
+        # aiosmtpd opens a probe connection to check readiness
+        self.reset()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.stop()
+            self._server = None
+
+    def drop_connections(self):
+        """Hang up on every connected client"""
+        self._server.drop_connections()
+        deadline = time.monotonic() + 2
+        while self.active and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+class _AioBackend:
+    def __init__(self, sink):
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.smtp import SMTP as AioSMTP
+
+        self.sink = sink
+        self.transports = []
+
+        backend = self
+
+        class Handler:
+            async def handle_DATA(self, server, session, envelope):
+                return sink._received(envelope.original_content or envelope.content, envelope.rcpt_tos) or '250 OK'
+
+        class TrackingSMTP(AioSMTP):
+            def connection_made(self, transport):
+                sink._connected()
+                backend.transports.append(transport)
+                super().connection_made(transport)
+
+            def connection_lost(self, exc):
+                sink._disconnected()
+                super().connection_lost(exc)
+
+            async def push(self, status):
+                if sink.latency:
+                    await asyncio.sleep(sink.latency)
+                await super().push(status)
+
+        class TrackingController(Controller):
+            def factory(self):
+                return TrackingSMTP(self.handler, **self.SMTP_kwargs)
+
+        self.controller = TrackingController(Handler(), hostname=sink.host, port=sink.port)
+
+    def start(self):
+        self.controller.start()
+
+    def stop(self):
+        self.drop_connections()
+        self.controller.stop()
+
+    def drop_connections(self):
+        transports, self.transports = self.transports, []
+        for transport in transports:
+            self.controller.loop.call_soon_threadsafe(transport.close)
+
+
+class _SmtpdBackend:
+    def __init__(self, sink):
+        import asyncore
+        import smtpd
+
+        self.asyncore = asyncore
+        self.sink = sink
+        self.channels = []
+        self._drop = threading.Event()
+        self._stop = threading.Event()
+        backend = self
+
+        class TrackingChannel(smtpd.SMTPChannel):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                sink._connected()
+                backend.channels.append(self)
+
+            def handle_close(self):
+                # Called by the loop when the client hangs up and by drop_connections()
+                if not getattr(self, '_closed_by_sink', False):
+                    self._closed_by_sink = True
+                    sink._disconnected()
+                super().handle_close()
+
+        class Server(smtpd.SMTPServer):
+            channel_class = TrackingChannel
+
+            def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+                return sink._received(data, rcpttos)
+
+        self._map = {}
+        self.server = Server((sink.host, sink.port), None, decode_data=False, map=self._map)
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _loop(self):
+        # asyncore is not thread-safe: hang-ups are performed inside its loop
+        while not self._stop.is_set():
+            self.asyncore.loop(timeout=0.05, count=1, map=self._map)
+            if self._drop.is_set():
+                channels, self.channels = self.channels, []
+                for channel in channels:
+                    channel.handle_close()
+                self._drop.clear()
+        for channel in self.channels:
+            channel.handle_close()
+        self.server.close()
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.thread.join(timeout=5)
+
+    def drop_connections(self):
+        self._drop.set()
+        while self._drop.is_set() and self.thread.is_alive():
+            time.sleep(0.01)
@@ -1,3 +1,498 @@
-from django.test import TestCase
+import smtplib
+import threading
+from datetime import date, timedelta
+from email import message_from_bytes, policy
+from io import StringIO
+from email.message import EmailMessage
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from apps.Authentication.models import CustomUser
+from apps.Management.models import SiteSettings, site_settings_cache
+from apps.Member.models import Member
+from .email_service import EmailNotificationService
+from . import email_templates, outbox
+from .models import NotificationOutbox
+from .recipients import RecipientRegistry, recipient_registry
+from .smtp_pool import SMTPConnectionPool, close_pool, get_pool
+from . import smtp_sink
+
+
+def reset_notification_caches():
+    # Test transactions never commit, so the on_commit invalidation doesn't run
+    recipient_registry.invalidate()
+    site_settings_cache.invalidate()
+
+
+def make_message(index, reject=False):
+    message = EmailMessage()
+    message['Subject'] = f'Pool test {index}'
+    message['From'] = 'gym@example.com'
+    message['To'] = 'admin@example.com'
+    if reject:
+        message[smtp_sink.REJECT_MARKER.decode()] = 'yes'
+    message.set_content(f'Message {index}')
+    return message
+
+
+@smtp_sink.skip_unless_available
+class SMTPConnectionPoolTests(SimpleTestCase):
+
+    def setUp(self):
+        self.sink = smtp_sink.LocalSMTPSink().start()
+        self.addCleanup(self.sink.stop)
+
+    def make_pool(self, **kwargs):
+        pool = SMTPConnectionPool(self.sink.host, self.sink.port, use_tls=False, timeout=5, **kwargs)
+        self.addCleanup(pool.close)
+        return pool
+
+    def test_reuses_one_session_for_many_messages(self):
+        pool = self.make_pool()
+        for index in range(20):
+            pool.send_message(make_message(index))
+
+        self.assertEqual(len(self.sink.messages), 20)
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(pool.stats['opened'], 1)
+        self.assertEqual(pool.stats['reused'], 19)
+        self.assertEqual(pool.idle_count, 1)
+
+    def test_noop_probe_replaces_dropped_session(self):
+        pool = self.make_pool(check_after=0)
+        pool.send_message(make_message(1))
+        self.sink.drop_connections()
+
+        pool.send_message(make_message(2))
+
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertEqual(pool.stats['opened'], 2)
+        self.assertGreaterEqual(pool.stats['probes'], 1)
+        self.assertEqual(pool.stats['retries'], 0)
+
+    def test_send_retries_once_on_dropped_session(self):
+        # A fresh session is not probed, so the send itself finds it dead
+        pool = self.make_pool(check_after=60)
+        pool.send_message(make_message(1))
+        self.sink.drop_connections()
+
+        pool.send_message(make_message(2))
+
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertEqual(pool.stats['retries'], 1)
+        self.assertEqual(pool.stats['opened'], 2)
+
+    def test_sessions_idle_too_long_are_closed(self):
+        pool = self.make_pool(max_idle=0)
+        pool.send_message(make_message(1))
+        pool.send_message(make_message(2))
+
+        self.assertEqual(pool.stats['opened'], 2)
+        self.assertEqual(pool.stats['probes'], 0)
+
+    def test_rejected_message_keeps_session(self):
+        pool = self.make_pool()
+        pool.send_message(make_message(1))
+
+        with self.assertRaises(smtplib.SMTPDataError):
+            pool.send_message(make_message(2, reject=True))
+        pool.send_message(make_message(3))
+
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertEqual(pool.stats['opened'], 1)
+        self.assertEqual(pool.stats['retries'], 0)
+
+    def test_shared_across_threads_within_size_limit(self):
+        pool = self.make_pool(max_size=3)
+        errors = []
+
+        def worker(thread_index):
+            try:
+                for index in range(25):
+                    pool.send_message(make_message(thread_index * 100 + index))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.sink.messages), 200)
+        self.assertLessEqual(pool.stats['opened'], 3)
+        self.assertEqual(pool.stats['sent'], 200)
+
+    def test_exhausted_pool_raises(self):
+        pool = self.make_pool(max_size=1, wait=0.1)
+        with pool.connection():
+            with self.assertRaises(smtplib.SMTPException):
+                with pool.connection():
+                    pass
+
+    def test_closed_pool_does_not_keep_returned_sessions(self):
+        pool = self.make_pool()
+        with pool.connection() as session:
+            pool.close()
+            session.noop()
+        self.assertEqual(pool.idle_count, 0)
+
+
+@smtp_sink.skip_unless_available
+class EmailNotificationServicePoolTests(TestCase):
+
+    def setUp(self):
+        self.sink = smtp_sink.LocalSMTPSink().start()
+        self.addCleanup(self.sink.stop)
+        self.addCleanup(close_pool)
+        overrides = override_settings(
+            EMAIL_HOST=self.sink.host,
+            EMAIL_PORT=self.sink.port,
+            EMAIL_HOST_USER='',
+            DEFAULT_FROM_EMAIL='gym@example.com',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_notification_caches()
+        for index in range(3):
+            CustomUser.objects.create_user(
+                email=f'admin{index}@example.com', password='x', username=f'admin{index}', is_staff=True
+            )
+
+    def test_notifications_share_one_session(self):
+        for index in range(5):
+            self.assertTrue(EmailNotificationService.send_admin_notification_email(f'Subject {index}', 'Body'))
+
+        self.assertEqual(len(self.sink.messages), 5)
+        self.assertEqual(self.sink.connections, 1)
+        self.assertEqual(get_pool().stats['opened'], 1)
+
+    def test_reconnects_after_server_hangs_up(self):
+        self.assertTrue(EmailNotificationService.send_admin_notification_email('Before', 'Body'))
+        self.sink.drop_connections()
+        self.assertTrue(EmailNotificationService.send_admin_notification_email('After', 'Body'))
+
+        self.assertEqual(len(self.sink.messages), 2)
+        self.assertEqual(self.sink.connections, 2)
+
+    def test_errors_raise_only_when_not_silent(self):
+        self.sink.stop()
+        close_pool()
+        self.assertFalse(EmailNotificationService.send_admin_notification_email('Down', 'Body'))
+        with self.assertRaises(OSError):
+            EmailNotificationService.send_admin_notification_email('Down', 'Body', fail_silently=False)
+
+
+class RenderedEmailTests(SimpleTestCase):
+
+    def test_body_is_shared_and_headers_are_per_envelope(self):
+        email = email_templates.RenderedEmail('Subject', 'gym@example.com', 'Text', '<p>Html</p>')
+        batches = list(email.batches(['a@example.com', 'b@example.com', 'c@example.com'], batch_size=2))
+
+        self.assertEqual([recipients for recipients, _ in batches], [['a@example.com', 'b@example.com'], ['c@example.com']])
+        for _, data in batches:
+            self.assertTrue(data.endswith(email.body))
+        batched = message_from_bytes(batches[0][1], policy=policy.default)
+        single = message_from_bytes(batches[1][1], policy=policy.default)
+        self.assertEqual(batched['To'], email_templates.UNDISCLOSED_RECIPIENTS)
+        self.assertEqual(single['To'], 'c@example.com')
+        self.assertNotEqual(batched['Message-ID'], single['Message-ID'])
+        self.assertEqual(single['Subject'], 'Subject')
+        self.assertEqual(single.get_body(('plain',)).get_content().strip(), 'Text')
+        self.assertEqual(single.get_body(('html',)).get_content().strip(), '<p>Html</p>')
+
+    @override_settings(EMAIL_HOST_USER='gym@example.com')
+    def test_admin_notification_escapes_message(self):
+        email = email_templates.render_admin_notification('Alert', 'Line <b>one</b>\nLine two')
+        parsed = message_from_bytes(email.as_bytes(['a@example.com']), policy=policy.default)
+
+        html = parsed.get_body(('html',)).get_content()
+        text = parsed.get_body(('plain',)).get_content().replace('\r\n', '\n')
+        self.assertIn('Line &lt;b&gt;one&lt;/b&gt;<br>Line two', html)
+        self.assertIn('Message: Line <b>one</b>\nLine two', text)
+        self.assertEqual(parsed['Subject'], '[Gym Management] Alert')
+        self.assertEqual(parsed['From'], 'gym@example.com')
+
+
+@smtp_sink.skip_unless_available
+class EmailNotificationBatchTests(TestCase):
+
+    def setUp(self):
+        self.sink = smtp_sink.LocalSMTPSink().start()
+        self.addCleanup(self.sink.stop)
+        self.addCleanup(close_pool)
+        overrides = override_settings(
+            EMAIL_HOST=self.sink.host,
+            EMAIL_PORT=self.sink.port,
+            EMAIL_HOST_USER='',
+            DEFAULT_FROM_EMAIL='gym@example.com',
+            EMAIL_HOST_PASSWORD='',
+            EMAIL_USE_TLS=False,
+            EMAIL_USE_SSL=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        reset_notification_caches()
+        self.admins = [f'admin{index}@example.com' for index in range(5)]
+
+    def send(self):
+        return EmailNotificationService.send_admin_notification_email('Batch', 'Body', admin_emails=self.admins)
+
+    def test_admins_are_bcc_in_one_transaction(self):
+        self.assertTrue(self.send())
+
+        self.assertEqual(self.sink.envelopes, [self.admins])
+        content = self.sink.messages[0]
+        self.assertIn(b'To: undisclosed-recipients:;', content)
+        for address in self.admins:
+            self.assertNotIn(address.encode(), content)
+
+    @override_settings(EMAIL_BCC_BATCH_SIZE=2)
+    def test_envelopes_are_split_by_batch_size(self):
+        self.assertTrue(self.send())
+
+        self.assertEqual(self.sink.envelopes, [self.admins[0:2], self.admins[2:4], self.admins[4:]])
+        self.assertEqual(self.sink.connections, 1)
+
+    @override_settings(EMAIL_BCC_BATCH_SIZE=1)
+    def test_templates_render_once_per_notification(self):
+        with mock.patch.object(email_templates, 'get_template', wraps=email_templates.get_template) as get_template:
+            self.assertTrue(self.send())
+
+        self.assertEqual(get_template.call_count, 2)
+        self.assertEqual(self.sink.envelopes, [[address] for address in self.admins])
+        bodies = {content.replace(b'\r\n', b'\n').split(b'\n\n', 1)[1] for content in self.sink.messages}
+        self.assertEqual(len(bodies), 1)
+
+
+class RecipientRegistryTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        reset_notification_caches()
+        self.admin = CustomUser.objects.create_user(
+            email='admin@example.com', password='x', username='admin', is_staff=True
+        )
+        CustomUser.objects.create_user(
+            email='quiet@example.com', password='x', username='quiet', is_staff=True, email_notifications=False
+        )
+        CustomUser.objects.create_user(email='member@example.com', password='x', username='member')
+
+    def test_snapshot(self):
+        self.assertTrue(recipient_registry.email_enabled())
+        self.assertFalse(recipient_registry.whatsapp_enabled())
+        self.assertEqual(recipient_registry.admin_emails(), ['admin@example.com'])
+        self.assertCountEqual(
+            recipient_registry.admin_emails(check_preferences=False), ['admin@example.com', 'quiet@example.com']
+        )
+        self.assertEqual(recipient_registry.admin_phones(), [])
+
+    def test_warm_registry_does_no_queries(self):
+        recipient_registry.snapshot()
+        SiteSettings.cached()
+        with self.assertNumQueries(0):
+            recipient_registry.email_enabled()
+            recipient_registry.admin_emails()
+            EmailNotificationService.get_admin_emails()
+
+    def test_other_processes_share_the_cached_snapshot(self):
+        recipient_registry.snapshot()
+        with self.assertNumQueries(0):
+            self.assertEqual(RecipientRegistry().admin_emails(), ['admin@example.com'])
+
+    def test_preference_change_invalidates(self):
+        recipient_registry.snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.email_notifications = False
+            self.admin.save()
+
+        self.assertEqual(recipient_registry.admin_emails(), [])
+
+    def test_last_login_update_keeps_snapshot(self):
+        recipient_registry.snapshot()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.admin.save(update_fields=['last_login'])
+
+        self.assertEqual(callbacks, [])
+
+    def test_first_load_creating_site_settings(self):
+        SiteSettings.objects.all().delete()
+        site_settings_cache.invalidate()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertTrue(recipient_registry.email_enabled())
+        self.assertTrue(SiteSettings.objects.filter(pk=1).exists())
+
+    def test_site_settings_change_invalidates(self):
+        self.assertTrue(recipient_registry.email_enabled())
+        with self.captureOnCommitCallbacks(execute=True):
+            site_settings = SiteSettings.get_settings()
+            site_settings.email_notifications_enabled = False
+            site_settings.save()
+
+        self.assertFalse(recipient_registry.email_enabled())
+        self.assertFalse(EmailNotificationService.send_admin_notification_email('Off', 'Body'))
+
+
+@override_settings(
+    NOTIFICATION_OUTBOX_MAX_ATTEMPTS=3,
+    NOTIFICATION_OUTBOX_RETRY_BASE=30,
+    NOTIFICATION_OUTBOX_RETRY_MAX=3600,
+    NOTIFICATION_OUTBOX_LEASE=300,
+)
+class NotificationOutboxTests(TestCase):
+
+    def setUp(self):
+        self.delivered = []
+        self.failures = 0
+        deliverers = mock.patch.dict(outbox.DELIVERERS, {NotificationOutbox.CHANNEL_EMAIL: self.fake_deliver})
+        deliverers.start()
+        self.addCleanup(deliverers.stop)
+
+    def fake_deliver(self, payload):
+        if payload.get('skip'):
+            raise outbox.SkipDelivery('not wanted')
+        if self.failures:
+            self.failures -= 1
+            raise smtplib.SMTPServerDisconnected('connection dropped')
+        self.delivered.append(payload['subject'])
+
+    def enqueue(self, subject='Hello', **payload):
+        return outbox.enqueue(NotificationOutbox.CHANNEL_EMAIL, {'subject': subject, 'message': 'Body', **payload})
+
+    def claim(self):
+        entries = outbox.claim_due(10)
+        self.assertEqual(len(entries), 1)
+        return entries[0]
+
+    def test_claim_due_leases_rows(self):
+        due = self.enqueue('Due')
+        later = self.enqueue('Later')
+        now = timezone.now()
+        NotificationOutbox.objects.filter(pk=later.pk).update(available_at=now + timedelta(minutes=5))
+
+        claimed = outbox.claim_due(10, now=now)
+
+        self.assertEqual([entry.pk for entry in claimed], [due.pk])
+        due.refresh_from_db()
+        self.assertEqual(due.attempts, 1)
+        self.assertEqual(due.available_at, now + timedelta(seconds=300))
+        # Leased rows are not handed out again until the lease expires
+        self.assertEqual(outbox.claim_due(10, now=now), [])
+        self.assertEqual(len(outbox.claim_due(10, now=now + timedelta(minutes=6))), 2)
+
+    def test_deliver_marks_sent(self):
+        self.enqueue('Sent')
+        entry = self.claim()
+
+        self.assertEqual(outbox.deliver(entry), NotificationOutbox.STATUS_SENT)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, NotificationOutbox.STATUS_SENT)
+        self.assertIsNotNone(entry.sent_at)
+        self.assertEqual(self.delivered, ['Sent'])
+
+    def test_deliver_marks_skipped(self):
+        self.enqueue('Skipped', skip=True)
+        entry = self.claim()
+
+        self.assertEqual(outbox.deliver(entry), NotificationOutbox.STATUS_SKIPPED)
+        entry.refresh_from_db()
+        self.assertEqual(entry.last_error, 'not wanted')
+        self.assertEqual(self.delivered, [])
+
+    def test_failures_back_off_then_give_up(self):
+        self.failures = 3
+        created = self.enqueue('Flaky')
+        delays = []
+        for attempt in range(1, 4):
+            NotificationOutbox.objects.filter(pk=created.pk).update(available_at=timezone.now())
+            entry = self.claim()
+            before = timezone.now()
+            status = outbox.deliver(entry)
+            entry.refresh_from_db()
+            self.assertEqual(entry.attempts, attempt)
+            self.assertIn('SMTPServerDisconnected', entry.last_error)
+            if attempt < 3:
+                self.assertEqual(status, NotificationOutbox.STATUS_PENDING)
+                delays.append(round((entry.available_at - before).total_seconds()))
+
+        self.assertEqual(delays, [30, 60])
+        self.assertEqual(status, NotificationOutbox.STATUS_FAILED)
+        self.assertEqual(outbox.claim_due(10, now=timezone.now() + timedelta(days=1)), [])
+
+    def test_retry_delay_is_capped(self):
+        self.assertEqual(outbox.retry_delay(1), timedelta(seconds=30))
+        self.assertEqual(outbox.retry_delay(4), timedelta(seconds=240))
+        self.assertEqual(outbox.retry_delay(20), timedelta(seconds=3600))
+
+    def test_rolled_back_change_queues_nothing(self):
+        user = CustomUser.objects.create_user(email='rollback@example.com', password='x', username='rollback')
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                Member.objects.create(
+                    user=user, athlete_id='RB1', first_name='Roll', last_name='Back',
+                    monthly_fee=10, start_date=date.today(), expiry_date=date.today(),
+                )
+                self.assertTrue(NotificationOutbox.objects.exists())
+                raise RuntimeError('abort the registration')
+
+        self.assertFalse(NotificationOutbox.objects.exists())
+
+    def test_queue_depth(self):
+        now = timezone.now()
+        self.enqueue('Due')
+        retrying = self.enqueue('Retrying')
+        NotificationOutbox.objects.filter(pk=retrying.pk).update(attempts=1, available_at=now + timedelta(minutes=1))
+        failed = self.enqueue('Failed')
+        NotificationOutbox.objects.filter(pk=failed.pk).update(status=NotificationOutbox.STATUS_FAILED)
+        outbox.enqueue_admin_whatsapp('Hello')
+
+        depth = outbox.queue_depth(now=now + timedelta(seconds=10))
+
+        self.assertEqual(depth['pending'], 3)
+        self.assertEqual(depth['due'], 2)
+        self.assertEqual(depth['retrying'], 1)
+        self.assertEqual(depth['failed'], 1)
+        self.assertGreaterEqual(depth['oldest_due_seconds'], 10)
+        self.assertEqual(depth['by_channel'], {NotificationOutbox.CHANNEL_EMAIL: 2, NotificationOutbox.CHANNEL_WHATSAPP: 1})
+
+    def test_purge_delivered(self):
+        old = timezone.now() - timedelta(days=8)
+        sent = self.enqueue('Old sent')
+        skipped = self.enqueue('Old skipped')
+        failed = self.enqueue('Old failed')
+        recent = self.enqueue('Recent sent')
+        pending = self.enqueue('Old pending')
+        NotificationOutbox.objects.filter(pk=sent.pk).update(status=NotificationOutbox.STATUS_SENT, created_at=old)
+        NotificationOutbox.objects.filter(pk=skipped.pk).update(status=NotificationOutbox.STATUS_SKIPPED, created_at=old)
+        NotificationOutbox.objects.filter(pk=failed.pk).update(status=NotificationOutbox.STATUS_FAILED, created_at=old)
+        NotificationOutbox.objects.filter(pk=recent.pk).update(status=NotificationOutbox.STATUS_SENT)
+        NotificationOutbox.objects.filter(pk=pending.pk).update(created_at=old)
+
+        self.assertEqual(outbox.purge_delivered(7), 2)
+        self.assertCountEqual(
+            NotificationOutbox.objects.values_list('pk', flat=True), [failed.pk, recent.pk, pending.pk]
+        )
+
+    def test_worker_once_drains_the_queue(self):
+        for index in range(5):
+            self.enqueue(f'Queued {index}')
+        self.enqueue('Unwanted', skip=True)
+
+        stdout = StringIO()
+        # The worker's per-round close_old_connections() would drop the test transaction
+        with mock.patch('apps.Notifications.management.commands.notification_worker.close_old_connections'):
+            call_command('notification_worker', '--once', '--batch-size', '2', '--purge-days', '0', stdout=stdout)
+
+        self.assertEqual(self.delivered, [f'Queued {index}' for index in range(5)])
+        self.assertFalse(NotificationOutbox.objects.filter(status=NotificationOutbox.STATUS_PENDING).exists())
+        self.assertEqual(outbox.queue_depth()['pending'], 0)
+        self.assertIn('sent: 5', stdout.getvalue())
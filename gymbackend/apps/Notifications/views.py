@@ -110,10 +110,9 @@ class NotificationViewSet(viewsets.ViewSet):
                     f"Membership expired for: {member.first_name} {member.last_name}"
                 )
                 
-                # Send email notification
-                from .email_service import EmailNotificationService
-                email_service = EmailNotificationService()
-                email_service.send_admin_notification_email(
+                # Queue email notification
+                from . import outbox
+                outbox.enqueue_admin_email(
                     subject="Member Membership Expired",
                     message=f"A member's membership has expired:\n\n"
                            f"Name: {member.first_name} {member.last_name}\n"
@@ -300,6 +299,12 @@ class NotificationViewSet(viewsets.ViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+    @action(detail=False, methods=["get"], permission_classes=[IsAdminUser], url_path="outbox")
+    def outbox_status(self, request):
+        """Notification outbox queue depth (pending, due, retrying, failed)"""
+        from . import outbox
+        return Response(outbox.queue_depth())
+
     @action(detail=False, methods=["get"], permission_classes=[IsAdminUser])
     def get_preferences(self, request):
         """Get admin notification preferences"""
@@ -25,6 +25,7 @@ from django.conf import settings
 import logging
 import requests
 from typing import List, Optional, Dict, Any
+from .recipients import recipient_registry
 
 logger = logging.getLogger(__name__)
 
@@ -56,11 +57,9 @@ class WhatsAppNotificationService:
         """
         Send WhatsApp notification to admin users.
         """
-        # Check global WhatsApp notification toggle from database
+        # Check global WhatsApp notification toggle from database, cached with the recipients
         try:
-            from apps.Management.models import SiteSettings
-            site_settings = SiteSettings.get_settings()
-            if not site_settings.whatsapp_notifications_enabled:
+            if not recipient_registry.whatsapp_enabled():
                 print("Global WhatsApp notifications are DISABLED in database. No WhatsApp will be sent.")
                 logger.info("WhatsApp notification skipped: Global WhatsApp notifications disabled")
                 return False
@@ -239,16 +238,7 @@ class WhatsAppNotificationService:
     def _get_admin_phone_numbers(self) -> List[str]:
         """Get list of admin user phone numbers from database."""
         try:
-            from apps.Authentication.models import CustomUser
-            
-            phone_numbers = list(
-                CustomUser.objects.filter(is_staff=True, is_active=True)
-                .exclude(phone__isnull=True)
-                .exclude(phone='')
-                .values_list('phone', flat=True)
-            )
-            
-            return phone_numbers
+            return recipient_registry.admin_phones()
             
         except Exception as e:
             logger.error(f"Failed to fetch admin phone numbers: {str(e)}")
@@ -323,11 +313,9 @@ This is an automated notification from your gym management system.
         """
         Send WhatsApp notification to a specific member.
         """
-        # Check global WhatsApp notification toggle from database
+        # Check global WhatsApp notification toggle from database, cached with the recipients
         try:
-            from apps.Management.models import SiteSettings
-            site_settings = SiteSettings.get_settings()
-            if not site_settings.whatsapp_notifications_enabled:
+            if not recipient_registry.whatsapp_enabled():
                 return False
         except Exception as e:
             # Fallback to Django settings if database check fails
@@ -10,6 +10,7 @@ from django.http import HttpResponse
 from django.utils import timezone
 from django.db import IntegrityError
 from ..models import Member, Attendance
+from apps.Attendance import history
 
 class GenerateMemberQRCode(APIView):
     def get(self, request, member_id):
@@ -149,15 +150,15 @@ class AttendanceHistoryView(APIView):
             
             print(f"AttendanceHistoryView called with member_id={member_id}, date={date}, start_date={start_date}, end_date={end_date}")
             
-            # Base queryset
-            queryset = Attendance.objects.all().order_by('-date', '-check_in_time')
+            # Base queryset: hot rows plus the archive, newest first
+            queryset = history.history_queryset()
             
             # Filter by member if provided
             if member_id:
                 try:
                     member = Member.objects.get(id=member_id)
                     queryset = queryset.filter(member=member)
-                    print(f"Filtered for member {member_id}, found {queryset.count()} records")
+                    print(f"Filtered for member {member_id}")
                 except Member.DoesNotExist:
                     print(f"Member not found with ID: {member_id}")
                     return Response({"error": "Member not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -55,3 +55,6 @@ python manage.py check --deploy --settings=gymbackend.setting.prod
 
 echo "✅ Deployment completed successfully!"
 echo "🌐 Start the server with: daphne -b 0.0.0.0 -p 8000 gymbackend.asgi:application"
+echo "📬 And keep the notification worker running (no email/WhatsApp is sent without it):"
+echo "   python manage.py notification_worker --settings=gymbackend.setting.prod"
+echo "   (or run both with: python start_prod.py)"
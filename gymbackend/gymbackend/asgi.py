@@ -13,6 +13,10 @@ django.setup()
 
 from apps.Notifications import routing
 from apps.Authentication.websocket_middleware import JWTAuthMiddleware
+from apps.Attendance.face_service import face_service
+
+# Spawn face verification workers before the first PIN check-in arrives
+face_service.start()
 
 application = ProtocolTypeRouter({
     "http": get_asgi_application(),
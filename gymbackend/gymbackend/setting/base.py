@@ -185,7 +185,7 @@ SIMPLE_JWT = {
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
-# Channels Configuration
+# Channels and cache configuration
 # Try Redis first, fallback to in-memory for development
 try:
     import redis
@@ -202,6 +202,14 @@ try:
             },
         },
     }
+    # Shared cache so every worker sees the same check-in markers and version stamps
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": env('REDIS_CACHE_URL', default='redis://localhost:6379/1'),
+            "KEY_PREFIX": "gymbackend",
+        },
+    }
 except:
     # Redis not available, use in-memory (development only)
     CHANNEL_LAYERS = {
@@ -209,6 +217,60 @@ except:
             "BACKEND": "channels.layers.InMemoryChannelLayer",
         },
     }
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        },
+    }
+
+# Face verification (PIN+Photo check-in)
+FACE_COMPARISON_BACKEND = env('FACE_COMPARISON_BACKEND', default='simple')  # 'simple' (OpenCV) or 'face_recognition'
+FACE_SERVICE_WORKERS = env.int('FACE_SERVICE_WORKERS', default=2)
+FACE_SERVICE_QUEUE_SIZE = env.int('FACE_SERVICE_QUEUE_SIZE', default=8)  # queued + running jobs before answering 429
+FACE_SERVICE_TIMEOUT = env.float('FACE_SERVICE_TIMEOUT', default=10.0)  # seconds per job
+FACE_IDENTIFICATION_ENABLED = env.bool('FACE_IDENTIFICATION_ENABLED', default=False)  # photo-only 1:N kiosk check-in
+
+# Check-in photo transcoding (background re-encode + review thumbnails)
+CHECKIN_PHOTO_TRANSCODE_ON_SAVE = env.bool('CHECKIN_PHOTO_TRANSCODE_ON_SAVE', default=True)
+CHECKIN_PHOTO_TRANSCODE_WORKERS = env.int('CHECKIN_PHOTO_TRANSCODE_WORKERS', default=1)
+CHECKIN_PHOTO_TRANSCODE_LEASE = env.int('CHECKIN_PHOTO_TRANSCODE_LEASE', default=600)  # seconds before an abandoned transcode is retried
+CHECKIN_PHOTO_FORMAT = env('CHECKIN_PHOTO_FORMAT', default='JPEG')  # 'JPEG' or 'WEBP'
+CHECKIN_PHOTO_MAX_SIDE = env.int('CHECKIN_PHOTO_MAX_SIDE', default=1280)
+CHECKIN_PHOTO_QUALITY = env.int('CHECKIN_PHOTO_QUALITY', default=80)
+CHECKIN_THUMBNAIL_SIDE = env.int('CHECKIN_THUMBNAIL_SIDE', default=320)
+
+# Attendance archival (rows older than this move to the history table)
+ATTENDANCE_ARCHIVE_DAYS = env.int('ATTENDANCE_ARCHIVE_DAYS', default=180)
+
+# Attendance analytics (heatmaps, slot utilization, retention)
+ATTENDANCE_ANALYTICS_CACHE_TTL = env.int('ATTENDANCE_ANALYTICS_CACHE_TTL', default=3600)  # seconds per date range
+
+# Offline kiosk batch sync (HMAC-signed uploads)
+KIOSK_SYNC_SECRET = env('KIOSK_SYNC_SECRET', default='')
+KIOSK_SYNC_MAX_BATCH = env.int('KIOSK_SYNC_MAX_BATCH', default=500)
+KIOSK_SYNC_MAX_AGE_DAYS = env.int('KIOSK_SYNC_MAX_AGE_DAYS', default=7)
+
+# Check-in retries (Idempotency-Key header)
+CHECKIN_IDEMPOTENCY_TTL = env.int('CHECKIN_IDEMPOTENCY_TTL', default=86400)  # seconds a response is replayed
+
+# Notification outbox (delivered by `manage.py notification_worker`)
+NOTIFICATION_OUTBOX_MAX_ATTEMPTS = env.int('NOTIFICATION_OUTBOX_MAX_ATTEMPTS', default=8)
+NOTIFICATION_OUTBOX_RETRY_BASE = env.int('NOTIFICATION_OUTBOX_RETRY_BASE', default=30)  # seconds, doubled per failed attempt
+NOTIFICATION_OUTBOX_RETRY_MAX = env.int('NOTIFICATION_OUTBOX_RETRY_MAX', default=3600)  # backoff cap in seconds
+NOTIFICATION_OUTBOX_LEASE = env.int('NOTIFICATION_OUTBOX_LEASE', default=300)  # seconds before a stalled claim is retried
+NOTIFICATION_OUTBOX_BATCH_SIZE = env.int('NOTIFICATION_OUTBOX_BATCH_SIZE', default=50)
+NOTIFICATION_OUTBOX_POLL_INTERVAL = env.float('NOTIFICATION_OUTBOX_POLL_INTERVAL', default=1.0)  # seconds
+NOTIFICATION_RECIPIENTS_CACHE_TTL = env.int('NOTIFICATION_RECIPIENTS_CACHE_TTL', default=300)  # seconds; signals invalidate sooner
+
+# SiteSettings served from process memory (SiteSettings.cached())
+SITE_SETTINGS_CACHE_CHECK = env.float('SITE_SETTINGS_CACHE_CHECK', default=2.0)  # seconds between shared version checks
+SITE_SETTINGS_CACHE_TTL = env.int('SITE_SETTINGS_CACHE_TTL', default=300)  # seconds before an unconditional reload
+
+# Pooled SMTP sessions for notification email (apps/Notifications/smtp_pool.py)
+EMAIL_POOL_SIZE = env.int('EMAIL_POOL_SIZE', default=4)  # sessions kept open per process
+EMAIL_POOL_MAX_IDLE = env.int('EMAIL_POOL_MAX_IDLE', default=60)  # seconds before an idle session is closed
+EMAIL_POOL_CHECK_AFTER = env.int('EMAIL_POOL_CHECK_AFTER', default=5)  # seconds idle before a NOOP health check
+EMAIL_BCC_BATCH_SIZE = env.int('EMAIL_BCC_BATCH_SIZE', default=50)  # admins Bcc'd per SMTP transaction; 1 = personal To header
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
@@ -1,5 +1,8 @@
 @echo off
 REM Batch file to start Daphne ASGI server for the fitnessbackend project
 
+echo Starting notification worker...
+start "GymFitness Notification Worker" cmd /k "python manage.py notification_worker"
+
 echo Starting Daphne ASGI server on port 8000...
 daphne -p 8000 gymbackend.asgi:application
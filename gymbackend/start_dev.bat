@@ -5,7 +5,12 @@ echo 🔄 Auto-reload: ENABLED
 echo 🌐 Server: http://127.0.0.1:8000
 echo ⚡ WebSocket: ws://127.0.0.1:8000/ws/
 echo.
+echo 📬 Notification worker: started in its own window
 echo Press Ctrl+C to stop the server
 echo.
 
+REM Queued email/WhatsApp notifications are only delivered while the worker runs
+start "GymFitness Notification Worker" cmd /k "python manage.py notification_worker"
+
+
 daphne -b 127.0.0.1 -p 8000 --reload gymbackend.asgi:application
\ No newline at end of file
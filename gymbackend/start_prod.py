@@ -1,9 +1,11 @@
 #!/usr/bin/env python
 """
 Production server startup script
-Runs Daphne optimized for production
+Runs Daphne optimized for production, plus the notification worker that
+delivers queued email/WhatsApp notifications (apps/Notifications/outbox.py)
 """
 import os
+import subprocess
 import sys
 import django
 
@@ -13,10 +15,23 @@ if __name__ == '__main__':
     
     print("🚀 Starting GymFitness Production Server...")
     print("📡 WebSocket notifications: ENABLED")
+    print("📬 Notification worker: ENABLED")
     print("🔒 Production mode: ENABLED")
     print("🌐 Server: http://0.0.0.0:8000")
     print("⚡ WebSocket: ws://0.0.0.0:8000/ws/")
     print("\nPress Ctrl+C to stop the server\n")
     
-    # Start Daphne for production
-    os.system('daphne -b 0.0.0.0 -p 8000 gymbackend.asgi:application')
\ No newline at end of file
+    # Queued notifications are only delivered while the worker runs
+    worker = subprocess.Popen([sys.executable, 'manage.py', 'notification_worker'])
+    try:
+        # Start Daphne for production
+        exit_code = subprocess.call(['daphne', '-b', '0.0.0.0', '-p', '8000', 'gymbackend.asgi:application'])
+    except KeyboardInterrupt:
+        exit_code = 0
+    finally:
+        worker.terminate()
+        try:
+            worker.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            worker.kill()
+    sys.exit(exit_code)
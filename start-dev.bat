@@ -14,6 +14,9 @@ start "GymFitness WebSocket" cmd /k "cd gymbackend && venv\Scripts\activate && d
 
 timeout /t 2 /nobreak > nul
 
+echo Starting Notification Worker...
+start "GymFitness Notification Worker" cmd /k "cd gymbackend && venv\Scripts\activate && python manage.py notification_worker"
+
 echo Starting Frontend Server...
 start "GymFitness Frontend" cmd /k "cd fitness-frontend && npm start"
 
@@ -22,6 +25,7 @@ echo All servers are starting...
 echo - Frontend: http://localhost:3000
 echo - Backend: http://127.0.0.1:8000
 echo - WebSocket: ws://127.0.0.1:8001
+echo - Notification worker: delivers queued email/WhatsApp
 echo - Admin: http://127.0.0.1:8000/admin
 echo.
 echo Press any key to close this window...